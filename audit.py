@@ -0,0 +1,179 @@
+"""Auditoria em lote da força de listas de senhas.
+
+Cada bloco do arquivo é classificado byte a byte com ``bytes.translate``
+(maiúscula, minúscula, número, símbolo ou outro), sem laço Python por
+caractere. Cada senha vira uma chave (comprimento, classes); como há
+poucas chaves distintas, pontuação, entropia e a linha de saída de cada
+chave são calculadas uma única vez e reaproveitadas. Contagem e saída por
+linha usam map/Counter, também sem laço Python por senha.
+
+O comprimento é contado em bytes (UTF-8) e apenas letras ASCII são
+consideradas maiúsculas/minúsculas. Linhas vazias são ignoradas.
+"""
+import string
+from collections import Counter
+
+from generator import SYMBOLS
+from strength import LEVELS, charset_size, entropy_bits, level, score
+
+UPPER, LOWER, DIGIT, SYMBOL, OTHER = 1, 2, 4, 8, 16
+
+READ_SIZE = 1 << 22
+
+ROW_HEADER = b"length,upper,lower,digit,symbol,charset,entropy,score,strength\n"
+
+
+def _class_table():
+    """Tabela de tradução byte -> código da classe"""
+    table = bytearray([OTHER] * 256)
+    for chars, code in ((string.ascii_uppercase, UPPER),
+                        (string.ascii_lowercase, LOWER),
+                        (string.digits, DIGIT),
+                        (SYMBOLS, SYMBOL)):
+        for c in chars.encode():
+            table[c] = code
+    table[ord("\n")] = ord("\n")
+    return bytes(table)
+
+
+CLASS_TABLE = _class_table()
+
+
+def _mask_table():
+    """frozenset de códigos -> máscara de classes, para todas as combinações"""
+    codes = [UPPER, LOWER, DIGIT, SYMBOL, OTHER]
+    masks = {}
+    for mask in range(32):
+        members = frozenset(c for c in codes if mask & c)
+        masks[members] = mask
+    return masks
+
+
+MASKS = _mask_table()
+
+
+class _Scores(dict):
+    """Cache (comprimento, máscara) -> dados calculados sob demanda"""
+
+    def __missing__(self, key):
+        length, mask = key
+        flags = (bool(mask & UPPER), bool(mask & LOWER),
+                 bool(mask & DIGIT), bool(mask & SYMBOL))
+        points = score(length, *flags)
+        size = charset_size(*flags)
+        value = (flags, size, entropy_bits(length, size), points, level(points)[0])
+        self[key] = value
+        return value
+
+
+class _Rows(dict):
+    """Cache (comprimento, máscara) -> linha CSV de saída"""
+
+    def __init__(self, scores):
+        super().__init__()
+        self.scores = scores
+
+    def __missing__(self, key):
+        flags, size, entropy, points, label = self.scores[key]
+        row = ",".join([str(key[0]), *("1" if f else "0" for f in flags),
+                        str(size), f"{entropy:.1f}", str(points), label])
+        value = (row + "\n").encode()
+        self[key] = value
+        return value
+
+
+class AuditReport:
+    """Resultado agregado de uma auditoria"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._scores = _Scores()
+
+    def add_keys(self, keys):
+        self.counts.update(keys)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def summary(self):
+        """Dicionário com o relatório agregado"""
+        total = self.total
+        by_level = {label: 0 for _, label, _ in LEVELS}
+        classes = {"upper": 0, "lower": 0, "digit": 0, "symbol": 0}
+        lengths = Counter()
+        entropy_sum = 0.0
+        weak_entropy = 0
+        for key, count in self.counts.items():
+            flags, size, entropy, points, label = self._scores[key]
+            by_level[label] += count
+            for name, flag in zip(classes, flags):
+                if flag:
+                    classes[name] += count
+            lengths[key[0]] += count
+            entropy_sum += entropy * count
+            if entropy < 50:
+                weak_entropy += count
+
+        return {
+            "total": total,
+            "strength": by_level,
+            "classes": classes,
+            "lengths": dict(sorted(lengths.items())),
+            "mean_length": (sum(l * c for l, c in lengths.items()) / total
+                            if total else 0.0),
+            "mean_entropy": entropy_sum / total if total else 0.0,
+            "below_50_bits": weak_entropy,
+        }
+
+
+def _keys(block):
+    """Chaves (comprimento, máscara) das linhas não vazias de um bloco"""
+    lines = block.translate(CLASS_TABLE, b"\r").split(b"\n")
+    lines = list(filter(None, lines))
+    return list(zip(map(len, lines), map(MASKS.__getitem__, map(frozenset, lines))))
+
+
+def audit_stream(source, rows_out=None, read_size=READ_SIZE):
+    """Audita senhas de um arquivo binário (uma por linha)
+
+    Se rows_out for dado, escreve nele uma linha CSV por senha, na ordem.
+    """
+    report = AuditReport()
+    rows = _Rows(report._scores)
+    if rows_out is not None:
+        rows_out.write(ROW_HEADER)
+    carry = b""
+    while True:
+        block = source.read(read_size)
+        if not block:
+            break
+        block = carry + block
+        cut = block.rfind(b"\n") + 1
+        carry = block[cut:]
+        keys = _keys(block[:cut])
+        report.add_keys(keys)
+        if rows_out is not None:
+            rows_out.write(b"".join(map(rows.__getitem__, keys)))
+    if carry:
+        keys = _keys(carry)
+        report.add_keys(keys)
+        if rows_out is not None:
+            rows_out.write(b"".join(map(rows.__getitem__, keys)))
+    return report
+
+
+def audit_file(path, rows_path=None):
+    """Audita o arquivo em path; retorna AuditReport"""
+    with open(path, 'rb') as source:
+        if rows_path is None:
+            return audit_stream(source)
+        with open(rows_path, 'wb') as rows_out:
+            return audit_stream(source, rows_out)
+
+
+def audit_passwords(passwords):
+    """Audita uma lista de senhas em memória; retorna AuditReport"""
+    report = AuditReport()
+    report.add_keys(_keys("\n".join(passwords).encode()))
+    return report
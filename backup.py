@@ -0,0 +1,229 @@
+"""Exportação e importação do cofre em blocos criptografados.
+
+Formato do arquivo de backup:
+
+    linha 1: cabeçalho JSON em texto claro (formato, id da exportação...)
+    demais:  um token Fernet por linha, cada um com um bloco de entradas
+
+O texto de cada bloco começa com uma linha JSON ``{"export_id", "seq",
+"count", "last"}`` seguida das entradas em JSONL ou CSV. Como o Fernet
+autentica cada bloco e o bloco carrega sua posição e o id da exportação,
+blocos trocados, repetidos, de outro backup ou faltando no fim são
+detectados na importação.
+
+Exportação e importação montam, cifram e decifram um bloco por vez, sem
+nunca juntar o cofre inteiro em um único texto ou token. A exportação lê
+direto dos arquivos do cofre (Vault.stream_entries), sem carregar o
+cache. A importação só acrescenta registros ao cofre, grava um arquivo de
+progresso por cofre de destino a cada bloco e pode ser retomada depois de
+interrompida; entradas sem id (CSV editado à mão) recebem um id derivado
+da posição no backup, então um bloco importado de novo na retomada
+substitui as mesmas entradas em vez de duplicá-las.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import secrets
+
+from cryptography.fernet import InvalidToken
+
+FORMAT = "pgp-export"
+VERSION = 1
+CHUNK_ENTRIES = 1000
+FIELDS = ["id", "name", "password", "category", "created", "strength"]
+
+
+class BackupError(Exception):
+    """Arquivo de backup inválido ou adulterado"""
+
+
+def _encode_body(entries, encoding):
+    """Serializa entradas de um bloco"""
+    if encoding == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(entries)
+        return buffer.getvalue()
+    return "".join(json.dumps(entry) + "\n" for entry in entries)
+
+
+def _row_id(export_id, seq, row):
+    """Id estável para a entrada sem id na linha row do bloco seq"""
+    key = f"{export_id}:{seq}:{row}".encode()
+    return hashlib.sha256(key).hexdigest()[:16]
+
+
+def _decode_jsonl(body, seq):
+    """Entradas JSONL de um bloco; BackupError com a linha se uma não é objeto"""
+    entries = []
+    # A linha 1 do bloco é a dos metadados
+    for number, line in enumerate(body.splitlines(), 2):
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            entry = None
+        if not isinstance(entry, dict):
+            raise BackupError(f"Bloco {seq}, linha {number}: entrada não é um objeto JSON")
+        entries.append(entry)
+    return entries
+
+
+def _decode_body(body, encoding, export_id, seq):
+    """Lê entradas de um bloco"""
+    if encoding == "csv":
+        entries = [dict(row) for row in csv.DictReader(io.StringIO(body))]
+    else:
+        entries = _decode_jsonl(body, seq)
+    for row, entry in enumerate(entries):
+        if not entry.get("id"):
+            entry["id"] = _row_id(export_id, seq, row)
+    return entries
+
+
+def export_vault(vault, path, encoding="jsonl", chunk_entries=CHUNK_ENTRIES,
+                 progress=None):
+    """Exporta as entradas do cofre para path; retorna quantas exportou"""
+    if encoding not in ("jsonl", "csv"):
+        raise ValueError(f"Formato desconhecido: {encoding}")
+    total, entries = vault.stream_entries()
+    header = {"format": FORMAT, "version": VERSION, "encoding": encoding,
+              "chunk_entries": chunk_entries, "entries": total,
+              "export_id": secrets.token_hex(8)}
+    tmp = path + ".tmp"
+    state = {"seq": 0, "done": 0}
+
+    def write_chunk(f, chunk, last):
+        meta = {"export_id": header["export_id"], "seq": state["seq"],
+                "count": len(chunk), "last": last}
+        text = json.dumps(meta) + "\n" + _encode_body(chunk, encoding)
+        f.write(vault.cipher.encrypt(text.encode()) + b"\n")
+        state["seq"] += 1
+        state["done"] += len(chunk)
+        if progress:
+            progress(state["done"], total)
+
+    with open(tmp, 'wb') as f:
+        f.write(json.dumps(header).encode() + b"\n")
+        # Um bloco cheio só é gravado quando se sabe se ele é o último
+        pending = None
+        chunk = []
+        for entry in entries:
+            chunk.append(entry)
+            if len(chunk) == chunk_entries:
+                if pending is not None:
+                    write_chunk(f, pending, False)
+                pending, chunk = chunk, []
+        if pending is not None and chunk:
+            write_chunk(f, pending, False)
+            write_chunk(f, chunk, True)
+        elif pending is not None:
+            write_chunk(f, pending, True)
+        else:
+            write_chunk(f, chunk, True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return state["done"]
+
+
+class Importer:
+    """Importa um backup para o cofre, bloco a bloco, com retomada"""
+
+    def __init__(self, vault, path):
+        self.vault = vault
+        self.path = path
+        # Um arquivo de progresso por cofre de destino
+        target = hashlib.sha256(os.path.abspath(vault.path).encode()).hexdigest()[:8]
+        self.progress_path = f"{path}.progress-{target}"
+        self.imported = 0
+        self.finished = False
+
+    def _load_checkpoint(self, export_id):
+        """Retorna (seq, deslocamento) do último bloco gravado"""
+        try:
+            with open(self.progress_path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return -1, None
+        if checkpoint.get("export_id") != export_id:
+            return -1, None
+        self.imported = checkpoint.get("imported", 0)
+        self.finished = checkpoint.get("last", False)
+        return checkpoint["seq"], checkpoint["offset"]
+
+    def _save_checkpoint(self, export_id, seq, offset, last):
+        tmp = self.progress_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"export_id": export_id, "seq": seq, "offset": offset,
+                       "imported": self.imported, "last": last}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.progress_path)
+
+    def run(self, progress=None, resume=True):
+        """Importa o backup; progress(bytes_lidos, bytes_totais, entradas)"""
+        total = os.path.getsize(self.path)
+        with open(self.path, 'rb') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                raise BackupError("Cabeçalho inválido")
+            if (not isinstance(header, dict) or header.get("format") != FORMAT
+                    or header.get("version") != VERSION):
+                raise BackupError("Arquivo não é um backup do Password Generator Pro")
+            export_id = header["export_id"]
+            encoding = header["encoding"]
+
+            self.imported = 0
+            self.finished = False
+            last_seq, offset = self._load_checkpoint(export_id) if resume else (-1, None)
+            if offset is not None:
+                f.seek(offset)
+            expected = last_seq + 1
+
+            while not self.finished:
+                line = f.readline()
+                if not line:
+                    break
+                token = line.rstrip(b"\n")
+                try:
+                    text = self.vault.cipher.decrypt(token).decode()
+                except InvalidToken:
+                    raise BackupError(f"Bloco {expected} corrompido ou de outra chave")
+                meta_line, _, body = text.partition("\n")
+                try:
+                    meta = json.loads(meta_line)
+                except ValueError:
+                    meta = None
+                if not isinstance(meta, dict):
+                    raise BackupError(f"Bloco {expected}, linha 1: metadados inválidos")
+                if meta.get("export_id") != export_id or meta.get("seq") != expected:
+                    raise BackupError(f"Bloco fora de ordem (esperado {expected})")
+
+                entries = _decode_body(body, encoding, export_id, expected)
+                if len(entries) != meta.get("count"):
+                    raise BackupError(f"Bloco {expected} incompleto")
+                if entries:
+                    self.vault.add_many(entries)
+                self.imported += len(entries)
+                self.finished = bool(meta.get("last"))
+                # Checkpoint só depois do cofre gravado (com fsync)
+                self._save_checkpoint(export_id, expected, f.tell(), self.finished)
+                if progress:
+                    progress(f.tell(), total, self.imported)
+                expected += 1
+
+        if not self.finished:
+            raise BackupError("Backup truncado: último bloco não encontrado")
+        os.remove(self.progress_path)
+        return self.imported
+
+
+def import_backup(vault, path, progress=None, resume=True):
+    """Importa backup em path para o cofre; retorna quantas entradas importou"""
+    return Importer(vault, path).run(progress, resume)
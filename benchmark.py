@@ -0,0 +1,255 @@
+"""Benchmarks de geração, pontuação de força e operações do cofre.
+
+Uso:
+    python benchmark.py                          # tamanhos 1k e 100k
+    python benchmark.py --sizes 1000 100000 1000000 -o bench.json
+    python benchmark.py --compare bench.json     # marca regressões
+
+Cada tamanho de cofre roda em um processo separado, para que o pico de
+memória (RSS) medido seja só daquele cenário. O resultado é um JSON com
+uma métrica por chave; --compare compara com um resultado anterior e
+termina com código 1 se alguma métrica piorou além da tolerância.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from cryptography.fernet import Fernet
+
+try:
+    import resource
+except ImportError:
+    # Windows: sem getrusage, o pico de memória não é medido
+    resource = None
+
+from audit import audit_passwords
+from generator import BatchGenerator, Policy, PolicyGenerator, build_charset
+from strength import calculate_strength
+from vault import Vault
+
+CHARSETS = {
+    "completo": build_charset(),
+    "sem_simbolos": build_charset(symbols=False),
+    "minusculas": build_charset(uppercase=False, digits=False, symbols=False),
+    "numeros": build_charset(uppercase=False, lowercase=False, symbols=False),
+}
+LENGTHS = [8, 16, 32, 64]
+DEFAULT_SIZES = [1_000, 100_000]
+LATENCY_SAMPLES = 200
+
+
+def _metric(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+
+def _percentiles(samples, prefix, results):
+    """Registra p50/p95/p99 (em ms) de uma lista de latências em segundos"""
+    cuts = statistics.quantiles([s * 1000 for s in samples], n=100)
+    for p in (50, 95, 99):
+        results[f"{prefix}.p{p}"] = _metric(cuts[p - 1], "ms", "lower")
+
+
+def _peak_rss_mb():
+    """Pico de memória do processo em MB (None se indisponível)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def bench_generation(count=200_000):
+    """Vazão de geração por conjunto de caracteres e comprimento"""
+    results = {}
+    for name, charset in CHARSETS.items():
+        for length in LENGTHS:
+            generator = BatchGenerator(charset, length)
+            start = time.perf_counter()
+            generator.generate(count)
+            elapsed = time.perf_counter() - start
+            results[f"generate.{name}.{length}"] = _metric(
+                count / elapsed, "senhas/s", "higher")
+
+    # Com política: uma de cada classe e no máximo 2 caracteres iguais seguidos
+    for length in (16, 32):
+        policy = Policy.covering(CHARSETS["completo"], length)
+        policy.max_repeat = 2
+        generator = PolicyGenerator(policy)
+        start = time.perf_counter()
+        generator.generate(count)
+        elapsed = time.perf_counter() - start
+        results[f"generate.politica.{length}"] = _metric(
+            count / elapsed, "senhas/s", "higher")
+    return results
+
+
+def bench_strength(count=200_000):
+    """Vazão da pontuação de força (uma a uma e em lote)"""
+    passwords = BatchGenerator(CHARSETS["completo"], 16).generate(count)
+    results = {}
+
+    start = time.perf_counter()
+    for password in passwords:
+        calculate_strength(password)
+    results["strength.single"] = _metric(
+        count / (time.perf_counter() - start), "senhas/s", "higher")
+
+    start = time.perf_counter()
+    audit_passwords(passwords)
+    results["strength.batch"] = _metric(
+        count / (time.perf_counter() - start), "senhas/s", "higher")
+    return results
+
+
+def _synthetic_entries(count, generator):
+    """Entradas sintéticas parecidas com as salvas pela interface"""
+    categories = ["Emails", "Bancos", "Trabalho", "Redes Sociais", ""]
+    passwords = generator.generate(count)
+    return [{"name": f"conta-{i}", "password": password,
+             "category": categories[i % len(categories)],
+             "created": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:00:00",
+             "strength": calculate_strength(password)[0]}
+            for i, password in enumerate(passwords)]
+
+
+def bench_vault(size):
+    """Latências do cofre com size entradas (roda em processo próprio)"""
+    results = {}
+    prefix = f"vault.{size}"
+    generator = BatchGenerator(CHARSETS["completo"], 16)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "passwords.enc")
+        cipher = Fernet(Fernet.generate_key())
+
+        vault = Vault(path, cipher)
+        start = time.perf_counter()
+        for offset in range(0, size, 10_000):
+            vault.add_many(_synthetic_entries(min(10_000, size - offset), generator))
+        results[f"{prefix}.build"] = _metric(
+            size / (time.perf_counter() - start), "entradas/s", "higher")
+        results[f"{prefix}.file_size"] = _metric(
+            sum(map(os.path.getsize, vault.files())) / (1024 * 1024), "MB", "lower")
+
+        # Carga a frio: decifra os metadados (as senhas ficam no disco)
+        vault = Vault(path, cipher)
+        start = time.perf_counter()
+        ids = vault.ids()
+        results[f"{prefix}.load"] = _metric(
+            (time.perf_counter() - start) * 1000, "ms", "lower")
+
+        samples = []
+        for entry_id in ids[:LATENCY_SAMPLES * 10]:
+            start = time.perf_counter()
+            vault.get(entry_id)
+            samples.append(time.perf_counter() - start)
+        _percentiles(samples, f"{prefix}.get", results)
+
+        samples = []
+        for entry_id in ids[:LATENCY_SAMPLES]:
+            start = time.perf_counter()
+            vault.secret(entry_id)
+            samples.append(time.perf_counter() - start)
+        _percentiles(samples, f"{prefix}.secret", results)
+
+        samples = []
+        new_ids = []
+        for entry in _synthetic_entries(LATENCY_SAMPLES, generator):
+            start = time.perf_counter()
+            new_ids.append(vault.add(entry))
+            samples.append(time.perf_counter() - start)
+        _percentiles(samples, f"{prefix}.save", results)
+
+        samples = []
+        for entry_id in new_ids:
+            start = time.perf_counter()
+            vault.delete(entry_id)
+            samples.append(time.perf_counter() - start)
+        _percentiles(samples, f"{prefix}.delete", results)
+
+    peak = _peak_rss_mb()
+    if peak is not None:
+        results[f"{prefix}.peak_rss"] = _metric(peak, "MB", "lower")
+    return results
+
+
+def run(sizes):
+    """Roda todos os benchmarks e retorna o documento JSON"""
+    results = {}
+    print("geração...", file=sys.stderr)
+    results.update(bench_generation())
+    print("força...", file=sys.stderr)
+    results.update(bench_strength())
+
+    context = multiprocessing.get_context("spawn")
+    for size in sizes:
+        print(f"cofre com {size:,} entradas...", file=sys.stderr)
+        with context.Pool(1) as pool:
+            results.update(pool.apply(bench_vault, (size,)))
+
+    return {
+        "meta": {
+            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Retorna lista de (métrica, antes, depois, variação) que pioraram"""
+    regressions = []
+    old_results = baseline.get("results", {})
+    for name, metric in current["results"].items():
+        old = old_results.get(name)
+        if not old or not old["value"]:
+            continue
+        change = (metric["value"] - old["value"]) / old["value"]
+        worse = -change if metric["better"] == "higher" else change
+        if worse > tolerance:
+            regressions.append((name, old["value"], metric["value"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do Password Generator Pro")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="tamanhos dos cofres sintéticos (padrão: 1000 100000)")
+    parser.add_argument("-o", "--output", help="grava o resultado em JSON")
+    parser.add_argument("--compare", help="resultado anterior para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="piora máxima aceita na comparação (padrão: 0.10)")
+    args = parser.parse_args(argv)
+
+    document = run(args.sizes)
+    text = json.dumps(document, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(document, baseline, args.tolerance)
+        for name, old, new, change in regressions:
+            print(f"REGRESSÃO {name}: {old:,.2f} -> {new:,.2f} ({change:+.1%})",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print("nenhuma regressão", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Verificação offline de senhas vazadas.
+
+A lista de vazamentos (ex.: arquivo de hashes SHA-1 do Have I Been Pwned,
+``HASH:contagem`` por linha, ou uma lista de senhas em texto) é convertida
+em um índice binário compacto:
+
+    cabeçalho   b"PGPBRCH1" + quantidade de hashes (uint64, big-endian)
+    fan-out     65537 posições (uint64): início de cada faixa dos 16
+                primeiros bits do hash
+    hashes      primeiros 8 bytes de cada SHA-1, ordenados e sem repetição
+
+O arquivo é aberto com mmap: só as páginas consultadas vão para a
+memória. Uma busca lê a faixa do fan-out e faz busca binária dentro dela
+(~13 comparações para 500 milhões de hashes). Com 64 bits de hash, a
+chance de falso positivo é desprezível.
+
+A construção usa ordenação externa (blocos ordenados em arquivos
+temporários e intercalação), então listas de centenas de milhões de
+hashes não precisam caber na memória.
+"""
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b"PGPBRCH1"
+HASH_BYTES = 8
+FANOUT = 1 << 16
+HEADER = struct.Struct(">8sQ")
+DATA_OFFSET = HEADER.size + (FANOUT + 1) * 8
+
+# Hashes por bloco ordenado em memória na construção (~72 MB por bloco)
+RUN_SIZE = 2_000_000
+
+DEFAULT_INDEX = "breaches.idx"
+
+
+class BreachIndexError(Exception):
+    """Índice de vazamentos ausente ou inválido"""
+
+
+def password_key(password):
+    """Chave do índice (64 bits iniciais do SHA-1) de uma senha"""
+    return int.from_bytes(hashlib.sha1(password.encode()).digest()[:HASH_BYTES], "big")
+
+
+def _parse_line(line, plain):
+    """Chave de uma linha do arquivo de origem (None se inválida)"""
+    line = line.rstrip(b"\r\n")
+    if not line:
+        return None
+    if plain:
+        return int.from_bytes(hashlib.sha1(line).digest()[:HASH_BYTES], "big")
+    try:
+        return int(line[:HASH_BYTES * 2], 16)
+    except ValueError:
+        return None
+
+
+def _write_run(keys, directory):
+    """Ordena um bloco de chaves e grava em arquivo temporário"""
+    keys.sort()
+    run = array("Q", keys)
+    if sys.byteorder == "little":
+        run.byteswap()
+    f = tempfile.TemporaryFile(dir=directory)
+    run.tofile(f)
+    f.seek(0)
+    return f
+
+
+def _read_run(f, chunk=65536):
+    """Lê as chaves de um bloco ordenado"""
+    while True:
+        data = f.read(chunk * 8)
+        if not data:
+            break
+        run = array("Q")
+        run.frombytes(data)
+        if sys.byteorder == "little":
+            run.byteswap()
+        yield from run
+
+
+def build_index(source_path, index_path=DEFAULT_INDEX, plain=False,
+                run_size=RUN_SIZE, progress=None):
+    """Constrói o índice a partir de uma lista de vazamentos; retorna a quantidade"""
+    directory = os.path.dirname(os.path.abspath(index_path))
+    runs = []
+    total_size = os.path.getsize(source_path)
+    try:
+        with open(source_path, "rb") as source:
+            keys = []
+            for line in source:
+                key = _parse_line(line, plain)
+                if key is None:
+                    continue
+                keys.append(key)
+                if len(keys) >= run_size:
+                    runs.append(_write_run(keys, directory))
+                    keys = []
+                    if progress:
+                        progress("ordenando", source.tell(), total_size)
+            if keys:
+                runs.append(_write_run(keys, directory))
+
+        fanout = array("Q", [0] * (FANOUT + 1))
+        count = 0
+        tmp = index_path + ".tmp"
+        with open(tmp, "wb") as out:
+            out.write(b"\0" * DATA_OFFSET)
+            buffer = array("Q")
+            last = None
+            for key in heapq.merge(*(_read_run(f) for f in runs)):
+                if key == last:
+                    continue
+                last = key
+                buffer.append(key)
+                fanout[(key >> 48) + 1] += 1
+                count += 1
+                if len(buffer) >= 65536:
+                    if sys.byteorder == "little":
+                        buffer.byteswap()
+                    buffer.tofile(out)
+                    buffer = array("Q")
+                    if progress and count % (1 << 22) < 65536:
+                        progress("intercalando", count, None)
+            if sys.byteorder == "little":
+                buffer.byteswap()
+            buffer.tofile(out)
+
+            # Fan-out acumulado: fanout[b] = primeira posição da faixa b
+            for i in range(1, FANOUT + 1):
+                fanout[i] += fanout[i - 1]
+            if sys.byteorder == "little":
+                fanout.byteswap()
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, count))
+            fanout.tofile(out)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, index_path)
+    finally:
+        for f in runs:
+            f.close()
+    return count
+
+
+class BreachIndex:
+    """Consulta ao índice de vazamentos via mmap"""
+
+    def __init__(self, path=DEFAULT_INDEX):
+        try:
+            self._file = open(path, "rb")
+        except OSError as e:
+            raise BreachIndexError(f"Índice de vazamentos indisponível: {e}")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise BreachIndexError(f"Índice vazio: {path}")
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or len(self._map) != DATA_OFFSET + self.count * HASH_BYTES:
+            self.close()
+            raise BreachIndexError(f"Índice inválido: {path}")
+        self.path = path
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def contains_key(self, key):
+        """True se a chave (64 bits do SHA-1) está no índice"""
+        lo, hi = struct.unpack_from(">QQ", self._map, HEADER.size + (key >> 48) * 8)
+        target = key.to_bytes(HASH_BYTES, "big")
+        data = self._map
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = DATA_OFFSET + mid * HASH_BYTES
+            value = data[pos:pos + HASH_BYTES]
+            if value < target:
+                lo = mid + 1
+            elif value > target:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def __contains__(self, password):
+        return self.contains_key(password_key(password))
+
+    def check_many(self, passwords):
+        """Lista de booleanos (vazada ou não) para várias senhas"""
+        return [self.contains_key(password_key(p)) for p in passwords]
+
+    def check_vault(self, vault):
+        """Entradas do cofre cuja senha está no índice"""
+        return [entry for entry in vault.iter_entries(secrets=True)
+                if self.contains_key(password_key(entry["password"]))]
@@ -0,0 +1,548 @@
+"""Modo de linha de comando (sem interface gráfica)"""
+import argparse
+import asyncio
+import getpass
+import json
+import os
+import sys
+
+from audit import audit_file
+from backup import BackupError, export_vault, import_backup
+from breach import DEFAULT_INDEX, BreachIndex, BreachIndexError, build_index
+from generator import (BatchGenerator, ParallelGenerator, Policy, PolicyGenerator,
+                       build_charset)
+from keystore import (calibrate, change_passphrase, load_or_create_key,
+                      load_or_create_token, needs_new_passphrase, read_keystore,
+                      read_token, token_path)
+from passphrase import (CAPITALIZE, DEFAULT_WORDLIST, DEFAULT_WORDS, TARGET_BITS,
+                        PassphraseGenerator, Wordlist, WordlistError, build_wordlist)
+from rotation import KeyRotation
+from server import Service, serve
+from sync import DirectorySync, ServiceSync, SyncError
+from vault import Vault, VaultError
+
+PASSPHRASE_ENV = "PGP_PASSPHRASE"
+
+
+def add_charset_arguments(parser):
+    """Adiciona opções de conjunto de caracteres e comprimento"""
+    parser.add_argument("-l", "--length", type=int, default=16,
+                        help="comprimento das senhas (padrão: 16)")
+    parser.add_argument("--no-uppercase", action="store_true",
+                        help="não usar maiúsculas (A-Z)")
+    parser.add_argument("--no-lowercase", action="store_true",
+                        help="não usar minúsculas (a-z)")
+    parser.add_argument("--no-digits", action="store_true",
+                        help="não usar números (0-9)")
+    parser.add_argument("--no-symbols", action="store_true",
+                        help="não usar símbolos (!@#$%%)")
+    parser.add_argument("--allow-ambiguous", action="store_true",
+                        help="permitir caracteres ambíguos (0, O, l, 1)")
+
+
+def add_policy_arguments(parser):
+    """Adiciona opções de política (mínimos por classe, repetições etc.)"""
+    for name, text in (("upper", "maiúsculas"), ("lower", "minúsculas"),
+                       ("digits", "números"), ("symbols", "símbolos")):
+        parser.add_argument(f"--min-{name}", type=int, default=0, metavar="N",
+                            help=f"mínimo de {text} em cada senha")
+    parser.add_argument("--max-repeat", type=int, metavar="N",
+                        help="máximo de caracteres iguais seguidos")
+    parser.add_argument("--forbid", action="append", default=[], metavar="TEXTO",
+                        help="trecho proibido (pode repetir a opção)")
+    parser.add_argument("--charset",
+                        help="conjunto de caracteres personalizado")
+
+
+def policy_from_args(args):
+    """Política pedida nos argumentos (None se nenhuma regra foi dada)"""
+    min_counts = {name: getattr(args, f"min_{name}")
+                  for name in ("upper", "lower", "digits", "symbols")}
+    # max_repeat é testado contra None: 0 é inválido e a Policy o recusa
+    if not (any(min_counts.values()) or args.max_repeat is not None or args.forbid
+            or args.charset):
+        return None
+    return Policy(args.length, charset_from_args(args), min_counts,
+                  args.max_repeat, args.forbid)
+
+
+def charset_from_args(args):
+    """Monta conjunto de caracteres a partir dos argumentos"""
+    if getattr(args, "charset", None):
+        return args.charset
+    return build_charset(uppercase=not args.no_uppercase,
+                         lowercase=not args.no_lowercase,
+                         digits=not args.no_digits,
+                         symbols=not args.no_symbols,
+                         exclude_ambiguous=not args.allow_ambiguous)
+
+
+def open_output(path):
+    """Abre destino binário (arquivo ou stdout)"""
+    if path in (None, "-"):
+        return sys.stdout.buffer, False
+    return open(path, 'wb'), True
+
+
+def cmd_generate(args):
+    """Gera senhas em lote"""
+    try:
+        policy = policy_from_args(args)
+        if args.workers > 1:
+            generator = ParallelGenerator(charset_from_args(args), args.length,
+                                          args.workers, policy=policy)
+        elif policy is not None:
+            generator = PolicyGenerator(policy)
+        else:
+            generator = BatchGenerator(charset_from_args(args), args.length)
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+
+    out, close = open_output(args.output)
+    try:
+        generator.write(out, args.count)
+    finally:
+        if close:
+            out.close()
+
+    if args.workers > 1:
+        for line in generator.report():
+            print(line, file=sys.stderr)
+    return 0
+
+
+def ask_new_passphrase(prompt="Nova senha mestra: "):
+    """Pede uma senha mestra nova, com confirmação"""
+    passphrase = getpass.getpass(prompt)
+    if not passphrase:
+        raise VaultError("A senha mestra não pode ser vazia")
+    if getpass.getpass("Confirme a senha mestra: ") != passphrase:
+        raise VaultError("As senhas não conferem")
+    return passphrase
+
+
+def read_passphrase(key_file):
+    """Senha mestra da variável PGP_PASSPHRASE ou digitada no terminal"""
+    passphrase = os.environ.get(PASSPHRASE_ENV)
+    if passphrase:
+        return passphrase
+    if needs_new_passphrase(key_file):
+        print("Defina a senha mestra do cofre.", file=sys.stderr)
+        return ask_new_passphrase()
+    return getpass.getpass("Senha mestra: ")
+
+
+def open_vault(args):
+    """Abre o cofre indicado nos argumentos"""
+    return Vault(args.vault, load_or_create_key(args.key, read_passphrase(args.key)))
+
+
+def print_progress(text):
+    """Mostra progresso na mesma linha da saída de erro"""
+    print(f"\r{text}", end="", file=sys.stderr, flush=True)
+
+
+def cmd_passphrase(args):
+    """Gera frases-senha em lote"""
+    wordlist = Wordlist(args.wordlist)
+    try:
+        generator = PassphraseGenerator(wordlist, args.words, args.separator,
+                                        args.capitalize, args.digits)
+    except ValueError as e:
+        wordlist.close()
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+
+    out, close = open_output(args.output)
+    try:
+        generator.write(out, args.count)
+    finally:
+        if close:
+            out.close()
+        wordlist.close()
+    print(f"{len(wordlist):,} palavras na lista, "
+          f"{generator.entropy_bits():.1f} bits por frase", file=sys.stderr)
+    return 0
+
+
+def cmd_wordlist_build(args):
+    """Converte lista de palavras em texto para o formato compacto"""
+    count = build_wordlist(args.source, args.output)
+    print(f"{count:,} palavras gravadas em {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_export(args):
+    """Exporta o cofre para um backup criptografado"""
+    vault = open_vault(args)
+    done = export_vault(
+        vault, args.file, encoding=args.format, chunk_entries=args.chunk,
+        progress=lambda done, total: print_progress(
+            f"exportando: {done:,}/{total:,} entradas"))
+    print(f"\n{done:,} entradas exportadas para {args.file}", file=sys.stderr)
+    return 0
+
+
+def cmd_import(args):
+    """Importa um backup criptografado para o cofre"""
+    vault = open_vault(args)
+
+    def progress(read, total, imported):
+        percent = read / total * 100 if total else 100
+        print_progress(f"importando: {percent:5.1f}% ({imported:,} entradas)")
+
+    try:
+        done = import_backup(vault, args.file, progress=progress,
+                             resume=not args.restart)
+    except BackupError as e:
+        print(f"\nErro: {e}", file=sys.stderr)
+        return 1
+    print(f"\n{done:,} entradas importadas de {args.file}", file=sys.stderr)
+    return 0
+
+
+def cmd_audit(args):
+    """Audita a força de uma lista de senhas"""
+    try:
+        report = audit_file(args.file, args.rows)
+    except OSError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    summary = report.summary()
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+
+    total = summary["total"] or 1
+    print(f"Senhas analisadas: {summary['total']:,}")
+    print(f"Comprimento médio: {summary['mean_length']:.1f}")
+    print(f"Entropia média:    {summary['mean_entropy']:.1f} bits")
+    print(f"Abaixo de 50 bits: {summary['below_50_bits']:,} "
+          f"({summary['below_50_bits'] / total:.1%})")
+    print("\nForça:")
+    for label, count in summary["strength"].items():
+        print(f"   {label:<16} {count:>12,} ({count / total:.1%})")
+    print("\nComposição:")
+    names = {"upper": "Maiúsculas", "lower": "Minúsculas",
+             "digit": "Números", "symbol": "Símbolos"}
+    for name, count in summary["classes"].items():
+        print(f"   {names[name]:<16} {count:>12,} ({count / total:.1%})")
+    return 0
+
+
+def cmd_reuse(args):
+    """Lista senhas reutilizadas (iguais ou parecidas) no cofre"""
+    vault = open_vault(args)
+    groups = vault.reuse_report()
+    for kind, entries in sorted(groups, key=lambda group: -len(group[1])):
+        icon = "🔁" if kind == "igual" else "≈"
+        names = ", ".join(entry["name"] for entry in entries)
+        print(f"{icon} {kind} ({len(entries)}): {names}")
+    # Uma entrada pode estar em um grupo "igual" e em um "parecida"
+    reused = len({entry["id"] for _, entries in groups for entry in entries})
+    print(f"{len(groups):,} grupos, {reused:,} de {len(vault):,} entradas",
+          file=sys.stderr)
+    return 1 if groups else 0
+
+
+def cmd_breach_build(args):
+    """Constrói o índice de senhas vazadas"""
+    def progress(stage, done, total):
+        if total:
+            print_progress(f"{stage}: {done / total:6.1%}")
+        else:
+            print_progress(f"{stage}: {done:,} hashes")
+
+    count = build_index(args.source, args.index, plain=args.plain, progress=progress)
+    print(f"\n{count:,} hashes no índice {args.index}", file=sys.stderr)
+    return 0
+
+
+def cmd_breach_check(args):
+    """Verifica senhas (argumentos ou uma por linha na entrada)"""
+    index = BreachIndex(args.index)
+    passwords = args.passwords or (line.rstrip("\r\n") for line in sys.stdin)
+    found = 0
+    for password in passwords:
+        if password in index:
+            found += 1
+            print(f"VAZADA\t{password}")
+        elif args.verbose:
+            print(f"ok\t{password}")
+    return 1 if found else 0
+
+
+def cmd_breach_vault(args):
+    """Verifica todas as senhas salvas no cofre"""
+    index = BreachIndex(args.index)
+    vault = open_vault(args)
+    leaked = index.check_vault(vault)
+    for entry in leaked:
+        category = f" [{entry['category']}]" if entry.get("category") else ""
+        print(f"🔓 {entry['name']}{category}")
+    print(f"{len(leaked):,} de {len(vault):,} senhas encontradas em vazamentos",
+          file=sys.stderr)
+    return 1 if leaked else 0
+
+
+def cmd_kdf_calibrate(args):
+    """Mede a derivação de chave e sugere (ou aplica) parâmetros"""
+    print("medindo scrypt...", file=sys.stderr)
+    params, elapsed, memory = calibrate(args.target_ms, args.max_memory)
+    print(f"n={params['n']} r={params['r']} p={params['p']}: "
+          f"{elapsed:.0f} ms, {memory:.0f} MB")
+    if args.apply:
+        if needs_new_passphrase(args.key):
+            raise VaultError("Abra o cofre uma vez para definir a senha mestra")
+        change_passphrase(args.key, read_passphrase(args.key), params=params)
+        print(f"parâmetros gravados em {args.key}", file=sys.stderr)
+    return 0
+
+
+def cmd_kdf_passwd(args):
+    """Troca a senha mestra (o cofre não é recifrado)"""
+    if needs_new_passphrase(args.key):
+        raise VaultError("Abra o cofre uma vez para definir a senha mestra")
+    passphrase = read_passphrase(args.key)
+    change_passphrase(args.key, passphrase, ask_new_passphrase())
+    print("senha mestra alterada", file=sys.stderr)
+    return 0
+
+
+def cmd_kdf_rotate(args):
+    """Troca a chave de dados e recifra o cofre"""
+    def progress(offset, total, records, elapsed):
+        rate = records / elapsed if elapsed else 0
+        print_progress(f"{offset / total:6.1%}  {records:,} registros  "
+                       f"{rate:,.0f} registros/s")
+
+    rotation = KeyRotation(args.vault, args.key, read_passphrase(args.key),
+                           args.workers, progress=progress)
+    try:
+        records = rotation.run()
+    except ValueError as e:
+        raise VaultError(str(e))
+    resumed = " (retomada)" if rotation.resumed else ""
+    print(f"\n{records:,} registros recifrados em {rotation.elapsed:.1f}s{resumed}",
+          file=sys.stderr)
+    if rotation.skipped:
+        print(f"{rotation.skipped:,} registros corrompidos copiados como estão", file=sys.stderr)
+    print("Backups antigos usam a chave anterior: exporte um backup novo.",
+          file=sys.stderr)
+    return 0
+
+
+def cmd_kdf_info(args):
+    """Mostra os parâmetros de derivação do arquivo de chave"""
+    if not os.path.exists(args.key):
+        raise VaultError(f"Arquivo de chave não encontrado: {args.key}")
+    doc = read_keystore(args.key)
+    if doc is None:
+        print("chave antiga em texto puro (sem senha mestra)")
+        return 0
+    kdf = doc["kdf"]
+    print(f"{kdf['name']}: n={kdf['n']} r={kdf['r']} p={kdf['p']}, "
+          f"{len(doc['keys'])} chave(s)")
+    return 0
+
+
+def cmd_sync(args):
+    """Troca alterações do cofre com outra máquina"""
+    vault = open_vault(args)
+    if args.dir:
+        sync = DirectorySync(vault, args.dir)
+    else:
+        token = read_token(args.key)
+        if token is None:
+            raise VaultError(f"Token do serviço não encontrado: {token_path(args.key)} "
+                             "(copie o arquivo da máquina do serviço)")
+        sync = ServiceSync(vault, args.url or args.socket, token)
+    received, sent = sync.run()
+    print(f"{received:,} alterações recebidas ({sync.bytes_received / 1024:,.1f} KB), "
+          f"{sent:,} enviadas ({sync.bytes_sent / 1024:,.1f} KB) "
+          f"em {sync.elapsed * 1000:,.0f} ms", file=sys.stderr)
+    return 0
+
+
+def cmd_serve(args):
+    """Serviço local de geração, força e consulta ao cofre"""
+    with_vault = not args.no_vault and (args.socket or args.vault_tcp)
+    if not args.no_vault and not with_vault:
+        print("O cofre só é servido pelo socket Unix (--socket); "
+              "use --vault-tcp para servi-lo em TCP", file=sys.stderr)
+    vault = open_vault(args) if with_vault else None
+    service = Service(vault, args.index)
+    token = load_or_create_token(args.key)
+
+    def ready(where):
+        print(f"Servindo em {where} (Ctrl+C para encerrar)", file=sys.stderr)
+        print(f"Token de acesso em {token_path(args.key)}", file=sys.stderr)
+
+    asyncio.run(serve(service, token, args.host, args.port, args.socket, ready,
+                      vault_over_tcp=args.vault_tcp))
+    return 0
+
+
+def build_parser():
+    """Cria parser de argumentos"""
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Password Generator Pro - modo linha de comando. "
+                    "Sem argumentos, abre a interface gráfica.")
+    parser.add_argument("--vault", default="passwords.enc",
+                        help="arquivo do cofre (padrão: passwords.enc)")
+    parser.add_argument("--key", default=".key",
+                        help="arquivo da chave (padrão: .key)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="gera senhas em lote")
+    gen.add_argument("-n", "--count", type=int, default=1,
+                     help="quantidade de senhas (padrão: 1)")
+    add_charset_arguments(gen)
+    add_policy_arguments(gen)
+    gen.add_argument("-o", "--output",
+                     help="arquivo de saída (padrão: stdout)")
+    gen.add_argument("-w", "--workers", type=int, default=1,
+                     help="processos usados na geração (padrão: 1)")
+    gen.set_defaults(func=cmd_generate)
+
+    phr = commands.add_parser("passphrase", help="gera frases-senha (diceware)")
+    phr.add_argument("-n", "--count", type=int, default=1,
+                     help="quantidade de frases (padrão: 1)")
+    phr.add_argument("-w", "--words", type=int,
+                     help=f"palavras por frase (padrão: o bastante para {TARGET_BITS} "
+                          f"bits; {DEFAULT_WORDS} com a lista padrão)")
+    phr.add_argument("-s", "--separator", default="-",
+                     help="separador entre palavras (padrão: -)")
+    phr.add_argument("--capitalize", choices=CAPITALIZE, default="lower",
+                     help="maiúsculas: lower, title, random ou upper (padrão: lower)")
+    phr.add_argument("--digits", type=int, default=0,
+                     help="algarismos acrescentados a uma palavra (padrão: 0)")
+    phr.add_argument("--wordlist", default=DEFAULT_WORDLIST,
+                     help="lista de palavras (.pgpw ou texto)")
+    phr.add_argument("-o", "--output",
+                     help="arquivo de saída (padrão: stdout)")
+    phr.set_defaults(func=cmd_passphrase)
+
+    wl = commands.add_parser("wordlist", help="listas de palavras para frases-senha")
+    wl_commands = wl.add_subparsers(dest="wordlist_command", required=True)
+    wbuild = wl_commands.add_parser("build", help="converte lista em texto para .pgpw")
+    wbuild.add_argument("source", help="lista em texto (uma palavra por linha ou EFF)")
+    wbuild.add_argument("output", help="arquivo compacto de saída")
+    wbuild.set_defaults(func=cmd_wordlist_build)
+
+    exp = commands.add_parser("export", help="exporta o cofre (backup criptografado)")
+    exp.add_argument("file", help="arquivo de backup")
+    exp.add_argument("--format", choices=("jsonl", "csv"), default="jsonl",
+                     help="formato das entradas (padrão: jsonl)")
+    exp.add_argument("--chunk", type=int, default=1000,
+                     help="entradas por bloco (padrão: 1000)")
+    exp.set_defaults(func=cmd_export)
+
+    imp = commands.add_parser("import", help="importa um backup para o cofre")
+    imp.add_argument("file", help="arquivo de backup")
+    imp.add_argument("--restart", action="store_true",
+                     help="ignora o progresso salvo e importa do início")
+    imp.set_defaults(func=cmd_import)
+
+    aud = commands.add_parser("audit", help="audita a força de uma lista de senhas")
+    aud.add_argument("file", help="arquivo com uma senha por linha")
+    aud.add_argument("--rows", help="grava a pontuação de cada senha (CSV)")
+    aud.add_argument("--json", action="store_true",
+                     help="mostra o relatório em JSON")
+    aud.set_defaults(func=cmd_audit)
+
+    reuse = commands.add_parser("reuse", help="senhas reutilizadas no cofre")
+    reuse.set_defaults(func=cmd_reuse)
+
+    breach = commands.add_parser("breach", help="verificação offline de senhas vazadas")
+    breach.add_argument("--index", default=DEFAULT_INDEX,
+                        help=f"arquivo do índice (padrão: {DEFAULT_INDEX})")
+    breach_commands = breach.add_subparsers(dest="breach_command", required=True)
+
+    bbuild = breach_commands.add_parser("build", help="constrói o índice")
+    bbuild.add_argument("source", help="lista de vazamentos (HASH:contagem por linha)")
+    bbuild.add_argument("--plain", action="store_true",
+                        help="a lista tem senhas em texto, não hashes SHA-1")
+    bbuild.set_defaults(func=cmd_breach_build)
+
+    bcheck = breach_commands.add_parser("check", help="verifica senhas")
+    bcheck.add_argument("passwords", nargs="*",
+                        help="senhas (padrão: uma por linha da entrada)")
+    bcheck.add_argument("-v", "--verbose", action="store_true",
+                        help="mostra também as senhas não encontradas")
+    bcheck.set_defaults(func=cmd_breach_check)
+
+    bvault = breach_commands.add_parser("vault", help="verifica as senhas do cofre")
+    bvault.set_defaults(func=cmd_breach_vault)
+
+    kdf = commands.add_parser("kdf", help="senha mestra e derivação de chave")
+    kdf_commands = kdf.add_subparsers(dest="kdf_command", required=True)
+
+    kcal = kdf_commands.add_parser(
+        "calibrate", help="escolhe parâmetros do scrypt para esta máquina")
+    kcal.add_argument("--target-ms", type=int, default=500,
+                      help="tempo alvo para desbloquear (padrão: 500)")
+    kcal.add_argument("--max-memory", type=int, default=256,
+                      help="memória máxima em MB (padrão: 256)")
+    kcal.add_argument("--apply", action="store_true",
+                      help="grava os parâmetros no arquivo de chave")
+    kcal.set_defaults(func=cmd_kdf_calibrate)
+
+    kpass = kdf_commands.add_parser("passwd", help="troca a senha mestra")
+    kpass.set_defaults(func=cmd_kdf_passwd)
+
+    krot = kdf_commands.add_parser(
+        "rotate", help="gera nova chave de dados e recifra o cofre")
+    krot.add_argument("-w", "--workers", type=int,
+                      help="processos usados (padrão: um por núcleo)")
+    krot.set_defaults(func=cmd_kdf_rotate)
+
+    kinfo = kdf_commands.add_parser("info", help="mostra os parâmetros atuais")
+    kinfo.set_defaults(func=cmd_kdf_info)
+
+    srv = commands.add_parser(
+        "serve", help="serviço local (HTTP/socket Unix) para scripts")
+    srv.add_argument("--host", default="127.0.0.1",
+                     help="endereço TCP (padrão: 127.0.0.1)")
+    srv.add_argument("--port", type=int, default=8765,
+                     help="porta TCP (padrão: 8765)")
+    srv.add_argument("--socket", metavar="CAMINHO",
+                     help="escuta em um socket Unix em vez de TCP")
+    srv.add_argument("--no-vault", action="store_true",
+                     help="não abre o cofre (só geração e força)")
+    srv.add_argument("--vault-tcp", action="store_true",
+                     help="serve o cofre também em TCP (padrão: só no socket Unix)")
+    srv.add_argument("--index", default=DEFAULT_INDEX,
+                     help="índice de vazamentos usado em /strength, se existir")
+    srv.set_defaults(func=cmd_serve)
+
+    syn = commands.add_parser(
+        "sync", help="troca só as alterações do cofre com outra máquina")
+    target = syn.add_mutually_exclusive_group(required=True)
+    target.add_argument("--dir", metavar="CAMINHO",
+                        help="diretório compartilhado entre as máquinas")
+    target.add_argument("--url", help="serviço de outra máquina (http://host:porta)")
+    target.add_argument("--socket", metavar="CAMINHO",
+                        help="serviço em um socket Unix")
+    syn.set_defaults(func=cmd_sync)
+
+    return parser
+
+
+def run(argv):
+    """Executa comando de linha de comando"""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (VaultError, BreachIndexError, WordlistError, SyncError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Saída encerrada antes do fim (ex.: | head)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+    except KeyboardInterrupt:
+        return 130
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import pytest
+from cryptography.fernet import Fernet
+
+from keystore import write_keystore
+from server import Service, serve
+
+TOKEN = "token-de-teste"
+PASSPHRASE = "senha mestra"
+# scrypt barato: os testes não são da derivação de chave
+KDF = {"n": 1 << 10, "r": 8, "p": 1}
+
+
+@pytest.fixture
+def cipher():
+    return Fernet(Fernet.generate_key())
+
+
+@pytest.fixture
+def passphrase():
+    return PASSPHRASE
+
+
+@pytest.fixture
+def key_file(tmp_path):
+    """Arquivo de chave com uma chave de dados, protegida por PASSPHRASE"""
+    path = str(tmp_path / ".key")
+    write_keystore(path, PASSPHRASE, [Fernet.generate_key()], KDF)
+    return path
+
+
+@pytest.fixture
+def entry():
+    """Monta uma entrada do cofre: entry("e1") ou entry("e1", "senha")"""
+    def make(entry_id, password=None):
+        return {"id": entry_id, "name": f"Conta {entry_id}", "category": "Emails",
+                "created": "2024-01-01 10:00", "strength": "Forte",
+                "password": password or f"senha-{entry_id}"}
+    return make
+
+
+@pytest.fixture
+def token():
+    return TOKEN
+
+
+@pytest.fixture
+def service(tmp_path):
+    """Sobe o serviço local (main.py serve) em um socket Unix, em outra thread
+
+    service(vault) devolve o caminho do socket; o token é o da fixture token. O serviço
+    é encerrado no fim do teste.
+    """
+    running = []
+
+    def start(vault=None, breach_path=None):
+        socket_path = str(tmp_path / f"service-{len(running)}.sock")
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        task = loop.create_task(serve(Service(vault, breach_path), TOKEN,
+                                      socket_path=socket_path,
+                                      ready=lambda where: ready.set()))
+
+        def run():
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        running.append((loop, task, thread))
+        assert ready.wait(10)
+        return socket_path
+
+    yield start
+    for loop, task, thread in running:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(10)
+        loop.close()
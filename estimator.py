@@ -0,0 +1,478 @@
+"""Estimativa de força por padrões, no estilo do zxcvbn.
+
+A senha é decomposta em trechos reconhecíveis (palavras de dicionário,
+também invertidas ou com l33t, sequências como "abc"/"321", repetições,
+caminhos no teclado como "qwerty"/"zxcvb", anos e datas) e o restante é
+tratado como força bruta. Uma programação dinâmica escolhe a
+decomposição com menos tentativas. Tudo é calculado em log2, sem montar
+inteiros gigantes, e o resultado de cada senha fica em cache (LRU) para
+que a análise a cada tecla seja instantânea.
+
+Os dicionários ordenados por popularidade (rank) ficam em DICTIONARY_DIR,
+um arquivo por lista (senhas vazadas, palavras em inglês e português,
+nomes, sobrenomes, termos de TV e cinema; as listas em inglês vêm do
+zxcvbn, licença MIT). São lidos uma única vez, no primeiro uso, e
+compartilhados; dicionários extras podem ser carregados com
+load_dictionary().
+"""
+import math
+import os
+import re
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+from generator import SYMBOLS
+
+Match = namedtuple("Match", "pattern i j token bits")
+Estimate = namedtuple("Estimate", "bits matches")
+
+REFERENCE_YEAR = datetime.now().year
+MIN_YEAR_SPACE = 20
+MIN_SUBMATCH_BITS = math.log2(50)
+# Custo de cada trecho a mais na decomposição (aproxima o log2(k!) do zxcvbn)
+MATCH_PENALTY = 1.0
+# Abaixo disto (~18 minutos a 1 bilhão de tentativas/s) a senha é fraca
+WEAK_BITS = 40
+
+# ----- dicionários -----
+
+# Listas ordenadas da mais comum à menos comum, uma palavra por linha
+DICTIONARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dictionaries")
+
+_dictionaries = None
+_extra = {}
+_lookup = None
+
+
+def _ranked(text):
+    """Dicionário palavra -> rank (1 = mais comum)"""
+    ranked = {}
+    for rank, word in enumerate(text.split(), 1):
+        ranked.setdefault(word.lower(), rank)
+    return ranked
+
+
+def _read_ranked(path):
+    with open(path, encoding="utf-8") as f:
+        return _ranked(f.read())
+
+
+def dictionaries():
+    """Dicionários ordenados, lidos uma vez e compartilhados"""
+    global _dictionaries
+    if _dictionaries is None:
+        loaded = {}
+        for name in sorted(os.listdir(DICTIONARY_DIR)):
+            base, ext = os.path.splitext(name)
+            if ext == ".txt":
+                loaded[base] = _read_ranked(os.path.join(DICTIONARY_DIR, name))
+        loaded.update(_extra)
+        _dictionaries = loaded
+    return _dictionaries
+
+
+def lookup():
+    """Tabela única de busca: (palavra -> bits, palavras em ordem)
+
+    Junta todos os dicionários, já com as palavras invertidas, guardando o
+    menor custo de cada uma. A lista ordenada funciona como uma trie (ver
+    _is_prefix): a busca a partir de uma posição para assim que o trecho
+    deixa de ser prefixo de alguma palavra. Com as listas inteiras, um
+    conjunto com todos os prefixos ocuparia o dobro da memória.
+    """
+    global _lookup
+    if _lookup is None:
+        words = {}
+        for ranked in dictionaries().values():
+            for word, rank in ranked.items():
+                bits = math.log2(rank)
+                if bits < words.get(word, math.inf):
+                    words[word] = bits
+                # Palavra invertida custa 1 bit a mais
+                reverse = word[::-1]
+                if bits + 1 < words.get(reverse, math.inf):
+                    words[reverse] = bits + 1
+        _lookup = (words, sorted(words))
+    return _lookup
+
+
+def _is_prefix(keys, text):
+    """True se text é prefixo de alguma palavra da lista ordenada keys"""
+    i = bisect_left(keys, text)
+    return i < len(keys) and keys[i].startswith(text)
+
+
+def load_dictionary(name, path):
+    """Carrega lista extra (uma palavra por linha, da mais comum à menos)"""
+    global _lookup
+    ranked = _read_ranked(path)
+    _extra[name] = ranked
+    if _dictionaries is not None:
+        _dictionaries[name] = ranked
+    _lookup = None
+    estimate.cache_clear()
+    return len(ranked)
+
+
+# ----- teclado -----
+
+KEYBOARD_ROWS = ["`1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./"]
+KEYBOARD_SHIFTED = ["~!@#$%^&*()_+", "QWERTYUIOP{}|", 'ASDFGHJKL:"', "ZXCVBNM<>?"]
+# Vizinhos em um teclado inclinado: esquerda, direita, cima, cima-direita,
+# baixo-esquerda, baixo
+NEIGHBOR_OFFSETS = [(0, -1), (0, 1), (-1, 0), (-1, 1), (1, -1), (1, 0)]
+
+
+def _keyboard():
+    """Posições das teclas e grau médio do grafo de adjacência"""
+    positions = {}
+    shifted = set()
+    for r, (row, shift_row) in enumerate(zip(KEYBOARD_ROWS, KEYBOARD_SHIFTED)):
+        for c, (key, shift_key) in enumerate(zip(row, shift_row)):
+            positions[key] = (r, c)
+            positions[shift_key] = (r, c)
+            shifted.add(shift_key)
+    occupied = {pos for pos in positions.values()}
+    degrees = [sum((r + dr, c + dc) in occupied for dr, dc in NEIGHBOR_OFFSETS)
+               for r, c in occupied]
+    return positions, shifted, sum(degrees) / len(degrees)
+
+
+KEY_POSITIONS, SHIFTED_KEYS, KEYBOARD_DEGREE = _keyboard()
+KEYBOARD_STARTS = len(KEY_POSITIONS)
+
+# ----- l33t -----
+
+L33T_TABLES = [
+    str.maketrans("4@8(3610$57+2|!", "aabcegiossttzii"),
+    str.maketrans("4@8(3610$57+2|!", "aabceglossttzll"),
+]
+L33T_CHARS = set("4@8(3610$57+2|!")
+
+# ----- combinatória -----
+
+
+def _log2_sum_comb(n, up_to):
+    """log2 da soma de C(n, i) para i = 1..up_to"""
+    return math.log2(sum(math.comb(n, i) for i in range(1, up_to + 1)))
+
+
+def _uppercase_bits(token):
+    """Bits extras pelas variações de maiúsculas"""
+    if token.islower() or not any(c.isalpha() for c in token):
+        return 0.0
+    if (token[0].isupper() and token[1:].islower()) or token.isupper() \
+            or (token[-1].isupper() and token[:-1].islower()):
+        return 1.0
+    upper = sum(c.isupper() for c in token)
+    lower = sum(c.islower() for c in token)
+    return _log2_sum_comb(upper + lower, min(upper, lower))
+
+
+def _l33t_bits(token, normalized):
+    """Bits extras pelas substituições l33t usadas"""
+    bits = 0.0
+    lowered = token.lower()
+    for sub in {c for c in token if c in L33T_CHARS}:
+        letter = normalized[lowered.index(sub)]
+        subbed = token.count(sub)
+        unsubbed = lowered.count(letter)
+        if unsubbed == 0:
+            bits += 1.0
+        else:
+            bits += _log2_sum_comb(subbed + unsubbed, min(subbed, unsubbed))
+    return bits
+
+
+# ----- detectores -----
+
+
+def _dictionary_matches(password):
+    words, keys = lookup()
+    lowered = password.lower()
+    n = len(password)
+    variants = [lowered]
+    if any(c in L33T_CHARS for c in lowered):
+        variants += {lowered.translate(table) for table in L33T_TABLES}
+    matches = []
+    for text in variants:
+        l33t = text is not lowered
+        for i in range(n):
+            for j in range(i + 1, n + 1):
+                word = text[i:j]
+                if not _is_prefix(keys, word):
+                    break
+                found = words.get(word)
+                if found is None or j - i < 3:
+                    continue
+                token = password[i:j]
+                if l33t and word == lowered[i:j]:
+                    continue
+                bits = found + _uppercase_bits(token)
+                if l33t:
+                    bits += _l33t_bits(token, word)
+                matches.append(Match("dicionário", i, j, token,
+                                     max(bits, MIN_SUBMATCH_BITS)))
+    return matches
+
+
+def _sequence_matches(password):
+    matches = []
+    n = len(password)
+    i = 0
+    while i < n - 2:
+        delta = ord(password[i + 1]) - ord(password[i])
+        j = i + 1
+        if abs(delta) == 1:
+            while (j + 1 < n and ord(password[j + 1]) - ord(password[j]) == delta
+                   and _same_class(password[j], password[j + 1])):
+                j += 1
+        if j - i + 1 >= 3 and _same_class(password[i], password[i + 1]):
+            token = password[i:j + 1]
+            first = token[0]
+            if first in "aAzZ019":
+                base = 4
+            elif first.isdigit():
+                base = 10
+            else:
+                base = 26
+            if delta < 0:
+                base *= 2
+            bits = math.log2(base * len(token))
+            matches.append(Match("sequência", i, j + 1, token,
+                                 max(bits, MIN_SUBMATCH_BITS)))
+            i = j
+        else:
+            i += 1
+    return matches
+
+
+def _same_class(a, b):
+    return (a.isdigit() and b.isdigit()) or (a.islower() and b.islower()) \
+        or (a.isupper() and b.isupper())
+
+
+REPEAT = re.compile(r"(.+?)\1+")
+
+
+def _repeat_matches(password):
+    matches = []
+    for m in REPEAT.finditer(password):
+        base = m.group(1)
+        count = len(m.group(0)) // len(base)
+        bits = estimate(base).bits + math.log2(count)
+        matches.append(Match("repetição", m.start(), m.end(), m.group(0),
+                             max(bits, MIN_SUBMATCH_BITS)))
+    return matches
+
+
+def _log2_sum(terms):
+    """log2 da soma de 2**t para t em terms, sem sair do log2"""
+    top = max(terms)
+    return top + math.log2(sum(2.0 ** (t - top) for t in terms))
+
+
+def _spatial_bits(length, turns, shifted, unshifted):
+    """Tentativas de um caminho no teclado (fórmula do zxcvbn)
+
+    A soma do zxcvbn, de C(i-1, j-1) * STARTS * DEGREE**j para i até length
+    e j até min(turns, i-1), é feita em log2: DEGREE**j não cabe em float
+    em caminhos longos. Somando primeiro em i, C(i-1, j-1) vira
+    C(length, j) - 1.
+    """
+    start_bits = math.log2(KEYBOARD_STARTS)
+    degree_bits = math.log2(KEYBOARD_DEGREE)
+    bits = _log2_sum([math.log2(math.comb(length, j) - 1) + start_bits + j * degree_bits
+                      for j in range(1, min(turns, length - 1) + 1)])
+    if shifted and unshifted:
+        bits += _log2_sum_comb(shifted + unshifted, min(shifted, unshifted))
+    elif shifted:
+        bits += 1.0
+    return bits
+
+
+def _spatial_matches(password):
+    matches = []
+    n = len(password)
+    i = 0
+    while i < n - 2:
+        j = i
+        turns = 0
+        last_direction = None
+        while j + 1 < n:
+            a = KEY_POSITIONS.get(password[j])
+            b = KEY_POSITIONS.get(password[j + 1])
+            if a is None or b is None:
+                break
+            direction = (b[0] - a[0], b[1] - a[1])
+            if direction not in NEIGHBOR_OFFSETS:
+                break
+            if direction != last_direction:
+                turns += 1
+                last_direction = direction
+            j += 1
+        length = j - i + 1
+        if length >= 3:
+            token = password[i:j + 1]
+            shifted = sum(c in SHIFTED_KEYS for c in token)
+            bits = _spatial_bits(length, turns, shifted, length - shifted)
+            matches.append(Match("teclado", i, j + 1, token,
+                                 max(bits, MIN_SUBMATCH_BITS)))
+            i = j
+        else:
+            i += 1
+    return matches
+
+
+YEAR = re.compile(r"(?<!\d)(?=((?:19|20)\d\d))")
+DATE_SEPARATED = re.compile(r"(?=((\d{1,4})([\s/\\_.-])(\d{1,2})\3(\d{1,4})))")
+DIGITS = re.compile(r"\d{4,8}")
+
+
+def _year_bits(year):
+    return math.log2(max(abs(year - REFERENCE_YEAR), MIN_YEAR_SPACE))
+
+
+def _valid_date(a, b, c):
+    """Ano da data (d/m/a, m/d/a ou a/m/d) se válida, senão None"""
+    for day, month, year in ((a, b, c), (b, a, c), (c, b, a)):
+        if year < 100:
+            year += 1900 if year > 50 else 2000
+        if 1 <= day <= 31 and 1 <= month <= 12 and 1900 <= year <= 2099:
+            return year
+    return None
+
+
+def _date_matches(password):
+    matches = []
+    for m in YEAR.finditer(password):
+        token = m.group(1)
+        matches.append(Match("ano", m.start(), m.start() + 4, token,
+                             max(_year_bits(int(token)), MIN_SUBMATCH_BITS)))
+    for m in DATE_SEPARATED.finditer(password):
+        token, a, _, b, c = m.groups()
+        year = _valid_date(int(a), int(b), int(c))
+        if year is not None:
+            bits = math.log2(365) + _year_bits(year) + 2
+            matches.append(Match("data", m.start(), m.start() + len(token), token, bits))
+    for m in DIGITS.finditer(password):
+        digits = m.group(0)
+        for i in range(len(digits)):
+            for j in range(i + 4, min(len(digits), i + 8) + 1):
+                token = digits[i:j]
+                for split in _date_splits(token):
+                    year = _valid_date(*split)
+                    if year is not None:
+                        bits = math.log2(365) + _year_bits(year)
+                        matches.append(Match("data", m.start() + i, m.start() + j,
+                                             token, bits))
+                        break
+    return matches
+
+
+def _date_splits(token):
+    """Divisões possíveis de dígitos em (a, b, c)"""
+    n = len(token)
+    splits = []
+    for k in range(1, n - 1):
+        for m in range(k + 1, n):
+            parts = token[:k], token[k:m], token[m:]
+            if all(len(p) <= 4 for p in parts) and (len(parts[0]) == 4 or len(parts[2]) in (2, 4)):
+                splits.append(tuple(int(p) for p in parts))
+    return splits
+
+
+# ----- estimativa -----
+
+
+def _bruteforce_bits(password):
+    """Bits por caractere de força bruta, pelo conjunto de caracteres usado"""
+    size = 0
+    if any(c.islower() for c in password):
+        size += 26
+    if any(c.isupper() for c in password):
+        size += 26
+    if any(c.isdigit() for c in password):
+        size += 10
+    if any(c in SYMBOLS for c in password):
+        size += 33
+    if any(not c.isalnum() and c not in SYMBOLS for c in password):
+        size += 33
+    return math.log2(max(size, 10))
+
+
+@lru_cache(maxsize=4096)
+def estimate(password):
+    """Estimativa (bits, trechos) da senha, em log2 de tentativas"""
+    n = len(password)
+    if n == 0:
+        return Estimate(0.0, ())
+
+    ends = [[] for _ in range(n + 1)]
+    for detector in (_dictionary_matches, _sequence_matches, _spatial_matches,
+                     _date_matches):
+        for match in detector(password):
+            ends[match.j].append(match)
+    if n > 1:
+        for match in _repeat_matches(password):
+            if match.j - match.i < n:
+                ends[match.j].append(match)
+        # Repetição da senha inteira (ex.: "abcabc") também é candidata
+        whole = REPEAT.fullmatch(password)
+        if whole and len(whole.group(1)) < n:
+            count = n // len(whole.group(1))
+            bits = estimate(whole.group(1)).bits + math.log2(count)
+            ends[n].append(Match("repetição", 0, n, password, bits))
+
+    brute = _bruteforce_bits(password)
+    inf = float("inf")
+    # after_match[j]: melhor custo cobrindo [0, j) terminando em trecho
+    # in_brute[j]: melhor custo cobrindo [0, j) terminando em força bruta
+    after_match = [inf] * (n + 1)
+    in_brute = [inf] * (n + 1)
+    back_match = [None] * (n + 1)
+    back_brute = [None] * (n + 1)
+    after_match[0] = 0.0
+    for j in range(1, n + 1):
+        start_run = after_match[j - 1] + MATCH_PENALTY
+        if start_run <= in_brute[j - 1]:
+            in_brute[j] = start_run + brute
+            back_brute[j] = "start"
+        else:
+            in_brute[j] = in_brute[j - 1] + brute
+            back_brute[j] = "extend"
+        for match in ends[j]:
+            prev = min(after_match[match.i], in_brute[match.i])
+            cost = prev + match.bits + MATCH_PENALTY
+            if cost < after_match[j]:
+                after_match[j] = cost
+                back_match[j] = match
+
+    # Reconstrói a decomposição escolhida
+    matches = []
+    j = n
+    state = "match" if after_match[n] <= in_brute[n] else "brute"
+    bits = min(after_match[n], in_brute[n]) - MATCH_PENALTY
+    while j > 0:
+        if state == "match":
+            match = back_match[j]
+            matches.append(match)
+            j = match.i
+            state = "match" if after_match[j] <= in_brute[j] else "brute"
+        else:
+            end = j
+            while back_brute[j] == "extend":
+                j -= 1
+            j -= 1
+            token = password[j:end]
+            matches.append(Match("força bruta", j, end, token, brute * len(token)))
+            state = "match"
+    matches.reverse()
+    return Estimate(max(bits, 0.0), tuple(matches))
+
+
+def crack_seconds_log2(bits, attempts_per_sec=1_000_000_000):
+    """log2 dos segundos para testar 2**bits tentativas"""
+    return bits - math.log2(attempts_per_sec)
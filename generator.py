@@ -0,0 +1,507 @@
+"""Geração de senhas em lote, independente da interface gráfica.
+
+As senhas são montadas a partir de blocos grandes de bytes do CSPRNG do
+sistema (``os.urandom``). Cada byte é mapeado para o conjunto de caracteres
+com ``bytes.translate`` e os bytes que causariam viés de módulo são
+descartados (amostragem por rejeição), tudo em código C, sem laço Python
+por caractere.
+
+Políticas (Policy) são atendidas na construção, sem gerar de novo até
+passar: cada senha recebe um arranjo aleatório de posições reservadas às
+classes obrigatórias, cada classe é sorteada do seu próprio alfabeto e as
+partes são combinadas com máscaras de bytes. As raras senhas que violam
+repetições ou trechos proibidos são corrigidas trocando só os caracteres
+problemáticos por outros permitidos.
+"""
+import math
+import os
+import re
+import secrets
+import string
+import time
+from collections import deque
+from itertools import combinations
+
+SYMBOLS = "!@#$%^&*()_+-=[]{}|;:,.<>?"
+AMBIGUOUS = "0Ol1"
+
+# Quantidade aproximada de caracteres produzidos por bloco
+BLOCK_SIZE = 1 << 16
+
+# Senhas por tarefa enviada a um processo no modo paralelo
+SHARD_SIZE = 100_000
+
+# Acima desta quantidade de arranjos de classes, cada arranjo é sorteado
+# individualmente em vez de consultado em tabela
+MAX_LAYOUTS = 1 << 16
+
+# Arranjos sorteados para uma senha que não dá para corrigir no arranjo
+# original, antes de considerar a política impossível
+REPAIR_ATTEMPTS = 100
+
+POLICY_CLASSES = (("upper", string.ascii_uppercase),
+                  ("lower", string.ascii_lowercase),
+                  ("digits", string.digits),
+                  ("symbols", SYMBOLS))
+
+
+def build_charset(uppercase=True, lowercase=True, digits=True, symbols=True,
+                  exclude_ambiguous=True):
+    """Monta conjunto de caracteres com base nas opções"""
+    chars = ""
+    if uppercase:
+        chars += string.ascii_uppercase
+    if lowercase:
+        chars += string.ascii_lowercase
+    if digits:
+        chars += string.digits
+    if symbols:
+        chars += SYMBOLS
+
+    if exclude_ambiguous:
+        chars = ''.join(c for c in chars if c not in AMBIGUOUS)
+    return chars
+
+
+class BatchGenerator:
+    """Gera senhas em lote sem viés a partir de blocos de bytes aleatórios"""
+
+    def __init__(self, charset, length, block_size=BLOCK_SIZE):
+        # Remove duplicados mantendo a ordem, para não favorecer caracteres
+        charset = ''.join(dict.fromkeys(charset))
+        if not charset:
+            raise ValueError("Conjunto de caracteres vazio")
+        if length < 1:
+            raise ValueError("Comprimento deve ser positivo")
+        try:
+            alphabet = charset.encode('ascii')
+        except UnicodeEncodeError:
+            raise ValueError("Conjunto de caracteres deve ser ASCII")
+
+        self.charset = charset
+        self.length = length
+        self.block_size = block_size
+
+        # Bytes >= limit são rejeitados: 256 - limit sobraria no módulo
+        size = len(alphabet)
+        limit = 256 - 256 % size
+        self._table = bytes(alphabet[b % size] for b in range(256))
+        self._reject = bytes(range(limit, 256))
+        self._accept_ratio = limit / 256
+        self._per_block = max(1, block_size // length)
+
+    def _draw(self, nchars):
+        """Retorna exatamente nchars caracteres aceitos"""
+        parts = []
+        missing = nchars
+        while missing > 0:
+            # Sorteia um pouco a mais para raramente precisar de outra volta
+            raw = os.urandom(int(missing / self._accept_ratio * 1.05) + 64)
+            chunk = raw.translate(self._table, self._reject)
+            parts.append(chunk[:missing])
+            missing -= len(parts[-1])
+        return parts[0] if len(parts) == 1 else b"".join(parts)
+
+    def iter_raw(self, count):
+        """Gera blocos de bytes com senhas concatenadas (length bytes cada)"""
+        while count > 0:
+            batch = min(count, self._per_block)
+            yield self._draw(batch * self.length)
+            count -= batch
+
+    def iter_lines(self, count, newline=b"\n"):
+        """Gera blocos de bytes com uma senha por linha"""
+        length = self.length
+        for raw in self.iter_raw(count):
+            yield newline.join(raw[i:i + length]
+                               for i in range(0, len(raw), length)) + newline
+
+    def generate(self, count):
+        """Retorna lista com count senhas"""
+        length = self.length
+        passwords = []
+        for raw in self.iter_raw(count):
+            text = raw.decode('ascii')
+            passwords.extend(text[i:i + length]
+                             for i in range(0, len(text), length))
+        return passwords
+
+    def generate_one(self):
+        """Retorna uma única senha"""
+        return self._draw(self.length).decode('ascii')
+
+    def write(self, out, count):
+        """Escreve count senhas (uma por linha) em um arquivo binário"""
+        for block in self.iter_lines(count):
+            out.write(block)
+        out.flush()
+
+
+class Policy:
+    """Regras declarativas de senha
+
+    min_counts: mínimo por classe ("upper", "lower", "digits", "symbols").
+    max_repeat: máximo de caracteres iguais seguidos (None = sem limite).
+    forbidden: trechos que não podem aparecer (sem diferenciar maiúsculas).
+    charset: conjunto personalizado (padrão: build_charset()).
+    """
+
+    def __init__(self, length=16, charset=None, min_counts=None,
+                 max_repeat=None, forbidden=()):
+        self.length = length
+        self.charset = build_charset() if charset is None else charset
+        self.min_counts = {name: count for name, count in (min_counts or {}).items()
+                           if count}
+        self.max_repeat = max_repeat
+        self.forbidden = tuple(f for f in forbidden if f)
+
+        unknown = set(self.min_counts) - {name for name, _ in POLICY_CLASSES}
+        if unknown:
+            raise ValueError(f"Classe desconhecida: {', '.join(sorted(unknown))}")
+        if sum(self.min_counts.values()) > length:
+            raise ValueError("Mínimos por classe excedem o comprimento")
+        if max_repeat is not None and max_repeat < 1:
+            raise ValueError("Máximo de repetições deve ser positivo")
+
+    @classmethod
+    def covering(cls, charset, length):
+        """Política com ao menos um caractere de cada classe presente no conjunto"""
+        return cls(length, charset,
+                   {name: 1 for name, chars in POLICY_CLASSES
+                    if any(c in chars for c in charset)})
+
+
+def _layouts(length, required):
+    """Todos os arranjos (bytes de códigos de classe) das posições obrigatórias"""
+    layouts = []
+
+    def place(layout, free, rest):
+        if not rest:
+            layouts.append(bytes(layout))
+            return
+        code, count = rest[0]
+        for positions in combinations(free, count):
+            for p in positions:
+                layout[p] = code
+            chosen = set(positions)
+            place(layout, [p for p in free if p not in chosen], rest[1:])
+            for p in positions:
+                layout[p] = 0
+
+    place(bytearray(length), list(range(length)), required)
+    return layouts
+
+
+class PolicyGenerator:
+    """Gera senhas em lote que sempre atendem a uma Policy"""
+
+    def __init__(self, policy, block_size=BLOCK_SIZE):
+        self.policy = policy
+        self.length = length = policy.length
+        forbidden = [f.lower() for f in policy.forbidden]
+        # Trecho proibido de um caractere: basta tirá-lo dos alfabetos
+        banned = {f for f in forbidden if len(f) == 1}
+        charset = ''.join(c for c in dict.fromkeys(policy.charset)
+                          if c.lower() not in banned)
+        self._any = BatchGenerator(charset, 1, block_size)
+
+        # Código 0 = posição livre; 1.. = classes obrigatórias
+        self._alphabets = {0: charset.encode('ascii')}
+        self._classes = []
+        required = []
+        for code, (name, chars) in enumerate(POLICY_CLASSES, 1):
+            count = policy.min_counts.get(name, 0)
+            if not count:
+                continue
+            alphabet = ''.join(c for c in charset if c in chars)
+            if not alphabet:
+                raise ValueError(f"Conjunto de caracteres sem a classe exigida: {name}")
+            self._alphabets[code] = alphabet.encode('ascii')
+            mask = bytes(0xFF if b == code else 0 for b in range(256))
+            self._classes.append((BatchGenerator(alphabet, 1, block_size), mask))
+            required.append((code, count))
+
+        self._required = required
+        self._canonical = [code for code, count in required for _ in range(count)]
+        self._canonical += [0] * (length - len(self._canonical))
+        arrangements = math.factorial(length)
+        for _, count in required:
+            arrangements //= math.factorial(count)
+        arrangements //= math.factorial(length - sum(c for _, c in required))
+        self._arrangements = arrangements
+        self._layout_table = None
+        self._per_block = max(1, block_size // length)
+
+        self._forbidden = [f.encode() for f in forbidden if len(f) > 1]
+        self._forbidden_re = (re.compile(b"|".join(map(re.escape, self._forbidden)))
+                              if self._forbidden else None)
+
+    def _draw_layouts(self, count):
+        """Arranjos de classes de count senhas, concatenados"""
+        if not self._required:
+            return None
+        if self._arrangements > MAX_LAYOUTS:
+            return self._sample_layouts(count)
+
+        if self._layout_table is None:
+            self._layout_table = _layouts(self.length, self._required)
+        table = self._layout_table
+        size = len(table)
+        # Índices uniformes em [0, size) por rejeição de palavras de 32 bits
+        limit = (1 << 32) - (1 << 32) % size
+        indices = []
+        while len(indices) < count:
+            words = memoryview(os.urandom(4 * (count - len(indices)) + 64)).cast("I")
+            indices.extend(map(size.__rmod__, filter(limit.__gt__, words)))
+        return b"".join(map(table.__getitem__, indices[:count]))
+
+    def _sample_layouts(self, count):
+        """Sorteia cada arranjo escolhendo posições distintas (Fisher-Yates parcial)"""
+        length = self.length
+        codes = [code for code in self._canonical if code]
+        # Inteiros aleatórios de 8 ou 16 bits, aceitos por rejeição
+        fmt, bits = ("B", 8) if length <= 256 else ("H", 16)
+        limits = [(1 << bits) - (1 << bits) % (length - j) for j in range(len(codes))]
+        words = iter(())
+        layouts = bytearray(count * length)
+        for n in range(count):
+            positions = list(range(length))
+            base = n * length
+            for j, code in enumerate(codes):
+                for r in words:
+                    if r < limits[j]:
+                        break
+                else:
+                    words = iter(memoryview(os.urandom(count * len(codes) * 2 + 64)).cast(fmt))
+                    r = next(words)
+                    while r >= limits[j]:
+                        r = next(words)
+                k = j + r % (length - j)
+                positions[j], positions[k] = positions[k], positions[j]
+                layouts[base + positions[j]] = code
+        return bytes(layouts)
+
+    def _excluded(self, chars, i):
+        """Caracteres que, na posição i, violariam repetições ou trechos proibidos"""
+        excluded = set()
+        repeat = self.policy.max_repeat
+        if repeat is not None and i >= repeat:
+            previous = chars[i - repeat:i]
+            if previous.count(previous[0]) == repeat:
+                excluded.add(previous[0])
+        for word in self._forbidden:
+            start = i + 1 - len(word)
+            if start >= 0 and bytes(chars[start:i]).lower() == word[:-1]:
+                excluded.update(bytes([word[-1]]) + bytes([word[-1]]).upper())
+        return excluded
+
+    def _repair(self, password, layout):
+        """Troca só os caracteres que violam a política, mantendo a classe
+
+        Se numa posição nenhum caractere da classe serve (ex.: dígitos
+        vizinhos com max_repeat=1 e um só dígito no conjunto), sorteia
+        outro arranjo e outra senha; a política só é considerada
+        impossível depois de REPAIR_ATTEMPTS arranjos.
+        """
+        for _ in range(REPAIR_ATTEMPTS):
+            repaired = self._repair_layout(password, layout)
+            if repaired is not None:
+                return repaired
+            password, layout = self._build(1)
+        raise ValueError("Política impossível de atender")
+
+    def _repair_layout(self, password, layout):
+        """Corrige a senha sem mudar o arranjo (None se não houver como)"""
+        chars = bytearray(password)
+        for i, c in enumerate(chars):
+            excluded = self._excluded(chars, i)
+            if c not in excluded:
+                continue
+            alphabet = self._alphabets[layout[i] if layout else 0]
+            allowed = [a for a in alphabet if a not in excluded]
+            if not allowed:
+                return None
+            chars[i] = allowed[secrets.randbelow(len(allowed))]
+        return bytes(chars)
+
+    def _violations(self, block, stride):
+        """Índices das senhas do bloco que violam a política"""
+        bad = set()
+        repeat = self.policy.max_repeat
+        if repeat is not None:
+            # Bytes nulos em a ^ (a deslocado) marcam vizinhos iguais
+            diff = (int.from_bytes(block[:-1], "big")
+                    ^ int.from_bytes(block[1:], "big")).to_bytes(len(block) - 1, "big")
+            run = b"\0" * repeat
+            i = diff.find(run)
+            while i != -1:
+                bad.add(i // stride)
+                i = diff.find(run, (i // stride + 1) * stride)
+        if self._forbidden_re is not None:
+            bad.update(m.start() // stride
+                       for m in self._forbidden_re.finditer(block.lower()))
+        return bad
+
+    def _build(self, count):
+        """count senhas concatenadas (length bytes cada)"""
+        nchars = count * self.length
+        raw = self._any._draw(nchars)
+        layouts = self._draw_layouts(count)
+        if layouts is not None:
+            # Em cada posição reservada, troca o caractere livre pelo da classe
+            merged = int.from_bytes(raw, "big")
+            for generator, mask in self._classes:
+                chosen = int.from_bytes(layouts.translate(mask), "big")
+                drawn = int.from_bytes(generator._draw(nchars), "big")
+                merged ^= (merged ^ drawn) & chosen
+            raw = merged.to_bytes(nchars, "big")
+        return raw, layouts
+
+    def iter_lines(self, count, newline=b"\n"):
+        """Gera blocos de bytes com uma senha por linha"""
+        length = self.length
+        while count > 0:
+            batch = min(count, self._per_block)
+            raw, layouts = self._build(batch)
+            block = newline.join(raw[i:i + length]
+                                 for i in range(0, len(raw), length)) + newline
+            if self.policy.max_repeat is not None or self._forbidden:
+                block = self._fix(block, layouts, len(newline))
+            yield block
+            count -= batch
+
+    def _fix(self, block, layouts, sep):
+        """Corrige as senhas do bloco que violam a política"""
+        length = self.length
+        stride = length + sep
+        bad = self._violations(block, stride)
+        if not bad:
+            return block
+        block = bytearray(block)
+        for n in bad:
+            start = n * stride
+            layout = layouts[n * length:(n + 1) * length] if layouts else None
+            block[start:start + length] = self._repair(block[start:start + length],
+                                                       layout)
+        return bytes(block)
+
+    def generate(self, count):
+        """Retorna lista com count senhas"""
+        passwords = []
+        for block in self.iter_lines(count):
+            passwords.extend(block.decode('ascii').split("\n")[:-1])
+        return passwords
+
+    def generate_one(self):
+        """Retorna uma única senha"""
+        return self.generate(1)[0]
+
+    def write(self, out, count):
+        """Escreve count senhas (uma por linha) em um arquivo binário"""
+        for block in self.iter_lines(count):
+            out.write(block)
+        out.flush()
+
+
+def generate_passwords(count, length=16, charset=None):
+    """Atalho para gerar count senhas com o conjunto padrão"""
+    if charset is None:
+        charset = build_charset()
+    return BatchGenerator(charset, length).generate(count)
+
+
+_worker_generator = None
+
+
+def _init_worker(charset, length, policy=None):
+    """Cria o gerador do processo (o os.urandom de cada processo é independente)"""
+    global _worker_generator
+    if policy is not None:
+        _worker_generator = PolicyGenerator(policy)
+    else:
+        _worker_generator = BatchGenerator(charset, length)
+
+
+def _generate_shard(count):
+    """Gera um lote no processo trabalhador"""
+    start = time.perf_counter()
+    data = b"".join(_worker_generator.iter_lines(count))
+    return os.getpid(), count, time.perf_counter() - start, data
+
+
+class ParallelGenerator:
+    """Distribui a geração em lote entre vários processos
+
+    Os lotes são devolvidos na ordem em que foram pedidos e no máximo
+    max_pending lotes ficam em andamento ao mesmo tempo, de modo que a
+    memória usada não depende da quantidade total de senhas.
+    """
+
+    def __init__(self, charset, length, workers, shard_size=SHARD_SIZE,
+                 max_pending=None, policy=None):
+        # Valida a configuração antes de criar processos
+        if policy is not None:
+            PolicyGenerator(policy)
+            charset, length = policy.charset, policy.length
+        else:
+            BatchGenerator(charset, length)
+        if workers < 1:
+            raise ValueError("Quantidade de processos deve ser positiva")
+        self.charset = charset
+        self.length = length
+        self.policy = policy
+        self.workers = workers
+        self.shard_size = shard_size
+        self.max_pending = max_pending or workers * 2
+        self.worker_stats = {}
+        self.total = 0
+        self.elapsed = 0.0
+
+    def iter_lines(self, count):
+        """Gera blocos de bytes com uma senha por linha, em ordem"""
+        # Importado aqui: multiprocessing é pesado e só serve a este modo
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.worker_stats = {}
+        self.total = 0
+        start = time.perf_counter()
+        pending = deque()
+        remaining = count
+
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                 initargs=(self.charset, self.length,
+                                           self.policy)) as pool:
+            while remaining > 0 or pending:
+                # Mantém a fila cheia, mas limitada (contrapressão)
+                while remaining > 0 and len(pending) < self.max_pending:
+                    shard = min(remaining, self.shard_size)
+                    pending.append(pool.submit(_generate_shard, shard))
+                    remaining -= shard
+
+                pid, done, seconds, data = pending.popleft().result()
+                stats = self.worker_stats.setdefault(
+                    pid, {"passwords": 0, "seconds": 0.0, "shards": 0})
+                stats["passwords"] += done
+                stats["seconds"] += seconds
+                stats["shards"] += 1
+                self.total += done
+                self.elapsed = time.perf_counter() - start
+                yield data
+
+    def write(self, out, count):
+        """Escreve count senhas (uma por linha) em um arquivo binário"""
+        for block in self.iter_lines(count):
+            out.write(block)
+        out.flush()
+
+    def report(self):
+        """Retorna linhas com a vazão por processo e total"""
+        lines = []
+        for pid, stats in sorted(self.worker_stats.items()):
+            rate = stats["passwords"] / stats["seconds"] if stats["seconds"] else 0
+            lines.append(f"processo {pid}: {stats['passwords']:,} senhas em "
+                         f"{stats['shards']} lotes, {rate:,.0f} senhas/s")
+        rate = self.total / self.elapsed if self.elapsed else 0
+        lines.append(f"total: {self.total:,} senhas em {self.elapsed:.2f} s, "
+                     f"{rate:,.0f} senhas/s com {self.workers} processos")
+        return lines
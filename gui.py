@@ -0,0 +1,1052 @@
+"""Interface gráfica (Tk), aberta por main.py quando não há argumentos"""
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext, simpledialog, filedialog
+import sys
+import os
+import time
+from datetime import datetime
+from collections import OrderedDict
+from functools import lru_cache
+import metrics
+from generator import Policy, PolicyGenerator, build_charset
+from passphrase import DEFAULT_WORDS, PassphraseGenerator, Wordlist, WordlistError
+from strength import calculate_strength, char_classes, charset_size, entropy_bits
+from estimator import WEAK_BITS, crack_seconds_log2, estimate
+from breach import DEFAULT_INDEX, BreachIndex, BreachIndexError
+from keystore import KeySession, WrongPassphrase
+from vault import Vault, VaultError
+from widgets import VirtualListbox
+from worker import TaskRunner
+
+# Análise ao digitar: espera entre teclas e resultados guardados
+ANALYSIS_DELAY_MS = 120
+ANALYSIS_CACHE_SIZE = 256
+# Intervalo de verificação do bloqueio por inatividade
+IDLE_CHECK_MS = 10_000
+# Atualização da aba de diagnóstico enquanto está aberta
+DIAGNOSTICS_REFRESH_MS = 1000
+
+
+@lru_cache(maxsize=16)
+def covering_generator(chars, length):
+    """Gerador com ao menos um caractere de cada classe (um por configuração)"""
+    return PolicyGenerator(Policy.covering(chars, length))
+
+
+def copy_to_clipboard(text):
+    """Copia texto para o clipboard (pyperclip é importado no primeiro uso)"""
+    import pyperclip
+    pyperclip.copy(text)
+
+
+class PasswordGeneratorPro:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("🔐 Password Generator Pro")
+        self.root.geometry("800x700")
+        self.root.configure(bg="#0f0f1e")
+        self.root.resizable(False, False)
+        
+        # Configurações
+        self.config_file = "passwords.enc"
+        self.key_file = ".key"
+        self.breach_file = DEFAULT_INDEX
+        self.breach_index = None
+        # Chave e cofre são abertos no primeiro uso, na thread de E/S; a
+        # chave derivada da senha mestra fica na sessão até a inatividade
+        self.session = KeySession(self.key_file)
+        self.pending_unlock = []
+        self.cipher = None
+        self.vault = None
+        
+        # Variáveis
+        self.length_var = tk.IntVar(value=16)
+        self.use_uppercase = tk.BooleanVar(value=True)
+        self.use_lowercase = tk.BooleanVar(value=True)
+        self.use_digits = tk.BooleanVar(value=True)
+        self.use_symbols = tk.BooleanVar(value=True)
+        self.exclude_ambiguous = tk.BooleanVar(value=True)
+        self.mode_var = tk.StringVar(value="chars")
+        self.words_var = tk.IntVar(value=DEFAULT_WORDS)
+        self.wordlist = None
+        self.search_var = tk.StringVar()
+        self.filter_job = None
+        self.entry_ids = []
+        self.vault_loaded = False
+        self.lazy_tabs = {}
+        self.first_frame_ms = None
+        self.test_password_var = tk.StringVar()
+        self.analysis_job = None
+        self.analysis_seq = 0
+        self.analysis_future = None
+        self.analysis_cache = OrderedDict()
+        self.diagnostics_frame = None
+        
+        # Criptografia e arquivo rodam fora da thread do Tk
+        self.tasks = TaskRunner(self.root, on_busy=self.update_status)
+        # Análise de força tem thread própria: não espera gravações do cofre
+        self.scorer = TaskRunner(self.root, name="pgp-score")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        self.setup_styles()
+        self.create_ui()
+        self.root.after(IDLE_CHECK_MS, self.check_idle)
+        
+    def get_vault(self):
+        """Abre o cofre no primeiro uso (chamado na thread de E/S)"""
+        cipher = self.session.cipher()
+        if self.vault is None or self.cipher is not cipher:
+            self.cipher = cipher
+            # Converte o formato antigo se preciso
+            self.vault = Vault(self.config_file, cipher)
+        return self.vault
+    
+    def with_unlocked(self, action):
+        """Executa action() com o cofre desbloqueado (pede a senha se preciso)"""
+        if self.session.unlocked:
+            action()
+            return
+        self.pending_unlock.append(action)
+        if len(self.pending_unlock) == 1:
+            self.ask_passphrase()
+            
+    def ask_passphrase(self):
+        """Pede a senha mestra e deriva a chave na thread de E/S"""
+        new = self.session.needs_new_passphrase
+        prompt = ("Defina a senha mestra do cofre:" if new
+                  else "Senha mestra do cofre:")
+        passphrase = simpledialog.askstring("🔒 Senha mestra", prompt,
+                                            show="*", parent=self.root)
+        if new and passphrase:
+            confirm = simpledialog.askstring("🔒 Senha mestra", "Confirme a senha mestra:",
+                                             show="*", parent=self.root)
+            if confirm != passphrase:
+                messagebox.showerror("Erro", "As senhas não conferem!")
+                self.ask_passphrase()
+                return
+        if not passphrase:
+            self.pending_unlock = []
+            return
+        self.tasks.submit(self.session.unlock, passphrase,
+                          on_done=self.on_unlocked,
+                          on_error=self.on_unlock_error,
+                          label="Desbloqueando cofre")
+        
+    def on_unlocked(self, cipher):
+        """Executa as ações que esperavam o desbloqueio"""
+        actions, self.pending_unlock = self.pending_unlock, []
+        for action in actions:
+            action()
+            
+    def on_unlock_error(self, error):
+        """Senha errada pede de novo; outros erros cancelam as ações"""
+        if isinstance(error, WrongPassphrase):
+            messagebox.showerror("Erro", "Senha mestra incorreta!")
+            self.ask_passphrase()
+            return
+        self.pending_unlock = []
+        messagebox.showerror("Erro", f"Não foi possível abrir a chave do cofre:\n{error}")
+        
+    def check_idle(self):
+        """Bloqueia o cofre depois de um tempo sem uso"""
+        if self.session.expired() and not self.tasks.busy:
+            self.lock_vault()
+        self.root.after(IDLE_CHECK_MS, self.check_idle)
+        
+    def lock_vault(self):
+        """Esquece a chave e as entradas decifradas"""
+        self.session.lock()
+        self.vault = None
+        self.cipher = None
+        if self.vault_loaded:
+            # A lista é recarregada (com nova senha) ao voltar ao histórico
+            self.vault_loaded = False
+            self.entry_ids = []
+            self.password_listbox.selection_clear()
+            self.password_listbox.refresh()
+            self.detail_text.delete(1.0, tk.END)
+        self.status_label.config(text="🔒 Cofre bloqueado por inatividade")
+    
+    def setup_styles(self):
+        """Configura estilos da interface"""
+        style = ttk.Style()
+        style.theme_use('clam')
+        
+        # Cores
+        bg_dark = "#0f0f1e"
+        bg_medium = "#1a1a2e"
+        bg_light = "#16213e"
+        accent = "#0f4c75"
+        accent_bright = "#3282b8"
+        text_color = "#ffffff"
+        
+        style.configure("TFrame", background=bg_dark)
+        style.configure("TLabel", background=bg_dark, foreground=text_color, font=("Segoe UI", 10))
+        style.configure("Title.TLabel", font=("Segoe UI", 18, "bold"), foreground=accent_bright)
+        style.configure("Header.TLabel", font=("Segoe UI", 12, "bold"), foreground=accent_bright)
+        
+        style.configure("TButton", 
+                       font=("Segoe UI", 10, "bold"),
+                       background=accent,
+                       foreground=text_color,
+                       borderwidth=0,
+                       focuscolor='none',
+                       padding=10)
+        style.map("TButton",
+                 background=[('active', accent_bright), ('pressed', accent)])
+        
+        style.configure("Accent.TButton",
+                       background=accent_bright,
+                       foreground=text_color)
+        
+        style.configure("TCheckbutton",
+                       background=bg_dark,
+                       foreground=text_color,
+                       font=("Segoe UI", 10))
+        
+    def create_ui(self):
+        """Cria interface principal"""
+        # Frame principal
+        main_frame = ttk.Frame(self.root, padding="20")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Título
+        title = ttk.Label(main_frame, text="🔐 Password Generator Pro", style="Title.TLabel")
+        title.pack(pady=(0, 20))
+        
+        # Notebook
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        
+        # Aba Gerador
+        self.create_generator_tab(notebook)
+        
+        # Aba Histórico (conteúdo criado ao abrir a aba)
+        self.create_history_tab(notebook)
+        
+        # Aba Força da Senha (conteúdo criado ao abrir a aba)
+        self.create_strength_tab(notebook)
+        
+        notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.notebook = notebook
+        
+        # Aba de diagnóstico: escondida, aberta com Ctrl+Shift+D (ou já
+        # presente se PGP_METRICS estiver definida)
+        self.root.bind('<Control-Shift-D>', self.show_diagnostics)
+        self.root.bind('<Control-D>', self.show_diagnostics)
+        if metrics.enabled():
+            self.create_diagnostics_tab()
+        
+        # Status das tarefas em segundo plano
+        self.status_label = ttk.Label(main_frame, text="", font=("Segoe UI", 9))
+        self.status_label.pack(anchor=tk.W, pady=(10, 0))
+        
+    def add_lazy_tab(self, notebook, text, build):
+        """Adiciona aba vazia cujo conteúdo é criado na primeira abertura"""
+        frame = ttk.Frame(notebook, padding="15")
+        notebook.add(frame, text=text)
+        self.lazy_tabs[str(frame)] = (frame, build)
+        return frame
+        
+    def on_tab_changed(self, event):
+        """Cria o conteúdo da aba na primeira vez que é aberta"""
+        selected = event.widget.select()
+        lazy = self.lazy_tabs.pop(selected, None)
+        if lazy is not None:
+            frame, build = lazy
+            build(frame)
+        elif selected == str(self.history_frame) and not self.vault_loaded:
+            # Cofre bloqueado desde a última visita
+            self.load_passwords()
+        if self.diagnostics_frame is not None and selected == str(self.diagnostics_frame):
+            self.refresh_diagnostics()
+            
+    def update_status(self, busy):
+        """Mostra tarefas em andamento na barra de status"""
+        labels = [label for label in busy if label]
+        self.status_label.config(text=f"⏳ {labels[0]}..." if labels else "")
+        
+    def on_close(self):
+        """Espera gravações pendentes antes de fechar"""
+        self.scorer.shutdown()
+        self.tasks.shutdown()
+        self.root.destroy()
+        
+    def create_generator_tab(self, notebook):
+        """Cria aba de geração de senhas"""
+        gen_frame = ttk.Frame(notebook, padding="15")
+        notebook.add(gen_frame, text="⚡ Gerar Senha")
+        
+        # Configurações
+        config_frame = ttk.LabelFrame(gen_frame, text="Configurações", padding="15")
+        config_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        # Comprimento
+        length_frame = ttk.Frame(config_frame)
+        length_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(length_frame, text=f"Comprimento:").pack(side=tk.LEFT)
+        
+        length_scale = tk.Scale(length_frame, 
+                               from_=8, to=64,
+                               orient=tk.HORIZONTAL,
+                               variable=self.length_var,
+                               bg="#1a1a2e", fg="#ffffff",
+                               highlightthickness=0,
+                               length=200,
+                               command=self.update_length_label)
+        length_scale.pack(side=tk.LEFT, padx=10)
+        
+        self.length_label = ttk.Label(length_frame, text="16 caracteres")
+        self.length_label.pack(side=tk.LEFT)
+        
+        # Opções
+        options_frame = ttk.Frame(config_frame)
+        options_frame.pack(fill=tk.X, pady=10)
+        
+        ttk.Checkbutton(options_frame, text="Maiúsculas (A-Z)", 
+                       variable=self.use_uppercase).pack(anchor=tk.W, pady=3)
+        ttk.Checkbutton(options_frame, text="Minúsculas (a-z)", 
+                       variable=self.use_lowercase).pack(anchor=tk.W, pady=3)
+        ttk.Checkbutton(options_frame, text="Números (0-9)", 
+                       variable=self.use_digits).pack(anchor=tk.W, pady=3)
+        ttk.Checkbutton(options_frame, text="Símbolos (!@#$%)", 
+                       variable=self.use_symbols).pack(anchor=tk.W, pady=3)
+        ttk.Checkbutton(options_frame, text="Excluir caracteres ambíguos (0, O, l, 1)", 
+                       variable=self.exclude_ambiguous).pack(anchor=tk.W, pady=3)
+        
+        # Tipo: caracteres aleatórios ou frase-senha
+        mode_frame = ttk.Frame(config_frame)
+        mode_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Radiobutton(mode_frame, text="Caracteres", value="chars",
+                        variable=self.mode_var).pack(side=tk.LEFT)
+        ttk.Radiobutton(mode_frame, text="Frase-senha com", value="words",
+                        variable=self.mode_var).pack(side=tk.LEFT, padx=(10, 5))
+        ttk.Spinbox(mode_frame, from_=3, to=12, width=4,
+                    textvariable=self.words_var).pack(side=tk.LEFT)
+        ttk.Label(mode_frame, text="palavras").pack(side=tk.LEFT, padx=5)
+        
+        # Resultado
+        result_frame = ttk.LabelFrame(gen_frame, text="Senha Gerada", padding="15")
+        result_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
+        
+        self.password_display = tk.Text(result_frame,
+                                       height=3,
+                                       font=("Consolas", 14, "bold"),
+                                       bg="#1a1a2e",
+                                       fg="#3282b8",
+                                       wrap=tk.WORD,
+                                       relief=tk.FLAT,
+                                       padx=10,
+                                       pady=10)
+        self.password_display.pack(fill=tk.BOTH, expand=True)
+        
+        # Info de força
+        self.strength_info = ttk.Label(result_frame, text="", font=("Segoe UI", 10))
+        self.strength_info.pack(pady=(10, 0))
+        
+        # Botões
+        button_frame = ttk.Frame(gen_frame)
+        button_frame.pack(fill=tk.X)
+        
+        ttk.Button(button_frame, text="🎲 Gerar Senha", 
+                  command=self.generate_password,
+                  style="Accent.TButton").pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(button_frame, text="📋 Copiar", 
+                  command=self.copy_password).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(button_frame, text="💾 Salvar", 
+                  command=self.save_password_dialog).pack(side=tk.LEFT, padx=5)
+        
+    def create_history_tab(self, notebook):
+        """Cria aba de histórico"""
+        self.history_frame = self.add_lazy_tab(notebook, "📜 Histórico",
+                                               self.build_history_tab)
+        
+    def build_history_tab(self, hist_frame):
+        """Cria conteúdo da aba de histórico e carrega o cofre"""
+        # Busca
+        search_frame = ttk.Frame(hist_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(search_frame, text="🔎 Buscar:").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.search_var).pack(
+            side=tk.LEFT, fill=tk.X, expand=True, padx=10)
+        ttk.Label(search_frame, text="cat:Bancos desde:2024-01 ate:2024-06",
+                  font=("Segoe UI", 8)).pack(side=tk.LEFT)
+        self.search_var.trace_add('write', lambda *args: self.schedule_filter())
+        
+        # Lista de senhas
+        list_frame = ttk.LabelFrame(hist_frame, text="Senhas Salvas", padding="10")
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        
+        # Lista virtualizada: só as linhas visíveis são desenhadas
+        self.password_listbox = VirtualListbox(list_frame,
+                                               font=("Consolas", 10),
+                                               bg="#1a1a2e",
+                                               fg="#ffffff")
+        self.password_listbox.pack(fill=tk.BOTH, expand=True)
+        
+        # Detalhes
+        detail_frame = ttk.LabelFrame(hist_frame, text="Detalhes", padding="10")
+        detail_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.detail_text = scrolledtext.ScrolledText(detail_frame,
+                                                     height=6,
+                                                     font=("Consolas", 9),
+                                                     bg="#1a1a2e",
+                                                     fg="#ffffff",
+                                                     wrap=tk.WORD,
+                                                     relief=tk.FLAT)
+        self.detail_text.pack(fill=tk.BOTH, expand=True)
+        
+        # Botões
+        button_frame = ttk.Frame(hist_frame)
+        button_frame.pack(fill=tk.X)
+        
+        ttk.Button(button_frame, text="👁️ Ver Senha", 
+                  command=self.view_password).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(button_frame, text="📋 Copiar Senha", 
+                  command=self.copy_saved_password).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(button_frame, text="🗑️ Deletar", 
+                  command=self.delete_password).pack(side=tk.LEFT, padx=5)
+        
+        # Bind selection
+        self.password_listbox.bind('<<ListboxSelect>>', self.on_password_select)
+        
+        self.load_passwords()
+        
+    def create_strength_tab(self, notebook):
+        """Cria aba de análise de força"""
+        self.add_lazy_tab(notebook, "💪 Analisar Força", self.build_strength_tab)
+        
+    def build_strength_tab(self, strength_frame):
+        """Cria conteúdo da aba de análise de força"""
+        # Input
+        input_frame = ttk.LabelFrame(strength_frame, text="Digite uma senha para analisar", padding="15")
+        input_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        self.test_password_entry = tk.Entry(input_frame,
+                                            font=("Consolas", 12),
+                                            bg="#1a1a2e",
+                                            fg="#ffffff",
+                                            insertbackground="#ffffff",
+                                            relief=tk.FLAT,
+                                            show="*",
+                                            textvariable=self.test_password_var)
+        self.test_password_entry.pack(fill=tk.X, pady=(0, 10))
+        self.test_password_entry.bind('<Return>', lambda e: self.analyze_strength())
+        self.test_password_var.trace_add('write', lambda *args: self.schedule_analysis())
+        
+        ttk.Button(input_frame, text="🔍 Analisar", 
+                  command=self.analyze_strength).pack()
+        
+        # Resultado
+        result_frame = ttk.LabelFrame(strength_frame, text="Análise", padding="15")
+        result_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.analysis_text = scrolledtext.ScrolledText(result_frame,
+                                                       font=("Consolas", 10),
+                                                       bg="#1a1a2e",
+                                                       fg="#ffffff",
+                                                       wrap=tk.WORD,
+                                                       relief=tk.FLAT)
+        self.analysis_text.pack(fill=tk.BOTH, expand=True)
+        
+    def update_length_label(self, value):
+        """Atualiza label de comprimento"""
+        self.length_label.config(text=f"{int(float(value))} caracteres")
+        
+    @metrics.timed("ui.generate")
+    def generate_password(self):
+        """Gera senha com base nas configurações"""
+        length = self.length_var.get()
+        
+        # Monta conjunto de caracteres
+        chars = build_charset(uppercase=self.use_uppercase.get(),
+                              lowercase=self.use_lowercase.get(),
+                              digits=self.use_digits.get(),
+                              symbols=self.use_symbols.get(),
+                              exclude_ambiguous=self.exclude_ambiguous.get())
+        
+        if self.mode_var.get() == "words":
+            password = self.generate_passphrase()
+            if password is None:
+                return
+        elif not chars:
+            messagebox.showerror("Erro", "Selecione ao menos uma opção de caracteres!")
+            return
+        else:
+            # Gera senha com ao menos um caractere de cada tipo selecionado
+            password = covering_generator(chars, length).generate_one()
+        
+        # Exibe
+        self.password_display.delete(1.0, tk.END)
+        self.password_display.insert(1.0, password)
+        
+        # Calcula força
+        strength, color = self.calculate_strength(password)
+        self.strength_info.config(text=f"Força: {strength}", foreground=color)
+        
+    def generate_passphrase(self):
+        """Gera frase-senha com a lista de palavras padrão"""
+        try:
+            if self.wordlist is None:
+                self.wordlist = Wordlist()
+            generator = PassphraseGenerator(
+                self.wordlist, self.words_var.get(), "-",
+                "title" if self.use_uppercase.get() else "lower",
+                digits=2 if self.use_digits.get() else 0)
+        except (WordlistError, ValueError, tk.TclError) as e:
+            messagebox.showerror("Erro", f"Não foi possível gerar a frase-senha:\n{e}")
+            return None
+        return generator.generate_one()
+        
+    @metrics.timed("strength")
+    def calculate_strength(self, password):
+        """Calcula força da senha"""
+        return calculate_strength(password)
+            
+    def copy_password(self):
+        """Copia senha para clipboard"""
+        password = self.password_display.get(1.0, tk.END).strip()
+        if password:
+            copy_to_clipboard(password)
+            messagebox.showinfo("Sucesso", "Senha copiada para área de transferência!")
+        else:
+            messagebox.showwarning("Aviso", "Nenhuma senha para copiar!")
+            
+    def save_password_dialog(self):
+        """Dialog para salvar senha"""
+        password = self.password_display.get(1.0, tk.END).strip()
+        if not password:
+            messagebox.showwarning("Aviso", "Gere uma senha primeiro!")
+            return
+            
+        # Dialog
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Salvar Senha")
+        dialog.geometry("400x200")
+        dialog.configure(bg="#0f0f1e")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        ttk.Label(dialog, text="Nome/Descrição:").pack(pady=(20, 5))
+        name_entry = ttk.Entry(dialog, width=40)
+        name_entry.pack(pady=5)
+        name_entry.focus()
+        
+        ttk.Label(dialog, text="Categoria (opcional):").pack(pady=(10, 5))
+        category_entry = ttk.Entry(dialog, width=40)
+        category_entry.pack(pady=5)
+        
+        def save():
+            name = name_entry.get().strip()
+            if not name:
+                messagebox.showwarning("Aviso", "Digite um nome!")
+                return
+            self.save_password(password, name, category_entry.get().strip())
+            dialog.destroy()
+            
+        ttk.Button(dialog, text="💾 Salvar", command=save).pack(pady=20)
+        
+    def save_password(self, password, name, category=""):
+        """Salva senha criptografada"""
+        entry = {
+            "name": name,
+            "password": password,
+            "category": category,
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "strength": self.calculate_strength(password)[0]
+        }
+        
+        # Verifica reuso antes de gravar (consulta O(1) ao índice do cofre)
+        self.with_unlocked(lambda: self.tasks.submit(
+            self.find_reuse, password,
+            on_done=lambda found: self.confirm_reuse(entry, found),
+            on_error=self.on_vault_error,
+            label="Verificando reuso"))
+        
+    def find_reuse(self, password):
+        """Linhas de aviso de reuso (roda na thread de E/S)"""
+        vault = self.get_vault()
+        same, similar = vault.find_reuse(password)
+        lines = []
+        for kind, ids in (("Mesma senha", same), ("Senha parecida", similar)):
+            names = [entry['name'] for entry in vault.get_many(ids[:5]) if entry]
+            if names:
+                more = f" e mais {len(ids) - len(names)}" if len(ids) > len(names) else ""
+                lines.append(f"{kind} em: {', '.join(names)}{more}")
+        return lines
+        
+    def confirm_reuse(self, entry, lines):
+        """Avisa se a senha já é usada (igual ou parecida) antes de salvar"""
+        if lines and not messagebox.askyesno(
+                "Senha reutilizada", "\n".join(lines) + "\n\nSalvar mesmo assim?"):
+            return
+        self.store_entry(entry)
+        
+    def store_entry(self, entry):
+        """Grava a entrada no cofre"""
+        # Criptografa e acrescenta ao cofre em segundo plano; salvamentos
+        # seguidos são gravados juntos (uma escrita, um fsync)
+        self.tasks.submit_batched(
+            "save", entry,
+            lambda entries: self.get_vault().add_many(entries),
+            on_done=self.on_saved,
+            on_error=self.on_vault_error,
+            label="Salvando")
+        
+    def on_saved(self, entries, entry_ids):
+        """Atualiza a lista depois que as senhas foram gravadas"""
+        if not self.vault_loaded:
+            # Lista ainda não carregada: as novas entradas virão na carga
+            pass
+        elif self.search_var.get().strip():
+            self.apply_filter()
+        else:
+            for entry_id in entry_ids:
+                self.entry_ids.append(entry_id)
+                self.password_listbox.row_inserted(len(self.entry_ids) - 1)
+        if len(entries) == 1:
+            messagebox.showinfo("Sucesso", f"Senha '{entries[0]['name']}' salva com sucesso!")
+        else:
+            messagebox.showinfo("Sucesso", f"{len(entries)} senhas salvas com sucesso!")
+            
+    def on_vault_error(self, error):
+        """Erro em operação do cofre feita em segundo plano"""
+        messagebox.showerror("Erro", f"Falha ao gravar o cofre:\n{error}")
+        self.apply_filter()
+        
+    def load_passwords_data(self):
+        """Carrega senhas do arquivo"""
+        try:
+            return self.get_vault().entries()
+        except (OSError, VaultError):
+            return []
+            
+    def load_passwords(self):
+        """Carrega senhas na lista (o cofre é decifrado em segundo plano)"""
+        self.password_listbox.set_source(lambda: len(self.entry_ids),
+                                         self.entry_display)
+        started = time.perf_counter()
+        self.with_unlocked(lambda: self.tasks.submit(
+            lambda: self.get_vault().ids(),
+            on_done=lambda entry_ids: self.on_vault_loaded(entry_ids, started),
+            on_error=self.on_vault_load_error,
+            label="Carregando cofre"))
+        
+    @metrics.timed("ui.list.refresh")
+    def on_vault_loaded(self, entry_ids, started):
+        """Mostra as entradas depois que o cofre foi carregado"""
+        # Do pedido até a lista pronta (inclui a senha mestra, se pedida)
+        metrics.observe("ui.list.load", time.perf_counter() - started)
+        self.vault_loaded = True
+        if self.search_var.get().strip():
+            self.apply_filter()
+        else:
+            self.entry_ids = entry_ids
+            self.password_listbox.refresh()
+            
+    def on_vault_load_error(self, error):
+        """Erro ao carregar o cofre"""
+        messagebox.showerror("Erro", f"Não foi possível carregar o cofre:\n{error}")
+        
+    def schedule_filter(self):
+        """Agenda a busca para quando o usuário parar de digitar"""
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(150, self.apply_filter)
+        
+    @metrics.timed("ui.list.filter")
+    def apply_filter(self):
+        """Filtra a lista usando os índices do cofre"""
+        self.filter_job = None
+        if not self.vault_loaded:
+            # Aplicado quando o carregamento terminar
+            return
+        query = self.search_var.get().strip()
+        try:
+            self.entry_ids = self.vault.search(query) if query else self.vault.ids()
+        except (OSError, VaultError):
+            self.entry_ids = []
+        self.password_listbox.selection_clear()
+        self.detail_text.delete(1.0, tk.END)
+        
+    def entry_display(self, idx):
+        """Texto da linha idx da lista (obtido sob demanda)"""
+        pwd = self.selected_entry(idx)
+        if pwd is None:
+            return ""
+        display = f"🔑 {pwd['name']}"
+        if pwd.get('category'):
+            display += f" [{pwd['category']}]"
+        return display
+            
+    def selected_entry(self, idx):
+        """Retorna entrada do cofre correspondente à linha da lista"""
+        if self.vault is None:
+            return None
+        self.session.touch()
+        try:
+            return self.vault.get(self.entry_ids[idx])
+        except (IndexError, OSError, VaultError):
+            return None
+            
+    def on_password_select(self, event):
+        """Quando seleciona uma senha"""
+        selection = self.password_listbox.curselection()
+        if not selection:
+            return
+            
+        pwd = self.selected_entry(selection[0])
+        if pwd is None:
+            return
+        
+        self.detail_text.delete(1.0, tk.END)
+        details = f"""Nome: {pwd['name']}
+Categoria: {pwd.get('category', 'N/A')}
+Criada em: {pwd['created']}
+Força: {pwd['strength']}
+Comprimento: {pwd.get('length', '?')} caracteres"""
+        
+        self.detail_text.insert(1.0, details)
+        
+    def view_password(self):
+        """Mostra senha selecionada"""
+        selection = self.password_listbox.curselection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Selecione uma senha!")
+            return
+            
+        pwd = self.selected_entry(selection[0])
+        if pwd is None:
+            return
+        
+        self.fetch_secret(pwd, self.show_password)
+        
+    def fetch_secret(self, pwd, action):
+        """Decifra só a senha da entrada (na thread de E/S) e chama action"""
+        entry_id = pwd['id']
+        self.with_unlocked(lambda: self.tasks.submit(
+            lambda: self.get_vault().secret(entry_id),
+            on_done=lambda password: password is not None and action(pwd, password),
+            on_error=self.on_secret_error,
+            label="Decifrando senha"))
+        
+    def on_secret_error(self, error):
+        """Erro ao decifrar a senha de uma entrada"""
+        messagebox.showerror("Erro", f"Não foi possível ler a senha:\n{error}")
+        
+    def show_password(self, pwd, password):
+        """Mostra a senha decifrada"""
+        messagebox.showinfo("Senha", f"Senha de '{pwd['name']}':\n\n{password}")
+        
+    def copy_saved_password(self):
+        """Copia senha salva"""
+        selection = self.password_listbox.curselection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Selecione uma senha!")
+            return
+            
+        pwd = self.selected_entry(selection[0])
+        if pwd is None:
+            return
+        
+        self.fetch_secret(pwd, self.copy_secret)
+        
+    def copy_secret(self, pwd, password):
+        """Copia a senha decifrada"""
+        copy_to_clipboard(password)
+        messagebox.showinfo("Sucesso", f"Senha de '{pwd['name']}' copiada!")
+        
+    def delete_password(self):
+        """Deleta senha"""
+        selection = self.password_listbox.curselection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Selecione uma senha!")
+            return
+            
+        pwd = self.selected_entry(selection[0])
+        if pwd is None:
+            return
+        
+        if messagebox.askyesno("Confirmar", f"Deletar senha '{pwd['name']}'?"):
+            # Remove da lista já; a lápide é gravada em segundo plano
+            idx = selection[0]
+            del self.entry_ids[idx]
+            self.password_listbox.row_deleted(idx)
+            self.detail_text.delete(1.0, tk.END)
+            
+            self.tasks.submit(self.vault.delete, pwd['id'],
+                              on_done=lambda _: messagebox.showinfo("Sucesso", "Senha deletada!"),
+                              on_error=self.on_vault_error,
+                              label="Deletando")
+            
+    def analyze_strength(self):
+        """Analisa força de senha"""
+        if not self.test_password_var.get():
+            messagebox.showwarning("Aviso", "Digite uma senha!")
+            return
+        self.request_analysis()
+        
+    def schedule_analysis(self):
+        """Agenda a análise para quando o usuário parar de digitar"""
+        if self.analysis_job is not None:
+            self.root.after_cancel(self.analysis_job)
+        self.analysis_job = self.root.after(ANALYSIS_DELAY_MS, self.request_analysis)
+        
+    def request_analysis(self):
+        """Pede a análise da senha digitada, descartando pedidos anteriores"""
+        if self.analysis_job is not None:
+            self.root.after_cancel(self.analysis_job)
+            self.analysis_job = None
+        self.analysis_seq += 1
+        if self.analysis_future is not None:
+            # Se ainda não começou, nem chega a rodar
+            self.analysis_future.cancel()
+            self.analysis_future = None
+            
+        password = self.test_password_var.get()
+        if not password:
+            self.show_analysis("")
+            return
+        cached = self.analysis_cache.get(password)
+        if cached is not None:
+            self.analysis_cache.move_to_end(password)
+            self.show_analysis(cached)
+            return
+            
+        seq = self.analysis_seq
+        self.analysis_future = self.scorer.submit(
+            self.strength_report, password,
+            on_done=lambda text: self.on_analysis_done(seq, password, text))
+        
+    def on_analysis_done(self, seq, password, text):
+        """Guarda o resultado e mostra se ainda for o pedido mais recente"""
+        self.analysis_cache[password] = text
+        if len(self.analysis_cache) > ANALYSIS_CACHE_SIZE:
+            self.analysis_cache.popitem(last=False)
+        if seq == self.analysis_seq:
+            self.analysis_future = None
+            self.show_analysis(text)
+            
+    def show_analysis(self, text):
+        """Exibe o texto da análise"""
+        self.analysis_text.delete(1.0, tk.END)
+        self.analysis_text.insert(1.0, text)
+        
+    @metrics.timed("strength.report")
+    def strength_report(self, password):
+        """Texto da análise de força (roda na thread de análise)"""
+        # Análise
+        length = len(password)
+        has_upper, has_lower, has_digit, has_symbol = char_classes(password)
+        
+        strength, _ = self.calculate_strength(password)
+        breached = self.is_breached(password)
+        # Estimativa por padrões (dicionário, teclado, datas...), em log2
+        result = estimate(password)
+        patterns = [m for m in result.matches if m.pattern != "força bruta"]
+        if breached:
+            strength = "Fraca 😟 (senha vazada)"
+        elif result.bits < WEAK_BITS:
+            strength = "Fraca 😟 (padrões previsíveis)"
+        
+        size = charset_size(has_upper, has_lower, has_digit, has_symbol)
+        brute_bits = entropy_bits(length, size)
+        
+        analysis = f"""╔══════════════════════════════════════════╗
+║         ANÁLISE DE FORÇA DA SENHA        ║
+╚══════════════════════════════════════════╝
+
+📏 Comprimento: {length} caracteres
+   {'✅ Bom' if length >= 12 else '⚠️ Recomendado: 12+'}
+
+🔤 Composição:
+   Maiúsculas (A-Z): {'✅ Sim' if has_upper else '❌ Não'}
+   Minúsculas (a-z): {'✅ Sim' if has_lower else '❌ Não'}
+   Números (0-9):    {'✅ Sim' if has_digit else '❌ Não'}
+   Símbolos (!@#$):  {'✅ Sim' if has_symbol else '❌ Não'}
+
+💪 Força: {strength}
+
+🔓 Vazamentos: {self.breach_status(breached)}
+
+🔢 Combinações possíveis (força bruta): 2^{brute_bits:.1f}
+
+🧩 Padrões encontrados:
+{self.describe_patterns(patterns)}
+
+⏱️ Tempo estimado para quebrar:
+   (2^{result.bits:.1f} tentativas, 1 bilhão/seg)
+   {self.estimate_crack_time(result.bits)}
+
+💡 Recomendações:
+"""
+        
+        recommendations = []
+        if breached:
+            recommendations.append("   • Esta senha está em listas de vazamentos: não use")
+        if patterns:
+            recommendations.append("   • Evite palavras comuns, sequências e datas")
+        if length < 12:
+            recommendations.append("   • Use pelo menos 12 caracteres")
+        if not has_upper:
+            recommendations.append("   • Adicione letras maiúsculas")
+        if not has_lower:
+            recommendations.append("   • Adicione letras minúsculas")
+        if not has_digit:
+            recommendations.append("   • Adicione números")
+        if not has_symbol:
+            recommendations.append("   • Adicione símbolos especiais")
+            
+        if recommendations:
+            analysis += "\n".join(recommendations)
+        else:
+            analysis += "   ✅ Senha excelente!"
+            
+        return analysis
+        
+    def is_breached(self, password):
+        """Consulta o índice de vazamentos (None se não houver índice)"""
+        if self.breach_index is None:
+            if not os.path.exists(self.breach_file):
+                return None
+            try:
+                self.breach_index = BreachIndex(self.breach_file)
+            except BreachIndexError:
+                return None
+        return password in self.breach_index
+        
+    def breach_status(self, breached):
+        """Texto do resultado da verificação de vazamentos"""
+        if breached is None:
+            return f"não verificado (índice {self.breach_file} não encontrado)"
+        return "⚠️ Encontrada em vazamentos!" if breached else "✅ Não encontrada"
+        
+    def describe_patterns(self, patterns):
+        """Lista os trechos previsíveis encontrados na senha"""
+        if not patterns:
+            return "   ✅ Nenhum"
+        return "\n".join(f"   • {m.pattern}: {m.token}" for m in patterns)
+        
+    def estimate_crack_time(self, bits):
+        """Estima tempo para quebrar senha com 2**bits tentativas"""
+        log2_seconds = crack_seconds_log2(bits)
+        if log2_seconds > 100:
+            return "Trilhões de anos"
+        seconds = 2 ** log2_seconds
+        
+        if seconds < 1:
+            return "< 1 segundo"
+        elif seconds < 60:
+            return f"{seconds:.0f} segundos"
+        elif seconds < 3600:
+            return f"{seconds/60:.0f} minutos"
+        elif seconds < 86400:
+            return f"{seconds/3600:.0f} horas"
+        elif seconds < 31536000:
+            return f"{seconds/86400:.0f} dias"
+        else:
+            years = seconds / 31536000
+            if years < 1000:
+                return f"{years:.0f} anos"
+            elif years < 1000000:
+                return f"{years/1000:.0f} mil anos"
+            elif years < 1000000000:
+                return f"{years/1000000:.0f} milhões de anos"
+            else:
+                return "Trilhões de anos"
+
+    def show_diagnostics(self, event=None):
+        """Liga as métricas e abre a aba de diagnóstico"""
+        metrics.enable()
+        if self.diagnostics_frame is None:
+            self.create_diagnostics_tab()
+        self.notebook.select(self.diagnostics_frame)
+        
+    def create_diagnostics_tab(self):
+        """Cria a aba de diagnóstico (métricas internas)"""
+        frame = ttk.Frame(self.notebook, padding="15")
+        self.notebook.add(frame, text="🩺 Diagnóstico")
+        self.diagnostics_frame = frame
+        
+        self.diagnostics_text = scrolledtext.ScrolledText(frame,
+                                                          font=("Consolas", 9),
+                                                          bg="#1a1a2e",
+                                                          fg="#ffffff",
+                                                          wrap=tk.NONE,
+                                                          relief=tk.FLAT)
+        self.diagnostics_text.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="📄 Exportar JSON",
+                  command=lambda: self.export_metrics(".json", metrics.to_json)
+                  ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="📈 Exportar Prometheus",
+                  command=lambda: self.export_metrics(".prom", metrics.to_prometheus)
+                  ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="🧹 Zerar",
+                  command=self.reset_metrics).pack(side=tk.LEFT, padx=5)
+        
+    def refresh_diagnostics(self):
+        """Atualiza o texto enquanto a aba de diagnóstico estiver aberta"""
+        if self.notebook.select() != str(self.diagnostics_frame):
+            return
+        top = self.diagnostics_text.yview()[0]
+        self.diagnostics_text.delete(1.0, tk.END)
+        self.diagnostics_text.insert(1.0, metrics.report())
+        self.diagnostics_text.yview_moveto(top)
+        self.root.after(DIAGNOSTICS_REFRESH_MS, self.refresh_diagnostics)
+        
+    def reset_metrics(self):
+        """Zera as métricas"""
+        metrics.reset()
+        self.diagnostics_text.delete(1.0, tk.END)
+        self.diagnostics_text.insert(1.0, metrics.report())
+        
+    def export_metrics(self, extension, render):
+        """Grava as métricas em arquivo (JSON ou texto do Prometheus)"""
+        path = filedialog.asksaveasfilename(parent=self.root,
+                                            defaultextension=extension,
+                                            initialfile=f"metricas{extension}")
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(render())
+        except OSError as e:
+            messagebox.showerror("Erro", f"Não foi possível gravar as métricas:\n{e}")
+
+def report_first_frame(root, app, started):
+    """Mede o tempo até a primeira janela desenhada, desde started
+
+    Com a variável de ambiente PGP_TIMING definida, o tempo é mostrado na
+    saída de erro.
+    """
+    def on_idle():
+        app.first_frame_ms = (time.perf_counter() - started) * 1000
+        metrics.observe("ui.first_frame", app.first_frame_ms / 1000)
+        if os.environ.get("PGP_TIMING"):
+            print(f"primeiro quadro em {app.first_frame_ms:.0f} ms", file=sys.stderr)
+            
+    def on_map(event):
+        if event.widget is root and app.first_frame_ms is None:
+            root.unbind('<Map>')
+            # O desenho acontece nas tarefas ociosas agendadas antes desta
+            root.after_idle(on_idle)
+            
+    root.bind('<Map>', on_map)
+
+def run(started):
+    """Abre a janela principal; started é o início do processo (perf_counter)"""
+    root = tk.Tk()
+    app = PasswordGeneratorPro(root)
+    report_first_frame(root, app, started)
+    root.mainloop()
@@ -0,0 +1,188 @@
+"""Índices em memória para busca e filtro das entradas do cofre.
+
+- nome: lista ordenada (busca por prefixo) e índice de trigramas (busca
+  por trecho em qualquer posição);
+- categoria: dicionário categoria -> ids;
+- data de criação: lista ordenada (busca por intervalo).
+
+Os índices são atualizados a cada entrada adicionada ou removida, sem
+reconstrução.
+"""
+from bisect import bisect_left, bisect_right, insort
+
+
+def _trigrams(text):
+    """Conjunto de trigramas de um texto"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def parse_query(query):
+    """Separa texto livre e filtros (cat:, desde:, ate:) de uma busca"""
+    words = []
+    filters = {}
+    for word in query.split():
+        key, sep, value = word.partition(":")
+        key = key.lower()
+        if sep and value and key in ("cat", "categoria"):
+            filters["category"] = value
+        elif sep and value and key in ("desde", "de"):
+            filters["date_from"] = value
+        elif sep and value and key in ("ate", "até"):
+            filters["date_to"] = value
+        else:
+            words.append(word)
+    filters["text"] = " ".join(words)
+    return filters
+
+
+class VaultIndex:
+    """Índices de nome, categoria e data sobre as entradas do cofre"""
+
+    def __init__(self, entries=()):
+        self._seq = {}
+        self._counter = 0
+        self._names = []
+        self._trigrams = {}
+        self._categories = {}
+        self._created = []
+        self._keys = {}
+        self._bulk_load(entries)
+
+    def __len__(self):
+        return len(self._seq)
+
+    @staticmethod
+    def _keys_for(entry):
+        name = entry.get("name", "").lower()
+        category = (entry.get("category") or "").lower()
+        created = entry.get("created", "")
+        return name, category, created
+
+    def _bulk_load(self, entries):
+        """Carga inicial: acumula e ordena uma única vez
+
+        Um id repetido fica com a última entrada, na posição da primeira.
+        """
+        names = self._names
+        created_list = self._created
+        trigrams = self._trigrams
+        categories = self._categories
+        latest = {}
+        for entry in entries:
+            latest[entry["id"]] = entry
+        for entry_id, entry in latest.items():
+            name, category, created = keys = self._keys_for(entry)
+            self._keys[entry_id] = keys
+            self._seq[entry_id] = self._counter
+            self._counter += 1
+            names.append((name, entry_id))
+            created_list.append((created, entry_id))
+            for gram in _trigrams(name):
+                ids = trigrams.get(gram)
+                if ids is None:
+                    trigrams[gram] = {entry_id}
+                else:
+                    ids.add(entry_id)
+            categories.setdefault(category, set()).add(entry_id)
+        names.sort()
+        created_list.sort()
+
+    def add(self, entry):
+        """Indexa uma entrada (substitui se o id já existe)"""
+        entry_id = entry["id"]
+        seq = self._seq.get(entry_id)
+        if seq is None:
+            seq = self._counter
+            self._counter += 1
+        else:
+            self.remove(entry_id)
+        name, category, created = keys = self._keys_for(entry)
+        self._keys[entry_id] = keys
+        self._seq[entry_id] = seq
+
+        insort(self._names, (name, entry_id))
+        for gram in _trigrams(name):
+            self._trigrams.setdefault(gram, set()).add(entry_id)
+        self._categories.setdefault(category, set()).add(entry_id)
+        insort(self._created, (created, entry_id))
+
+    def remove(self, entry_id):
+        """Remove uma entrada dos índices"""
+        keys = self._keys.pop(entry_id, None)
+        if keys is None:
+            return
+        name, category, created = keys
+        del self._seq[entry_id]
+
+        del self._names[bisect_left(self._names, (name, entry_id))]
+        for gram in _trigrams(name):
+            ids = self._trigrams[gram]
+            ids.discard(entry_id)
+            if not ids:
+                del self._trigrams[gram]
+        ids = self._categories[category]
+        ids.discard(entry_id)
+        if not ids:
+            del self._categories[category]
+        del self._created[bisect_left(self._created, (created, entry_id))]
+
+    # ----- consultas -----
+
+    def by_prefix(self, prefix):
+        """Ids cujo nome começa com prefix"""
+        prefix = prefix.lower()
+        names = self._names
+        result = set()
+        for i in range(bisect_left(names, (prefix,)), len(names)):
+            name, entry_id = names[i]
+            if not name.startswith(prefix):
+                break
+            result.add(entry_id)
+        return result
+
+    def by_name(self, text):
+        """Ids cujo nome contém text (prefixo se text tem menos de 3 letras)"""
+        text = text.lower()
+        if len(text) < 3:
+            return self.by_prefix(text)
+        grams = sorted(_trigrams(text),
+                       key=lambda g: len(self._trigrams.get(g, ())))
+        candidates = set(self._trigrams.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= self._trigrams.get(gram, set())
+        # Trigramas não garantem a ordem: confirma o trecho
+        return {i for i in candidates if text in self._keys[i][0]}
+
+    def by_category(self, category):
+        """Ids da categoria (sem diferenciar maiúsculas)"""
+        return set(self._categories.get(category.lower(), ()))
+
+    def by_date(self, date_from=None, date_to=None):
+        """Ids criados entre date_from e date_to (inclusive, prefixos de data)"""
+        start = bisect_left(self._created, (date_from,)) if date_from else 0
+        # "~" é maior que qualquer dígito: inclui o dia/mês inteiro de date_to
+        stop = (bisect_right(self._created, (date_to + "~",))
+                if date_to else len(self._created))
+        return {entry_id for _, entry_id in self._created[start:stop]}
+
+    def categories(self):
+        """Categorias existentes"""
+        return sorted(c for c in self._categories if c)
+
+    def search(self, text="", category=None, date_from=None, date_to=None):
+        """Ids que atendem a todos os filtros, na ordem de criação"""
+        result = None
+        # Começa pelos filtros mais seletivos para reduzir as interseções
+        if category:
+            result = self.by_category(category)
+        if text and (result is None or result):
+            found = self.by_name(text)
+            result = found if result is None else result & found
+        if (date_from or date_to) and (result is None or result):
+            found = self.by_date(date_from, date_to)
+            result = found if result is None else result & found
+        if result is None:
+            result = self._seq.keys()
+        return sorted(result, key=self._seq.__getitem__)
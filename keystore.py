@@ -0,0 +1,282 @@
+"""Chave do cofre protegida por senha mestra.
+
+O cofre é cifrado com uma chave de dados Fernet aleatória, que nunca é
+gravada em claro: o arquivo de chave guarda a chave de dados cifrada com
+uma chave derivada da senha mestra por scrypt. O scrypt é caro em tempo e
+em memória de propósito, para encarecer ataques de força bruta à senha;
+os parâmetros ficam no próprio arquivo e podem ser ajustados à máquina
+com calibrate(). Trocar a senha ou os parâmetros recifra só a chave de
+dados, não o cofre.
+
+O mesmo diretório guarda o token de acesso ao serviço local
+(``.key.token``, só legível pelo dono, ver server.py).
+
+Formato de ``.key`` (JSON):
+
+    {"format": "pgp-keystore", "version": 1,
+     "kdf": {"name": "scrypt", "salt": "...", "n": 65536, "r": 8, "p": 1},
+     "keys": ["<chave de dados cifrada>", ...]}
+
+"keys" é uma lista para permitir rotação: a primeira cifra os registros
+novos e as demais ainda decifram os antigos. O formato antigo (chave
+Fernet em texto puro) é convertido na primeira abertura com senha mestra.
+"""
+import base64
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+
+from vault import VaultError, _fsync_dir
+
+FORMAT = "pgp-keystore"
+VERSION = 1
+SALT_BYTES = 16
+
+# ~64 MB e ~0,3 s em uma máquina comum
+DEFAULT_PARAMS = {"n": 1 << 16, "r": 8, "p": 1}
+# Piso da calibração: abaixo disto a derivação fica barata demais
+MIN_N = 1 << 14
+
+# Tempo sem uso até a chave ser esquecida
+IDLE_SECONDS = 300
+
+
+class WrongPassphrase(VaultError):
+    """Senha mestra incorreta"""
+
+
+class VaultLocked(VaultError):
+    """Cofre bloqueado: a senha mestra precisa ser digitada de novo"""
+
+
+def scrypt_memory(n, r, p):
+    """Memória (bytes) usada pelo scrypt com estes parâmetros"""
+    return 128 * r * (n + p + 2)
+
+
+def derive_key(passphrase, salt, n, r, p):
+    """Chave Fernet derivada da senha mestra"""
+    raw = hashlib.scrypt(passphrase.encode(), salt=salt, n=n, r=r, p=p,
+                         maxmem=scrypt_memory(n, r, p) + (1 << 20), dklen=32)
+    return base64.urlsafe_b64encode(raw)
+
+
+def _cipher(keys):
+    """Cifra que usa a primeira chave e aceita todas para decifrar"""
+    from cryptography.fernet import Fernet, MultiFernet
+
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def read_keystore(key_file):
+    """Conteúdo do arquivo de chave (None se for uma chave antiga em claro)"""
+    with open(key_file, 'rb') as f:
+        data = f.read()
+    try:
+        doc = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(doc, dict) or doc.get("format") != FORMAT:
+        raise VaultError(f"Arquivo de chave inválido: {key_file}")
+    if doc.get("version") != VERSION:
+        raise VaultError(f"Versão do arquivo de chave não suportada: {doc.get('version')}")
+    return doc
+
+
+def _write_keystore(key_file, doc):
+    """Grava o arquivo de chave de forma atômica e só legível pelo dono"""
+    tmp = key_file + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(doc, f, indent=2)
+        f.write("\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, key_file)
+    _fsync_dir(key_file)
+
+
+def write_keystore(key_file, passphrase, data_keys, params=None):
+    """Cifra as chaves de dados com a senha mestra e grava o arquivo"""
+    from cryptography.fernet import Fernet
+
+    params = dict(params or DEFAULT_PARAMS)
+    salt = secrets.token_bytes(SALT_BYTES)
+    wrapper = Fernet(derive_key(passphrase, salt, **params))
+    _write_keystore(key_file, {
+        "format": FORMAT,
+        "version": VERSION,
+        "kdf": {"name": "scrypt",
+                "salt": base64.b64encode(salt).decode(), **params},
+        "keys": [wrapper.encrypt(key).decode() for key in data_keys],
+    })
+
+
+def unwrap_keys(key_file, passphrase):
+    """Chaves de dados do arquivo (a chave antiga em claro é convertida)"""
+    from cryptography.fernet import Fernet, InvalidToken
+
+    doc = read_keystore(key_file)
+    if doc is None:
+        with open(key_file, 'rb') as f:
+            keys = [f.read().strip()]
+        write_keystore(key_file, passphrase, keys)
+        return keys
+
+    kdf = doc["kdf"]
+    if kdf.get("name") != "scrypt":
+        raise VaultError(f"Derivação de chave desconhecida: {kdf.get('name')}")
+    salt = base64.b64decode(kdf["salt"])
+    wrapper = Fernet(derive_key(passphrase, salt, kdf["n"], kdf["r"], kdf["p"]))
+    try:
+        return [wrapper.decrypt(token.encode()) for token in doc["keys"]]
+    except InvalidToken:
+        raise WrongPassphrase("Senha mestra incorreta")
+
+
+def needs_new_passphrase(key_file):
+    """True se ainda não há senha mestra (arquivo ausente ou no formato antigo)"""
+    return not os.path.exists(key_file) or read_keystore(key_file) is None
+
+
+def load_or_create_key(key_file, passphrase):
+    """Carrega ou cria a chave do cofre protegida pela senha mestra"""
+    from cryptography.fernet import Fernet
+
+    if os.path.exists(key_file):
+        return _cipher(unwrap_keys(key_file, passphrase))
+    key = Fernet.generate_key()
+    write_keystore(key_file, passphrase, [key])
+    return _cipher([key])
+
+
+def change_passphrase(key_file, passphrase, new_passphrase=None, params=None):
+    """Recifra as chaves de dados com nova senha e/ou novos parâmetros"""
+    keys = unwrap_keys(key_file, passphrase)
+    if params is None:
+        doc = read_keystore(key_file)
+        params = {name: doc["kdf"][name] for name in ("n", "r", "p")}
+    write_keystore(key_file, new_passphrase or passphrase, keys, params)
+
+
+def token_path(key_file):
+    """Arquivo do token de acesso ao serviço local, ao lado da chave"""
+    return key_file + ".token"
+
+
+def read_token(key_file):
+    """Token do serviço local (None se ainda não foi criado)"""
+    try:
+        with open(token_path(key_file), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_or_create_token(key_file):
+    """Token do serviço local, criado na primeira vez só legível pelo dono"""
+    path = token_path(key_file)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        if os.stat(path).st_mode & 0o077:
+            os.chmod(path, 0o600)
+        token = read_token(key_file)
+        if token is None:
+            raise VaultError(f"Token vazio: {path}")
+        return token
+    token = secrets.token_urlsafe(32)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return token
+
+
+def _time_scrypt(n, r, p, salt):
+    start = time.perf_counter()
+    derive_key("calibração", salt, n, r, p)
+    return (time.perf_counter() - start) * 1000
+
+
+def calibrate(target_ms=500, max_memory_mb=256, r=8, p=1):
+    """Escolhe n para a derivação levar até target_ms nesta máquina
+
+    n dobra enquanto a próxima medição ainda couber no tempo alvo e no
+    limite de memória. Retorna (parâmetros, ms medidos, MB usados).
+    """
+    budget = max_memory_mb * 1024 * 1024
+    salt = secrets.token_bytes(SALT_BYTES)
+    n = MIN_N
+    elapsed = _time_scrypt(n, r, p, salt)
+    # O custo do scrypt cresce linearmente com n
+    while elapsed * 2 <= target_ms and scrypt_memory(n * 2, r, p) <= budget:
+        n *= 2
+        elapsed = _time_scrypt(n, r, p, salt)
+    params = {"n": n, "r": r, "p": p}
+    return params, elapsed, scrypt_memory(n, r, p) / (1024 * 1024)
+
+
+class KeySession:
+    """Chave do cofre em memória durante a sessão
+
+    A senha mestra é derivada uma vez no desbloqueio; depois disso cipher()
+    devolve a chave já pronta. Se ficar idle_seconds sem uso, a chave é
+    esquecida e é preciso desbloquear de novo.
+    """
+
+    def __init__(self, key_file, idle_seconds=IDLE_SECONDS):
+        self.key_file = key_file
+        self.idle_seconds = idle_seconds
+        self._cipher = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def needs_new_passphrase(self):
+        return needs_new_passphrase(self.key_file)
+
+    def unlock(self, passphrase):
+        """Deriva a chave (lento, de propósito) e guarda para a sessão"""
+        cipher = load_or_create_key(self.key_file, passphrase)
+        with self._lock:
+            self._cipher = cipher
+            self._last_used = time.monotonic()
+        return cipher
+
+    def _expired(self):
+        return (self._cipher is not None
+                and time.monotonic() - self._last_used > self.idle_seconds)
+
+    @property
+    def unlocked(self):
+        with self._lock:
+            return self._cipher is not None and not self._expired()
+
+    def expired(self):
+        """True se a chave está em memória mas passou do tempo de inatividade"""
+        with self._lock:
+            return self._expired()
+
+    def cipher(self):
+        """Chave da sessão; VaultLocked se não desbloqueada ou expirada"""
+        with self._lock:
+            if self._cipher is None or self._expired():
+                self._cipher = None
+                raise VaultLocked("Cofre bloqueado: digite a senha mestra")
+            self._last_used = time.monotonic()
+            return self._cipher
+
+    def touch(self):
+        """Registra uso (adia a expiração)"""
+        with self._lock:
+            if self._cipher is not None and not self._expired():
+                self._last_used = time.monotonic()
+
+    def lock(self):
+        """Esquece a chave"""
+        with self._lock:
+            self._cipher = None
@@ -0,0 +1,206 @@
+"""Métricas internas: contadores e histogramas de latência.
+
+Desligadas por padrão. Com a variável de ambiente PGP_METRICS definida
+(ou enable() chamado, ex.: pela aba de diagnóstico) os pontos
+instrumentados passam a registrar; desligadas, timer() devolve um
+contexto vazio compartilhado e inc()/observe() retornam na primeira
+linha, então o custo é o de uma chamada de função.
+
+    with metrics.timer("vault.load"):
+        ...
+    metrics.inc("vault.bytes_read", len(data))
+
+    @metrics.timed("ui.generate")
+    def generate_password(self): ...
+
+Os histogramas têm faixas fixas (1-2-5 de 1 µs a 50 s), como os do
+Prometheus: registrar custa uma busca binária e a memória não cresce com
+o número de amostras. Os percentis são estimados dentro da faixa.
+"""
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import wraps
+
+# Limites superiores das faixas (segundos)
+LATENCY_BOUNDS = tuple(m * 10.0 ** e for e in range(-6, 2) for m in (1, 2, 5))
+
+_enabled = bool(os.environ.get("PGP_METRICS"))
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Contagem de amostras por faixa, soma e total"""
+
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimativa do quantil q (interpolação linear dentro da faixa,
+        limitada aos valores mínimo e máximo vistos)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                low = self.bounds[i - 1] if i else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else low * 2
+                value = low + (high - low) * (rank - seen) / n
+                return min(max(value, self.min), self.max)
+            seen += n
+        return self.max
+
+    def snapshot(self):
+        return {"count": self.count,
+                "sum_ms": self.sum * 1000,
+                "mean_ms": self.sum / self.count * 1000 if self.count else 0.0,
+                "max_ms": self.max * 1000,
+                "p50_ms": self.quantile(0.50) * 1000,
+                "p95_ms": self.quantile(0.95) * 1000,
+                "p99_ms": self.quantile(0.99) * 1000}
+
+
+class _Timer:
+    """Mede o bloco with e registra no histograma name"""
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def enable(flag=True):
+    """Liga (ou desliga) o registro de métricas"""
+    global _enabled
+    _enabled = flag
+
+
+def inc(name, value=1):
+    """Soma value ao contador name"""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name, seconds):
+    """Registra uma duração no histograma name"""
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+
+def timer(name):
+    """Contexto que mede o bloco (vazio se as métricas estão desligadas)"""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def timed(name):
+    """Decorador: mede cada chamada (o flag é consultado a cada chamada)"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def reset():
+    """Zera contadores e histogramas"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def snapshot():
+    """Cópia dos valores atuais: {"counters": {...}, "histograms": {...}}"""
+    with _lock:
+        return {"counters": dict(sorted(_counters.items())),
+                "histograms": {name: h.snapshot()
+                               for name, h in sorted(_histograms.items())}}
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=2, ensure_ascii=False)
+
+
+def _metric_name(prefix, name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{name}")
+
+
+def to_prometheus(prefix="pgp"):
+    """Texto no formato de exposição do Prometheus"""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = [(name, list(h.buckets), h.count, h.sum, h.bounds)
+                      for name, h in sorted(_histograms.items())]
+    lines = []
+    for name, value in counters:
+        metric = _metric_name(prefix, name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    for name, buckets, count, total, bounds in histograms:
+        metric = _metric_name(prefix, name) + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, n in zip(bounds, buckets):
+            cumulative += n
+            lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines += [f'{metric}_bucket{{le="+Inf"}} {count}',
+                  f"{metric}_sum {total:.9f}", f"{metric}_count {count}"]
+    return "\n".join(lines) + "\n"
+
+
+def report():
+    """Resumo legível (aba de diagnóstico)"""
+    data = snapshot()
+    lines = [f"Métricas {'ligadas' if _enabled else 'desligadas'}", ""]
+    if data["histograms"]:
+        lines.append(f"{'operação':<28}{'n':>8}{'média':>10}{'p50':>10}"
+                     f"{'p95':>10}{'p99':>10}  (ms)")
+        for name, h in data["histograms"].items():
+            lines.append(f"{name:<28}{h['count']:>8}{h['mean_ms']:>10.3f}"
+                         f"{h['p50_ms']:>10.3f}{h['p95_ms']:>10.3f}{h['p99_ms']:>10.3f}")
+        lines.append("")
+    for name, value in data["counters"].items():
+        lines.append(f"{name:<28}{value:>14,}")
+    return "\n".join(lines)
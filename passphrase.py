@@ -0,0 +1,269 @@
+"""Frases-senha (diceware) sorteadas de listas de palavras.
+
+Formato compacto das listas (.pgpw), criado com build_wordlist():
+
+    cabeçalho  b"PGPWORD1" + quantidade de palavras (uint32, little-endian)
+    offsets    quantidade + 1 posições (uint32, little-endian) no blob
+    blob       palavras em UTF-8, concatenadas
+
+O arquivo é aberto com mmap e os offsets são lidos direto do mapa com
+memoryview.cast, sem criar um objeto por palavra: listas de centenas de
+milhares de palavras abrem na hora e só as páginas consultadas vão para a
+memória. Listas em texto (uma palavra por linha, ou no formato da EFF,
+"11111<tab>palavra") são convertidas para a mesma estrutura em memória
+(um blob e um array('I')) uma única vez.
+
+Os índices das palavras são sorteados em lote de os.urandom, com
+rejeição para não haver viés de módulo.
+"""
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+from itertools import repeat
+
+MAGIC = b"PGPWORD1"
+HEADER = struct.Struct("<8sI")
+
+DEFAULT_WORDLIST = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "wordlists", "pt-br.txt")
+
+CAPITALIZE = ("lower", "title", "random", "upper")
+
+# Entropia mínima das frases com a quantidade padrão de palavras (a de
+# 6 palavras da lista grande da EFF, 7776 palavras)
+TARGET_BITS = 77
+# Quantidade padrão para a lista padrão (1215 palavras, ~10,2 bits cada):
+# 8 palavras, ~82 bits
+DEFAULT_WORDS = 8
+
+# Quantidade aproximada de palavras sorteadas por bloco
+BLOCK_WORDS = 1 << 15
+
+
+class WordlistError(Exception):
+    """Lista de palavras ausente ou inválida"""
+
+
+def _read_words(source):
+    """Palavras únicas de uma lista em texto, na ordem em que aparecem"""
+    seen = {}
+    for line in source:
+        parts = line.split()
+        # Linhas em branco e comentários são ignoradas; no formato da EFF
+        # a palavra é a última coluna
+        if not parts or parts[0].startswith(b"#"):
+            continue
+        seen.setdefault(parts[-1], None)
+    return seen
+
+
+def _compile(words):
+    """Blob e offsets de uma sequência de palavras (bytes)"""
+    offsets = array("I", [0])
+    total = 0
+    for word in words:
+        total += len(word)
+        offsets.append(total)
+    return b"".join(words), offsets
+
+
+def build_wordlist(source_path, output_path):
+    """Converte lista em texto para o formato compacto; retorna a quantidade"""
+    with open(source_path, 'rb') as source:
+        words = _read_words(source)
+    if len(words) < 2:
+        raise WordlistError(f"Lista com menos de duas palavras: {source_path}")
+    blob, offsets = _compile(words)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+
+    tmp = output_path + ".tmp"
+    with open(tmp, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, len(words)))
+        offsets.tofile(out)
+        out.write(blob)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, output_path)
+    return len(words)
+
+
+class Wordlist:
+    """Lista de palavras somente leitura (compacta ou em texto)"""
+
+    def __init__(self, path=DEFAULT_WORDLIST):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._data = self._offsets = self._ends = None
+        try:
+            with open(path, 'rb') as f:
+                magic = f.read(len(MAGIC))
+                if magic != MAGIC:
+                    f.seek(0)
+                    words = _read_words(f)
+        except OSError as e:
+            raise WordlistError(f"Lista de palavras indisponível: {e}")
+
+        if magic == MAGIC:
+            self._open_compact(path)
+        else:
+            if len(words) < 2:
+                raise WordlistError(f"Lista com menos de duas palavras: {path}")
+            blob, self._offsets = _compile(words)
+            self._data = memoryview(blob)
+            self.count = len(words)
+        # Fim da palavra i = início da i + 1 (visão, sem cópia)
+        self._ends = memoryview(self._offsets)[1:]
+
+    def _open_compact(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        _, self.count = HEADER.unpack_from(self._map, 0)
+        base = HEADER.size + (self.count + 1) * 4
+        # Validado antes de criar as visões: com elas o mmap não fecha
+        if (self.count < 2 or len(self._map) < base
+                or base + struct.unpack_from("<I", self._map, base - 4)[0] != len(self._map)):
+            self.close()
+            raise WordlistError(f"Lista de palavras inválida: {path}")
+        view = memoryview(self._map)[HEADER.size:base]
+        if sys.byteorder == "little":
+            self._offsets = view.cast("I")
+        else:
+            self._offsets = array("I", view)
+            self._offsets.byteswap()
+            view.release()
+        self._data = memoryview(self._map)[base:]
+
+    def __len__(self):
+        return self.count
+
+    def word(self, i):
+        """Palavra de índice i"""
+        return str(self._data[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def words(self, indices):
+        """Palavras dos índices dados, sem laço Python por palavra"""
+        starts = map(self._offsets.__getitem__, indices)
+        ends = map(self._ends.__getitem__, indices)
+        views = map(self._data.__getitem__, map(slice, starts, ends))
+        return list(map(str, views, repeat("utf-8")))
+
+    def close(self):
+        if self._map is not None:
+            # As visões do mmap precisam ser liberadas antes de fechá-lo
+            for view in (self._data, self._ends, self._offsets):
+                if isinstance(view, memoryview):
+                    view.release()
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+
+def default_words(wordlist):
+    """Palavras necessárias para chegar a TARGET_BITS com a lista dada"""
+    return max(1, math.ceil(TARGET_BITS / math.log2(len(wordlist))))
+
+
+def _uniform(n, bound):
+    """n inteiros uniformes em [0, bound), bound < 2**32"""
+    limit = (1 << 32) - (1 << 32) % bound
+    values = []
+    while len(values) < n:
+        words = memoryview(os.urandom(4 * (n - len(values)) + 64)).cast("I")
+        values.extend(map(bound.__rmod__, filter(limit.__gt__, words)))
+    del values[n:]
+    return values
+
+
+class PassphraseGenerator:
+    """Gera frases-senha em lote a partir de uma Wordlist
+
+    words=None usa default_words(): a quantidade que chega a TARGET_BITS.
+    """
+
+    def __init__(self, wordlist, words=None, separator="-", capitalize="lower",
+                 digits=0):
+        if words is None:
+            words = default_words(wordlist)
+        if words < 1:
+            raise ValueError("Quantidade de palavras deve ser positiva")
+        if capitalize not in CAPITALIZE:
+            raise ValueError(f"Capitalização inválida: {capitalize}")
+        if not 0 <= digits <= 9:
+            raise ValueError("Quantidade de dígitos deve estar entre 0 e 9")
+        self.wordlist = wordlist
+        self.words = words
+        self.separator = separator
+        self.capitalize = capitalize
+        self.digits = digits
+        self._per_block = max(1, BLOCK_WORDS // words)
+
+    def entropy_bits(self):
+        """Entropia da frase (bits), supondo que a lista é conhecida"""
+        bits = self.words * math.log2(len(self.wordlist))
+        if self.capitalize == "random":
+            bits += self.words
+        if self.digits:
+            bits += self.digits * math.log2(10) + math.log2(self.words)
+        return bits
+
+    def _batch(self, count):
+        """Lista com count frases"""
+        k = self.words
+        words = self.wordlist.words(_uniform(count * k, len(self.wordlist)))
+        if self.capitalize == "title":
+            words = list(map(str.capitalize, words))
+        elif self.capitalize == "upper":
+            words = list(map(str.upper, words))
+        elif self.capitalize == "random":
+            flags = os.urandom(len(words))
+            words = [w.capitalize() if f & 1 else w for w, f in zip(words, flags)]
+
+        if self.digits:
+            # Número de `digits` algarismos colado ao fim de uma palavra sorteada
+            numbers = map(f"{{:0{self.digits}d}}".format,
+                          _uniform(count, 10 ** self.digits))
+            targets = list(map(int.__add__, range(0, count * k, k),
+                               _uniform(count, k)))
+            # Atribuição em lote: deque(maxlen=0) só consome o map
+            deque(map(words.__setitem__, targets,
+                      map(str.__add__, map(words.__getitem__, targets), numbers)),
+                  maxlen=0)
+
+        # Agrupa de k em k sem laço Python por frase
+        return list(map(self.separator.join, zip(*[iter(words)] * k)))
+
+    def iter_lines(self, count, newline=b"\n"):
+        """Gera blocos de bytes com uma frase por linha"""
+        while count > 0:
+            batch = min(count, self._per_block)
+            text = "\n".join(self._batch(batch)) + "\n"
+            block = text.encode()
+            if newline != b"\n":
+                block = block.replace(b"\n", newline)
+            yield block
+            count -= batch
+
+    def generate(self, count):
+        """Retorna lista com count frases"""
+        phrases = []
+        while count > 0:
+            batch = min(count, self._per_block)
+            phrases.extend(self._batch(batch))
+            count -= batch
+        return phrases
+
+    def generate_one(self):
+        """Retorna uma única frase"""
+        return self._batch(1)[0]
+
+    def write(self, out, count):
+        """Escreve count frases (uma por linha) em um arquivo binário"""
+        for block in self.iter_lines(count):
+            out.write(block)
+        out.flush()
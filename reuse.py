@@ -0,0 +1,258 @@
+"""Detecção de senhas reutilizadas e parecidas no cofre.
+
+Cada senha entra no índice por:
+
+- hash exato da senha, para senhas iguais;
+- um esboço MinHash dos trigramas da senha (em minúsculas, com as trocas
+  l33t desfeitas e marcas de início e fim), para senhas parecidas. Cada
+  um dos SKETCH_SIZE valores do esboço é o menor hash entre os trigramas;
+  a fração de valores iguais entre dois esboços estima a similaridade de
+  Jaccard entre os conjuntos de trigramas. "Summer2024!", "Summer2025!",
+  "Sumer2024!" e "Summer2024!x" ficam acima de SIMILARITY entre si;
+  "abcd1234" e "1234abcd" (mesmos caracteres, outra ordem) ficam abaixo.
+
+Para não comparar com o cofre todo, o esboço é cortado em BANDS faixas de
+BAND_ROWS valores (LSH por faixas): só são comparadas senhas que
+coincidem em alguma faixa inteira. Com as constantes abaixo, pares com
+similaridade 0,6 viram candidatos com probabilidade acima de 99%; a
+comparação é aproximada, e pares perto de SIMILARITY podem escapar.
+
+Os hashes são calculados com chave secreta sorteada por índice (BLAKE2b
+para o exato, SHAKE256 com a chave à frente para os trigramas): o índice
+não guarda as senhas nem valores que possam ser atacados por dicionário
+fora do processo. Consultar e atualizar custa O(BANDS) por senha, mais
+a conferência dos candidatos; o relatório completo só compara as senhas
+que dividem alguma faixa com outra.
+"""
+import hashlib
+import secrets
+from array import array
+
+from estimator import L33T_TABLES
+
+DIGEST_BYTES = 16
+SKETCH_SIZE = 64
+BANDS = 21
+BAND_ROWS = 3
+SIMILARITY = 0.4
+MAX_BUCKET = 16
+GRAM_CACHE = 1 << 18
+
+# Marcas de início e fim: os trigramas das pontas pesam mais, e senhas com
+# os mesmos pedaços em outra ordem ficam distantes
+_START = b"\x02\x02"
+_END = b"\x03\x03"
+# Trocas l33t como tabela de bytes (bytes.translate é bem mais rápido que
+# str.translate); bytes não ASCII do UTF-8 ficam como estão
+_L33T = bytes(L33T_TABLES[0].get(i, i) if i < 128 else i for i in range(256))
+
+# O esboço é um int com um valor de 16 bits em cada faixa de 32 bits: o
+# mínimo valor a valor e a contagem de iguais saem de poucas operações
+# com o int inteiro, em vez de um laço Python por valor
+_LANE = 32
+_ONES = int.from_bytes(array("I", [1] * SKETCH_SIZE).tobytes(), "little")
+_GUARD = _ONES << 16
+_LOW = _ONES * 0xFFFF
+_BAND_BYTES = _LANE * BAND_ROWS // 8
+# Número da faixa nos bits altos (sempre zero) do primeiro valor de cada
+# faixa: chaves de faixas diferentes nunca coincidem
+_BAND_TAGS = sum(band << (16 + 8 * _BAND_BYTES * band) for band in range(BANDS))
+
+
+def trigrams(password):
+    """Trigramas (bytes) da forma normalizada da senha"""
+    text = _START + password.lower().encode().translate(_L33T) + _END
+    return [text[i:i + 3] for i in range(len(text) - 2)]
+
+
+def _pack(digest):
+    """SKETCH_SIZE valores de 16 bits (bytes) no formato do esboço"""
+    return int.from_bytes(array("I", memoryview(digest).cast("H")).tobytes(), "little")
+
+
+def similarity(sketch, other):
+    """Fração de valores iguais entre dois esboços (estima o Jaccard)"""
+    differ = ((sketch ^ other) + _LOW) & _GUARD
+    return 1 - differ.bit_count() / SKETCH_SIZE
+
+
+def _band_keys(sketch):
+    """Chave (bytes) de cada faixa do esboço: valores e número da faixa"""
+    data = (sketch | _BAND_TAGS).to_bytes(_LANE * SKETCH_SIZE // 8, "little")
+    return [data[start:start + _BAND_BYTES]
+            for start in range(0, BANDS * _BAND_BYTES, _BAND_BYTES)]
+
+
+class ReuseIndex:
+    """Índice de senhas por hash exato e por esboço MinHash"""
+
+    def __init__(self, entries=(), key=None):
+        self._key = key or secrets.token_bytes(32)
+        # Hash já com a chave: cada digest copia o estado inicial
+        self._hash = hashlib.blake2b(key=self._key, digest_size=DIGEST_BYTES)
+        # hash exato -> id, ou lista de ids quando há mais de um
+        self._exact = {}
+        self._keys = {}
+        # Um esboço por senha distinta; faixa -> hash exato (ou lista), e
+        # as faixas com mais de uma senha
+        self._sketches = {}
+        self._bands = {}
+        self._shared = set()
+        # trigrama -> hashes já no formato do esboço
+        self._grams = {}
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _digest(self, password):
+        h = self._hash.copy()
+        h.update(password.encode())
+        return h.digest()
+
+    def sketch(self, password):
+        """Esboço MinHash da senha (int com SKETCH_SIZE valores de 16 bits)"""
+        grams = self._grams
+        text = trigrams(password)
+        hashes = list(map(grams.get, text))
+        if None in hashes:
+            if len(grams) >= GRAM_CACHE:
+                grams.clear()
+            for i, gram in enumerate(text):
+                if hashes[i] is None:
+                    digest = hashlib.shake_256(self._key + gram).digest(2 * SKETCH_SIZE)
+                    hashes[i] = grams[gram] = _pack(digest)
+        # Mínimo valor a valor: o bit de guarda de cada faixa continua
+        # ligado onde sketch >= value, e a máscara escolhe value ali
+        guard = _GUARD
+        sketch = hashes[0]
+        for value in hashes[1:]:
+            ge = (((sketch | guard) - value) & guard) >> 16
+            sketch ^= (sketch ^ value) & ((ge << 16) - ge)
+        return sketch
+
+    @staticmethod
+    def _insert(table, key, value):
+        values = table.get(key)
+        if values is None:
+            table[key] = value
+        elif isinstance(values, list):
+            values.append(value)
+        else:
+            table[key] = [values, value]
+
+    @staticmethod
+    def _discard(table, key, value):
+        values = table.get(key)
+        if values == value:
+            del table[key]
+        elif isinstance(values, list):
+            values.remove(value)
+            if len(values) == 1:
+                table[key] = values[0]
+
+    @staticmethod
+    def _values(table, key):
+        values = table.get(key)
+        if values is None:
+            return []
+        return list(values) if isinstance(values, list) else [values]
+
+    def add(self, entry):
+        """Indexa (ou reindexa) a senha de uma entrada"""
+        entry_id = entry["id"]
+        if entry_id in self._keys:
+            self.remove(entry_id)
+        password = entry.get("password", "")
+        exact = self._digest(password)
+        self._keys[entry_id] = exact
+        if exact not in self._sketches:
+            bands = self._bands
+            sketch = self._sketches[exact] = self.sketch(password)
+            for band in _band_keys(sketch):
+                if bands.setdefault(band, exact) is not exact:
+                    self._insert(bands, band, exact)
+                    self._shared.add(band)
+        self._insert(self._exact, exact, entry_id)
+
+    def remove(self, entry_id):
+        """Remove a entrada do índice"""
+        exact = self._keys.pop(entry_id, None)
+        if exact is None:
+            return
+        self._discard(self._exact, exact, entry_id)
+        if exact not in self._exact:
+            for band in _band_keys(self._sketches.pop(exact)):
+                self._discard(self._bands, band, exact)
+                if not isinstance(self._bands.get(band), list):
+                    self._shared.discard(band)
+
+    def _close(self, exact, sketch):
+        """Senhas distintas (hash exato) parecidas com o esboço"""
+        found = []
+        seen = {exact}
+        for band in _band_keys(sketch):
+            for other in self._values(self._bands, band):
+                if other not in seen:
+                    seen.add(other)
+                    if similarity(sketch, self._sketches[other]) >= SIMILARITY:
+                        found.append(other)
+        return found
+
+    def check(self, password, exclude=None):
+        """Ids com a mesma senha e ids com senha parecida (não repetidos)"""
+        exact = self._digest(password)
+        same = [i for i in self._values(self._exact, exact) if i != exclude]
+        sketch = self._sketches.get(exact)
+        if sketch is None:
+            sketch = self.sketch(password)
+        close = [i for other in self._close(exact, sketch)
+                 for i in self._values(self._exact, other) if i != exclude]
+        return same, close
+
+    def _leader(self, sketch, bands, leaders):
+        """Primeiro líder parecido com o esboço, entre os das suas faixas"""
+        for band in bands:
+            candidates = leaders.get(band, ())
+            # Faixa de um trigrama comum (como "!" no fim) com valores
+            # baixos: junta senhas sem relação, e as parecidas de verdade
+            # coincidem também em outras faixas
+            if len(candidates) > MAX_BUCKET:
+                continue
+            for other in candidates:
+                if similarity(sketch, self._sketches[other]) >= SIMILARITY:
+                    return other
+        return None
+
+    def groups(self):
+        """Grupos de reuso: (tipo, ids), com tipo "igual" ou "parecida"
+
+        Um grupo "parecida" tem uma senha de referência (a primeira do
+        índice) e as senhas distintas parecidas com ela, com todas as
+        entradas de cada uma. Não encadeia: A parecida com B e B com C
+        não junta A e C se as duas não forem parecidas.
+        """
+        result = [("igual", ids) for ids in self._exact.values()
+                  if isinstance(ids, list)]
+        # Só quem divide alguma faixa com outra senha pode ter parecidas
+        shared = {exact for band in self._shared for exact in self._bands[band]}
+        members = {}
+        leaders = {}
+        for exact, sketch in self._sketches.items():
+            if exact not in shared:
+                continue
+            bands = _band_keys(sketch)
+            leader = self._leader(sketch, bands, leaders)
+            if leader is not None:
+                members[leader].append(exact)
+                continue
+            members[exact] = [exact]
+            for band in bands:
+                if band in self._shared:
+                    leaders.setdefault(band, []).append(exact)
+        for exacts in members.values():
+            if len(exacts) > 1:
+                result.append(("parecida", [i for exact in exacts
+                                            for i in self._values(self._exact, exact)]))
+        return result
@@ -0,0 +1,328 @@
+"""Rotação da chave de dados do cofre.
+
+Uma chave nova é gerada e gravada como primeira chave do arquivo de chave,
+com a antiga logo atrás: a partir daí registros novos já usam a chave nova
+e os antigos continuam legíveis, então o cofre nunca fica inacessível no
+meio da rotação. Em seguida o log é recifrado em fluxo
+
+    leitura em blocos -> decifra + cifra (processos) -> escrita em ordem
+
+para ``<arquivo>.rotate``, primeiro o arquivo de segredos e depois o de
+metadados. A cada CHECKPOINT_BYTES gravados o arquivo temporário recebe
+fsync e a posição é salva em ``passwords.enc.rotate.json``; se a rotação
+for interrompida, rodar de novo continua desse ponto. No fim de cada
+arquivo os registros acrescentados durante a rotação também são recifrados
+e o arquivo é trocado de forma atômica, tudo com a trava do cofre
+(vault.file_lock): gravações de outros processos esperam e nada
+acrescentado no meio se perde. Se o cofre foi compactado durante a
+rotação, a troca não é feita. Só depois dos dois arquivos a chave antiga é
+removida do arquivo de chave. Processos que abriram o cofre antes da
+rotação ficam só com a chave antiga; depois da troca o Vault deles recusa
+gravar (VaultError, ver Vault._check_key) em vez de acrescentar registros
+que a chave nova não leria.
+
+Cada token mantém a data original do registro (como MultiFernet.rotate) e
+o mesmo tamanho (o do token Fernet só depende do texto), então os
+deslocamentos dos segredos gravados nos metadados continuam valendo.
+Linhas que não decifram são copiadas como estão pelo mesmo motivo.
+"""
+import base64
+import hashlib
+import json
+import os
+import time
+from collections import deque
+
+from keystore import _cipher, read_keystore, unwrap_keys, write_keystore
+from vault import Vault, VaultError, _fsync_dir, file_lock
+
+# Tamanho de cada bloco enviado a um processo
+BLOCK_BYTES = 1 << 20
+CHECKPOINT_BYTES = 16 << 20
+
+
+def _fingerprint(key):
+    """Identifica uma chave sem revelá-la"""
+    return hashlib.sha256(key).hexdigest()[:16]
+
+
+def _kdf_params(key_file):
+    doc = read_keystore(key_file)
+    return {name: doc["kdf"][name] for name in ("n", "r", "p")}
+
+
+def _init_worker(keys):
+    """Cria as cifras do processo: keys[0] é a nova, as demais são antigas"""
+    global _worker_ciphers
+    from cryptography.fernet import Fernet
+
+    _worker_ciphers = (Fernet(keys[0]), _cipher(keys[1:]) if keys[1:] else None)
+
+
+def _timestamp(token):
+    """Data de criação gravada no token (12 primeiros caracteres = 9 bytes)"""
+    return int.from_bytes(base64.urlsafe_b64decode(token[:12])[1:9], "big")
+
+
+def _rotate_block(block):
+    """Recifra um bloco de linhas; retorna (bloco novo, registros, corrompidos)
+
+    Decifra direto com as chaves antigas (tentar a nova primeiro, como faz
+    MultiFernet.rotate, custa uma verificação de HMAC a mais por registro)
+    e cifra com a nova mantendo a data original do registro.
+    """
+    from cryptography.fernet import InvalidToken
+
+    new, old = _worker_ciphers
+    out = []
+    skipped = 0
+    for token in block.split(b"\n")[:-1]:
+        if not token:
+            out.append(token)
+            continue
+        try:
+            if old is None:
+                raise InvalidToken
+            out.append(new.encrypt_at_time(old.decrypt(token), _timestamp(token)))
+        except InvalidToken:
+            try:
+                # Registro gravado já com a chave nova durante a rotação
+                new.decrypt(token)
+                out.append(token)
+            except InvalidToken:
+                # Registro corrompido: fica como está (a leitura do cofre o
+                # acusa) para não deslocar as linhas seguintes
+                out.append(token)
+                skipped += 1
+    out.append(b"")
+    return b"\n".join(out), len(out) - 1 - skipped, skipped
+
+
+def _read_blocks(f, stop, block_bytes):
+    """Blocos de linhas inteiras de f até o deslocamento stop"""
+    while f.tell() < stop:
+        data = f.read(min(block_bytes, stop - f.tell()))
+        if not data:
+            break
+        cut = data.rfind(b"\n") + 1
+        if cut == 0:
+            # Linha maior que o bloco: lê até o fim dela
+            data += f.readline()
+            cut = len(data)
+        elif cut < len(data):
+            f.seek(cut - len(data), os.SEEK_CUR)
+        yield data[:cut]
+
+
+class KeyRotation:
+    """Recifra o cofre com uma chave nova, em paralelo e retomável"""
+
+    def __init__(self, vault_path, key_file, passphrase, workers=None,
+                 block_bytes=BLOCK_BYTES, progress=None):
+        self.vault_path = vault_path
+        self.key_file = key_file
+        self.passphrase = passphrase
+        self.workers = workers or os.cpu_count() or 1
+        if self.workers < 1:
+            raise ValueError("Quantidade de processos deve ser positiva")
+        self.block_bytes = block_bytes
+        self.progress = progress
+        self.checkpoint_path = vault_path + ".rotate.json"
+        self.records = 0
+        self.skipped = 0
+        self.resumed = False
+        self.elapsed = 0.0
+        self._vault = None
+        self._paths = None
+
+    # ----- ponto de retomada -----
+
+    def _load_checkpoint(self, keys):
+        """Estado salvo, se ainda vale para a chave atual"""
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if state.get("key") == _fingerprint(keys[0]) else None
+
+    def _save_checkpoint(self, state):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    @staticmethod
+    def _position(state, path):
+        """Posição salva para path, se ainda vale para o arquivo atual"""
+        position = state.get("positions", {}).get(path)
+        if position is None:
+            return None
+        try:
+            st = os.stat(path)
+            tmp_size = os.path.getsize(path + ".rotate")
+        except OSError:
+            return None
+        valid = (position.get("inode") == st.st_ino
+                 and position.get("offset", 0) <= st.st_size
+                 and position.get("written", 0) <= tmp_size)
+        return position if valid else None
+
+    def _clear(self, paths=()):
+        for path in [p + ".rotate" for p in paths] + [self.checkpoint_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    # ----- rotação -----
+
+    def _prepare_keys(self):
+        """Chaves [nova, antigas...] gravadas no arquivo de chave"""
+        from cryptography.fernet import Fernet
+
+        keys = unwrap_keys(self.key_file, self.passphrase)
+        state = self._load_checkpoint(keys)
+        if state is not None and len(keys) > 1:
+            self.resumed = True
+            return keys, state
+        self._clear()
+        keys = [Fernet.generate_key()] + keys
+        write_keystore(self.key_file, self.passphrase, keys,
+                       _kdf_params(self.key_file))
+        return keys, None
+
+    def _pipeline(self, blocks, keys):
+        """Blocos recifrados, na ordem de leitura"""
+        if self.workers == 1:
+            _init_worker(keys)
+            yield from map(_rotate_block, blocks)
+            return
+
+        # Importado aqui: multiprocessing é pesado e só serve a este modo
+        from concurrent.futures import ProcessPoolExecutor
+
+        pending = deque()
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                 initargs=(keys,)) as pool:
+            for block in blocks:
+                pending.append(pool.submit(_rotate_block, block))
+                # Limita os blocos em andamento (contrapressão)
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _report(self, offset, total, start):
+        self.elapsed = time.perf_counter() - start
+        if self.progress:
+            self.progress(offset, total, self.records, self.elapsed)
+
+    def _rotate_file(self, path, keys, state, base, total, start):
+        """Recifra um arquivo do cofre (o cabeçalho é copiado como está)"""
+        tmp_path = path + ".rotate"
+        position = self._position(state, path)
+        if position is None:
+            with open(path, 'rb') as src, open(tmp_path, 'wb') as out:
+                header = src.readline()
+                if not header.startswith(b"#pgp-"):
+                    raise VaultError(f"Formato desconhecido: {path}")
+                out.write(header)
+            position = {"inode": os.stat(path).st_ino, "offset": len(header),
+                        "written": len(header), "records": 0}
+            state["positions"][path] = position
+            self._save_checkpoint(state)
+        self.records += position["records"]
+        records = self.records - position["records"]
+
+        with open(path, 'rb') as src, open(tmp_path, 'r+b') as out:
+            out.truncate(position["written"])
+            out.seek(position["written"])
+            offset = position["offset"]
+            src.seek(offset)
+
+            # Fase longa: até o tamanho atual, com pontos de retomada
+            stop = os.fstat(src.fileno()).st_size
+            since_checkpoint = 0
+            blocks = _read_blocks(src, stop, self.block_bytes)
+            sizes = deque()
+            for data, count, skipped in self._pipeline(
+                    _counting(blocks, sizes), keys):
+                out.write(data)
+                offset += sizes.popleft()
+                self.records += count
+                self.skipped += skipped
+                since_checkpoint += len(data)
+                if since_checkpoint >= CHECKPOINT_BYTES:
+                    out.flush()
+                    os.fsync(out.fileno())
+                    position.update(offset=offset, written=out.tell(),
+                                    records=self.records - records)
+                    self._save_checkpoint(state)
+                    since_checkpoint = 0
+                self._report(base + offset, total, start)
+
+            # Registros acrescentados durante a rotação (poucos, em série),
+            # com a trava do cofre da leitura do fim até a troca
+            _init_worker(keys)
+            with file_lock(self.vault_path):
+                if self._vault.files() != self._paths:
+                    raise VaultError("O cofre foi compactado durante a rotação; "
+                                     "rode o comando de novo")
+                src.seek(offset)
+                for block in _read_blocks(src, os.fstat(src.fileno()).st_size,
+                                          self.block_bytes):
+                    data, count, skipped = _rotate_block(block)
+                    out.write(data)
+                    self.records += count
+                    self.skipped += skipped
+                out.flush()
+                os.fsync(out.fileno())
+                os.replace(tmp_path, path)
+                _fsync_dir(path)
+        del state["positions"][path]
+        state["done"].append(path)
+        state["records"] = self.records
+        self._save_checkpoint(state)
+        return stop
+
+    def run(self):
+        """Executa (ou retoma) a rotação; retorna registros recifrados"""
+        if not os.path.exists(self.vault_path):
+            raise VaultError(f"Cofre não encontrado: {self.vault_path}")
+        start = time.perf_counter()
+        keys, state = self._prepare_keys()
+        # Abrir o cofre converte o formato antigo e descarta escrita incompleta
+        vault = Vault(self.vault_path, _cipher(keys))
+        paths = vault.files()
+        self._vault, self._paths = vault, paths
+
+        if state is None or state.get("paths") != paths:
+            # Nova rotação, ou o cofre foi compactado desde a interrupção:
+            # recomeça (tokens já com a chave nova são só copiados)
+            if state is not None:
+                self._clear(state.get("paths", ()))
+            state = {"key": _fingerprint(keys[0]), "paths": paths,
+                     "positions": {}, "done": [], "records": 0}
+            self._save_checkpoint(state)
+        self.records = state["records"]
+        pending = [path for path in paths
+                   if path not in state["done"] and os.path.exists(path)]
+        total = sum(os.path.getsize(path) for path in pending)
+        base = 0
+        for path in pending:
+            base += self._rotate_file(path, keys, state, base, total, start)
+
+        # Só depois da troca a chave antiga deixa de ser necessária
+        write_keystore(self.key_file, self.passphrase, keys[:1],
+                       _kdf_params(self.key_file))
+        self._clear(paths)
+        self._report(total, total, start)
+        return self.records
+
+
+def _counting(blocks, sizes):
+    """Repassa os blocos anotando o tamanho de cada um em sizes"""
+    for block in blocks:
+        sizes.append(len(block))
+        yield block
@@ -0,0 +1,440 @@
+"""Serviço local de geração, análise de força e consulta ao cofre.
+
+Servidor HTTP/1.1 mínimo sobre asyncio, sem dependências externas, em um
+socket Unix (permissão 0600) ou em TCP no localhost. Conexões são
+mantidas abertas (keep-alive) e pedidos em sequência na mesma conexão são
+atendidos em ordem, sem novo handshake.
+
+Acesso: todo pedido, menos GET /health, precisa do cabeçalho
+``Authorization: Bearer <token>``, com o token gravado ao lado do arquivo
+de chave (``.key.token``, permissão 0600, ver keystore.py). Em TCP, o
+cabeçalho Host precisa ser localhost ou um endereço IP, o que barra
+páginas abertas no navegador via DNS rebinding; pedidos com Origin
+(navegador) são recusados. Os endpoints do cofre só respondem no socket
+Unix, a não ser que o serviço seja iniciado com vault_over_tcp.
+
+Endpoints (corpo e resposta em JSON):
+
+    GET  /health          estado do serviço
+    GET  /metrics         contagem, erros e latência (p50/p95/p99) por endpoint
+                          (?format=prometheus: texto do Prometheus)
+    POST /generate        {"count", "length", "min", "max_repeat", "forbid",
+                           "charset", "passphrase": {...}} -> {"passwords"}
+    POST /strength        {"passwords": [...]} -> {"results": [...]}
+                          (até MAX_LENGTH caracteres por senha)
+    POST /vault/search    {"query": "cat:Bancos gmail", "limit"} -> {"entries"}
+                          (sem senhas)
+    POST /vault/get       {"ids": [...]} -> {"entries"} (com senhas)
+    POST /vault/sync      {"vector", "delta"} -> {"vector", "delta"}
+                          (alterações cifradas com a chave do cofre, ver sync.py)
+    POST /batch           [{"op": "generate", ...}, {"op": "strength", ...}]
+
+O cofre é decifrado uma vez na inicialização e fica em cache (o Vault só
+relê o arquivo se ele mudar por fora). Geradores são criados uma vez por
+configuração e reaproveitados; pedidos grandes rodam em thread para não
+travar os demais clientes.
+"""
+import asyncio
+import hmac
+import ipaddress
+import json
+import os
+import time
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import metrics
+
+from breach import BreachIndex, BreachIndexError
+from estimator import estimate
+from generator import BatchGenerator, Policy, PolicyGenerator, build_charset
+from passphrase import PassphraseGenerator, Wordlist, WordlistError
+from strength import calculate_strength
+from sync import SyncError, decode_changes, encode_changes
+from vault import VaultError
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+MAX_BODY = 16 << 20
+MAX_COUNT = 100_000
+# Limites por senha/frase: count vezes o tamanho de cada uma cabe na memória
+MAX_LENGTH = 1024
+MAX_WORDS = 64
+MAX_SEPARATOR = 16
+# Pedidos com mais itens que isto rodam em thread
+OFFLOAD_ITEMS = 5_000
+
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large",
+           503: "Service Unavailable"}
+
+
+class RequestError(Exception):
+    """Pedido inválido (vira resposta de erro com o status dado)"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+@lru_cache(maxsize=64)
+def _generator(length, charset, min_counts, max_repeat, forbid):
+    """Gerador para uma configuração (criado uma vez e reaproveitado)"""
+    if min_counts or max_repeat is not None or forbid:
+        return PolicyGenerator(Policy(length, charset, dict(min_counts),
+                                      max_repeat, forbid))
+    return BatchGenerator(charset, length)
+
+
+@lru_cache(maxsize=32)
+def _charset(uppercase, lowercase, digits, symbols, exclude_ambiguous):
+    return build_charset(uppercase, lowercase, digits, symbols, exclude_ambiguous)
+
+
+def _bounded(params, name, default, maximum, minimum=1):
+    """Parâmetro inteiro entre minimum e maximum (400 se fora)"""
+    value = params.get(name, default)
+    if value is None:
+        return None
+    if (not isinstance(value, int) or isinstance(value, bool)
+            or not minimum <= value <= maximum):
+        raise RequestError(400, f"{name} deve estar entre {minimum} e {maximum}")
+    return value
+
+
+def _count(params, default=1):
+    return _bounded(params, "count", default, MAX_COUNT)
+
+
+def _local_host(value):
+    """True se o Host do pedido é localhost ou um endereço IP"""
+    try:
+        host = urlsplit("//" + value).hostname
+    except ValueError:
+        return False
+    if not host:
+        return False
+    if host == "localhost":
+        return True
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class Service:
+    """Operações expostas pelo servidor"""
+
+    def __init__(self, vault=None, breach_path=None):
+        self.vault = vault
+        self.breach = None
+        if breach_path and os.path.exists(breach_path):
+            try:
+                self.breach = BreachIndex(breach_path)
+            except BreachIndexError:
+                self.breach = None
+        self.wordlist = None
+        # Desligado por serve() em TCP sem vault_over_tcp
+        self.vault_allowed = True
+        self.started = time.time()
+
+    def warm(self):
+        """Decifra o cofre e monta os índices antes do primeiro pedido"""
+        if self.vault is not None and self.vault_allowed:
+            self.vault.ids()
+
+    def generate(self, params):
+        count = _count(params)
+        if "passphrase" in params:
+            options = params["passphrase"] or {}
+            if self.wordlist is None:
+                self.wordlist = Wordlist()
+            separator = options.get("separator", "-")
+            if not isinstance(separator, str) or len(separator) > MAX_SEPARATOR:
+                raise RequestError(
+                    400, f"separator deve ter até {MAX_SEPARATOR} caracteres")
+            generator = PassphraseGenerator(
+                self.wordlist, _bounded(options, "words", None, MAX_WORDS), separator,
+                options.get("capitalize", "lower"), options.get("digits", 0))
+            return {"passwords": generator.generate(count)}
+
+        length = _bounded(params, "length", 16, MAX_LENGTH)
+        forbid = params.get("forbid") or []
+        if not isinstance(forbid, list) or not all(isinstance(f, str) for f in forbid):
+            raise RequestError(400, "forbid deve ser uma lista de textos")
+        charset = params.get("charset") or _charset(
+            bool(params.get("uppercase", True)), bool(params.get("lowercase", True)),
+            bool(params.get("digits", True)), bool(params.get("symbols", True)),
+            bool(params.get("exclude_ambiguous", True)))
+        min_counts = tuple(sorted((params.get("min") or {}).items()))
+        generator = _generator(length, charset, min_counts, params.get("max_repeat"),
+                               tuple(forbid))
+        return {"passwords": generator.generate(count)}
+
+    def strength(self, params):
+        passwords = params.get("passwords")
+        if not isinstance(passwords, list) or len(passwords) > MAX_COUNT:
+            raise RequestError(400, f"passwords deve ser uma lista de até {MAX_COUNT}")
+        if not all(isinstance(p, str) and len(p) <= MAX_LENGTH for p in passwords):
+            raise RequestError(
+                400, f"cada senha deve ser um texto de até {MAX_LENGTH} caracteres")
+        results = []
+        for password in passwords:
+            result = estimate(password)
+            results.append({
+                "length": len(password),
+                "strength": calculate_strength(password)[0],
+                "bits": round(result.bits, 2),
+                "patterns": [[m.pattern, m.token] for m in result.matches
+                             if m.pattern != "força bruta"],
+                "breached": (password in self.breach) if self.breach else None,
+            })
+        return {"results": results}
+
+    def _require_vault(self):
+        if not self.vault_allowed:
+            raise RequestError(403, "o cofre só é servido pelo socket Unix "
+                                    "(serve --vault-tcp libera em TCP)")
+        if self.vault is None:
+            raise RequestError(503, "cofre não aberto neste serviço")
+        return self.vault
+
+    def vault_search(self, params):
+        vault = self._require_vault()
+        query = params.get("query", "")
+        ids = vault.search(query) if query else vault.ids()
+        limit = _bounded(params, "limit", MAX_COUNT, MAX_COUNT, minimum=0)
+        entries = [entry for entry in vault.get_many(ids[:limit]) if entry is not None]
+        return {"entries": entries, "total": len(ids)}
+
+    def vault_get(self, params):
+        vault = self._require_vault()
+        ids = params.get("ids")
+        if not isinstance(ids, list) or len(ids) > MAX_COUNT:
+            raise RequestError(400, f"ids deve ser uma lista de até {MAX_COUNT}")
+        return {"entries": vault.get_many(ids, secrets=True)}
+
+    def vault_sync(self, params):
+        """Aplica as alterações recebidas e devolve as que o outro lado não viu"""
+        vault = self._require_vault()
+        vector = params.get("vector")
+        if not isinstance(vector, dict):
+            raise RequestError(400, "vector deve ser um objeto {nó: relógio}")
+        merged = 0
+        if params.get("delta"):
+            merged = vault.merge(decode_changes(vault.cipher, params["delta"].encode()))
+        changes = vault.changes(vector)
+        return {"vector": changes["vector"], "merged": merged,
+                "delta": encode_changes(vault.cipher, changes).decode()}
+
+    def health(self, params):
+        # Sem token: não revela nada do cofre
+        return {"status": "ok", "uptime": time.time() - self.started,
+                "breach_index": self.breach is not None}
+
+    def report_metrics(self, params):
+        return metrics.snapshot()
+
+    def batch(self, params):
+        if not isinstance(params, list):
+            raise RequestError(400, "o corpo de /batch deve ser uma lista")
+        results = []
+        for item in params:
+            handler = BATCH_OPS.get(item.get("op") if isinstance(item, dict) else None)
+            if handler is None:
+                results.append({"error": "op desconhecida"})
+                continue
+            try:
+                results.append(handler(self, item))
+            except (RequestError, ValueError, TypeError, OverflowError, VaultError,
+                    WordlistError) as e:
+                results.append({"error": str(e)})
+        return {"results": results}
+
+
+ROUTES = {
+    ("GET", "/health"): Service.health,
+    ("GET", "/metrics"): Service.report_metrics,
+    ("POST", "/generate"): Service.generate,
+    ("POST", "/strength"): Service.strength,
+    ("POST", "/vault/search"): Service.vault_search,
+    ("POST", "/vault/get"): Service.vault_get,
+    ("POST", "/vault/sync"): Service.vault_sync,
+    ("POST", "/batch"): Service.batch,
+}
+
+# Sempre rodam em thread: o custo depende do cofre, não do pedido
+THREADED = {"/vault/sync"}
+
+# Nome de cada endpoint nas métricas: /vault/search -> server.vault.search
+ROUTE_METRICS = {path: "server" + path.replace("/", ".") for _, path in ROUTES}
+
+BATCH_OPS = {
+    "generate": Service.generate,
+    "strength": Service.strength,
+    "vault_search": Service.vault_search,
+    "vault_get": Service.vault_get,
+}
+
+
+def _size(params):
+    """Quantidade de itens de um pedido (decide se roda em thread)"""
+    if isinstance(params, list):
+        return sum(_size(item) for item in params if isinstance(item, dict))
+    return max(params.get("count", 1) if isinstance(params.get("count"), int) else 1,
+               len(params.get("passwords") or ()), len(params.get("ids") or ()))
+
+
+class Server:
+    """Servidor HTTP/1.1 com keep-alive sobre asyncio
+
+    token: exigido em todo pedido, menos GET /health; check_host: recusa
+    Host que não seja localhost ou IP (ligado em TCP).
+    """
+
+    def __init__(self, service, token, check_host=False):
+        self.service = service
+        self.token = token.encode()
+        self.check_host = check_host
+
+    def _check_access(self, method, path, headers):
+        """RequestError 401/403 se o pedido não pode ser atendido"""
+        if "origin" in headers:
+            raise RequestError(403, "pedidos de navegador não são aceitos")
+        if self.check_host and not _local_host(headers.get("host", "")):
+            raise RequestError(403, "Host deve ser localhost ou um endereço IP")
+        if (method, path) == ("GET", "/health"):
+            return
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(
+                token.strip().encode(), self.token):
+            raise RequestError(401, "token ausente ou inválido")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    break
+                keep_alive = await self._respond(head, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, head, reader, writer):
+        """Lê o corpo, executa o pedido e escreve a resposta"""
+        start = time.perf_counter()
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            self._write(writer, 400, {"error": "linha de pedido inválida"}, False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = (connection != "close" if version == "HTTP/1.1"
+                      else connection == "keep-alive")
+
+        path, _, query = target.partition("?")
+        status, error = 200, False
+        try:
+            try:
+                self._check_access(method, path, headers)
+            except RequestError:
+                # O corpo não é lido: a conexão é encerrada
+                keep_alive = False
+                raise
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY:
+                keep_alive = False
+                raise RequestError(413, "corpo grande demais")
+            body = await reader.readexactly(length) if length else b""
+            handler = ROUTES.get((method, path))
+            if handler is None:
+                known = any(p == path for _, p in ROUTES)
+                raise RequestError(405 if known else 404, f"{method} {path} não existe")
+            params = json.loads(body) if body else {}
+            if path in THREADED or _size(params) > OFFLOAD_ITEMS:
+                result = await asyncio.to_thread(handler, self.service, params)
+            else:
+                result = handler(self.service, params)
+        except RequestError as e:
+            status, error, result = e.status, True, {"error": str(e)}
+        except (ValueError, TypeError, AttributeError, OverflowError, WordlistError,
+                SyncError) as e:
+            status, error, result = 400, True, {"error": str(e)}
+        except VaultError as e:
+            status, error, result = 503, True, {"error": str(e)}
+
+        if path == "/metrics" and "format=prometheus" in query and not error:
+            self._write_text(writer, metrics.to_prometheus(), keep_alive)
+        else:
+            self._write(writer, status, result, keep_alive)
+        name = ROUTE_METRICS.get(path)
+        if name is not None:
+            metrics.observe(name, time.perf_counter() - start)
+            if error:
+                metrics.inc(name + ".errors")
+        return keep_alive
+
+    @staticmethod
+    def _write(writer, status, result, keep_alive):
+        Server._send(writer, status, json.dumps(result, ensure_ascii=False).encode(),
+                     "application/json; charset=utf-8", keep_alive)
+
+    @staticmethod
+    def _write_text(writer, text, keep_alive):
+        Server._send(writer, 200, text.encode(), "text/plain; version=0.0.4",
+                     keep_alive)
+
+    @staticmethod
+    def _send(writer, status, body, content_type, keep_alive):
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            .encode("latin-1") + body)
+
+
+async def serve(service, token, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                socket_path=None, ready=None, vault_over_tcp=False):
+    """Roda o servidor até ser interrompido"""
+    metrics.enable()
+    if not socket_path and not vault_over_tcp:
+        service.vault_allowed = False
+    await asyncio.to_thread(service.warm)
+    server = Server(service, token, check_host=not socket_path)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        # Só o dono acessa: o socket já nasce com permissão 0600
+        umask = os.umask(0o177)
+        try:
+            listener = await asyncio.start_unix_server(server.handle, socket_path)
+        finally:
+            os.umask(umask)
+        where = socket_path
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+        where = f"http://{host}:{port}"
+    if ready:
+        ready(where)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
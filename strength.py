@@ -0,0 +1,52 @@
+"""Pontuação de força de senhas (compartilhada pela interface e pela auditoria)"""
+import math
+
+from generator import SYMBOLS
+
+# Tamanho considerado para cada classe no cálculo de combinações
+CLASS_SIZES = {"upper": 26, "lower": 26, "digit": 10, "symbol": 20}
+
+LEVELS = [
+    (3, "Fraca 😟", "#ff4444"),
+    (5, "Média 😐", "#ffaa00"),
+    (7, "Forte 😊", "#88cc00"),
+    (None, "Muito Forte 🔥", "#00ff00"),
+]
+
+
+def char_classes(password):
+    """Retorna (maiúsculas, minúsculas, números, símbolos) presentes"""
+    return (any(c.isupper() for c in password),
+            any(c.islower() for c in password),
+            any(c.isdigit() for c in password),
+            any(c in SYMBOLS for c in password))
+
+
+def score(length, has_upper, has_lower, has_digit, has_symbol):
+    """Pontuação de 0 a 9 a partir do comprimento e das classes"""
+    points = (length >= 8) + (length >= 12) + (length >= 16)
+    points += has_upper + has_lower + has_digit + 2 * has_symbol
+    return points
+
+
+def level(points):
+    """Retorna (rótulo, cor) para uma pontuação"""
+    for limit, label, color in LEVELS:
+        if limit is None or points <= limit:
+            return label, color
+
+
+def charset_size(has_upper, has_lower, has_digit, has_symbol):
+    """Tamanho do conjunto de caracteres estimado pelas classes presentes"""
+    return (has_upper * CLASS_SIZES["upper"] + has_lower * CLASS_SIZES["lower"]
+            + has_digit * CLASS_SIZES["digit"] + has_symbol * CLASS_SIZES["symbol"])
+
+
+def entropy_bits(length, size):
+    """Entropia por força bruta: length * log2(size)"""
+    return length * math.log2(size) if size > 1 else 0.0
+
+
+def calculate_strength(password):
+    """Calcula força da senha; retorna (rótulo, cor)"""
+    return level(score(len(password), *char_classes(password)))
@@ -0,0 +1,255 @@
+"""Sincronização do cofre entre máquinas, trocando só as alterações.
+
+Cada réplica do cofre tem um vetor de versões (maior relógio visto de
+cada nó, ver vault.py). Sincronizar é trocar o que o outro lado ainda não
+viu e aplicar com Vault.merge(), que mantém por entrada a versão maior:
+adições e remoções feitas ao mesmo tempo em máquinas diferentes são
+combinadas sempre do mesmo jeito, em qualquer ordem.
+
+Dois transportes:
+
+- diretório compartilhado (pendrive, pasta sincronizada, disco de rede):
+  cada nó publica só as alterações que ele mesmo fez, em arquivos
+  ``<nó>-<primeiro relógio>-<último relógio>.delta``, e lê dos outros nós
+  só os arquivos com relógio acima do que já viu. Quando um nó acumula
+  SQUASH_FILES arquivos, eles são trocados por um só.
+- serviço local (``main.py serve``) em TCP ou socket Unix: duas idas ao
+  POST /vault/sync, uma para receber e outra para enviar, com o token do
+  serviço (arquivo ``.key.token`` do lado do serviço).
+
+As alterações viajam cifradas com a chave do cofre (as duas máquinas
+usam o mesmo arquivo de chave), um token Fernet por bloco de
+CHUNK_ITEMS itens. O tamanho transferido e o tempo do merge dependem da
+quantidade de alterações, não do tamanho do cofre.
+"""
+import http.client
+import json
+import os
+import re
+import socket
+import time
+from urllib.parse import urlsplit
+
+from cryptography.fernet import InvalidToken
+
+CHUNK_ITEMS = 1000
+SQUASH_FILES = 64
+DELTA_SUFFIX = ".delta"
+
+_DELTA_NAME = re.compile(r"^([0-9a-f]+)-(\d+)-(\d+)\.delta$")
+
+
+class SyncError(Exception):
+    """Falha ao sincronizar (arquivo inválido, chave diferente, serviço fora)"""
+
+
+def count_changes(changes):
+    return len(changes.get("puts", ())) + len(changes.get("dels", ()))
+
+
+def encode_changes(cipher, changes, chunk_items=CHUNK_ITEMS):
+    """Alterações (Vault.changes) como linhas de tokens cifrados"""
+    puts = changes.get("puts", [])
+    dels = changes.get("dels", [])
+    lines = []
+    for start in range(0, max(len(puts) + len(dels), 1), chunk_items):
+        chunk = {"puts": puts[start:start + chunk_items],
+                 "dels": dels[max(start - len(puts), 0):
+                              max(start + chunk_items - len(puts), 0)]}
+        if not lines:
+            chunk["vector"] = changes.get("vector", {})
+        lines.append(cipher.encrypt(json.dumps(chunk).encode()) + b"\n")
+    return b"".join(lines)
+
+
+def decode_changes(cipher, data):
+    """Lê alterações gravadas por encode_changes()"""
+    changes = {"vector": {}, "puts": [], "dels": []}
+    for line in data.splitlines():
+        if not line:
+            continue
+        try:
+            chunk = json.loads(cipher.decrypt(line).decode())
+        except (InvalidToken, ValueError):
+            raise SyncError("Alterações corrompidas ou cifradas com outra chave")
+        changes["vector"].update(chunk.get("vector", {}))
+        changes["puts"] += chunk.get("puts", [])
+        changes["dels"] += chunk.get("dels", [])
+    return changes
+
+
+def _write_atomic(path, data):
+    """Grava arquivo inteiro de uma vez (leitores nunca o veem pela metade)"""
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class DirectorySync:
+    """Sincroniza por um diretório compartilhado entre as máquinas"""
+
+    def __init__(self, vault, directory):
+        self.vault = vault
+        self.directory = directory
+        self.received = 0
+        self.sent = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.elapsed = 0.0
+
+    def _files(self):
+        """Arquivos de alterações: (nó, primeiro, último, nome), em ordem"""
+        files = []
+        for name in os.listdir(self.directory):
+            match = _DELTA_NAME.match(name)
+            if match:
+                node, first, last = match.groups()
+                files.append((node, int(first), int(last), name))
+        return sorted(files)
+
+    def _read(self, name):
+        with open(os.path.join(self.directory, name), 'rb') as f:
+            data = f.read()
+        self.bytes_received += len(data)
+        return decode_changes(self.vault.cipher, data)
+
+    def _publish(self, changes):
+        clocks = [item[1] for item in changes["puts"] + changes["dels"]]
+        name = f"{self.vault.node}-{min(clocks)}-{max(clocks)}{DELTA_SUFFIX}"
+        data = encode_changes(self.vault.cipher, changes)
+        _write_atomic(os.path.join(self.directory, name), data)
+        return name, len(data)
+
+    def pull(self):
+        """Aplica as alterações dos outros nós que ainda não foram vistas"""
+        node = self.vault.node
+        vector = self.vault.vector()
+        for origin, _, last, name in self._files():
+            if origin == node or last <= vector.get(origin, -1):
+                continue
+            try:
+                changes = self._read(name)
+            except FileNotFoundError:
+                # Juntado pelo dono a outro arquivo, lido na próxima vez
+                continue
+            self.received += self.vault.merge(changes)
+
+    def push(self):
+        """Publica as alterações deste nó feitas desde a última publicação"""
+        node = self.vault.node
+        own = [(first, last, name) for origin, first, last, name in self._files()
+               if origin == node]
+        published = max((last for _, last, _ in own), default=-1)
+        changes = self.vault.changes({node: published}, nodes=[node])
+        if count_changes(changes):
+            name, size = self._publish(changes)
+            own.append((None, None, name))
+            self.sent += count_changes(changes)
+            self.bytes_sent += size
+        if len(own) >= SQUASH_FILES:
+            self._squash(own)
+
+    def _squash(self, own):
+        """Troca os arquivos deste nó por um só com o estado atual"""
+        node = self.vault.node
+        changes = self.vault.changes({}, nodes=[node])
+        if not count_changes(changes):
+            return
+        name, _ = self._publish(changes)
+        for _, _, old in own:
+            if old != name:
+                os.remove(os.path.join(self.directory, old))
+
+    def run(self):
+        """Recebe e depois publica; retorna (recebidas, enviadas)"""
+        start = time.perf_counter()
+        if not os.path.isdir(self.directory):
+            raise SyncError(f"Diretório não encontrado: {self.directory}")
+        self.pull()
+        self.push()
+        self.elapsed = time.perf_counter() - start
+        return self.received, self.sent
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    """HTTPConnection por socket Unix"""
+
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceSync:
+    """Sincroniza com o cofre de um serviço (main.py serve)
+
+    address é uma URL (http://host:porta) ou o caminho de um socket Unix;
+    token é o token de acesso do serviço.
+    """
+
+    def __init__(self, vault, address, token, timeout=60):
+        self.vault = vault
+        self.address = address
+        self.token = token
+        self.timeout = timeout
+        self.received = 0
+        self.sent = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.elapsed = 0.0
+
+    def _connect(self):
+        if self.address.startswith("http://"):
+            url = urlsplit(self.address)
+            return http.client.HTTPConnection(url.hostname, url.port or 80,
+                                              timeout=self.timeout)
+        return _UnixConnection(self.address, self.timeout)
+
+    def _post(self, connection, params):
+        body = json.dumps(params).encode()
+        self.bytes_sent += len(body)
+        try:
+            connection.request("POST", "/vault/sync", body,
+                               {"Content-Type": "application/json",
+                                "Authorization": f"Bearer {self.token}"})
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise SyncError(f"Serviço indisponível em {self.address}: {e}")
+        self.bytes_received += len(data)
+        try:
+            result = json.loads(data)
+        except ValueError:
+            raise SyncError(f"Resposta inválida do serviço ({response.status})")
+        if response.status != 200:
+            raise SyncError(result.get("error", f"erro {response.status}"))
+        return result
+
+    def run(self):
+        """Recebe e depois envia; retorna (recebidas, enviadas)"""
+        start = time.perf_counter()
+        cipher = self.vault.cipher
+        connection = self._connect()
+        try:
+            # 1: o serviço manda o que este cofre não viu
+            reply = self._post(connection, {"vector": self.vault.vector()})
+            self.received = self.vault.merge(
+                decode_changes(cipher, reply["delta"].encode()))
+            # 2: este cofre manda o que o serviço não viu
+            changes = self.vault.changes(reply["vector"])
+            self.sent = count_changes(changes)
+            params = {"vector": self.vault.vector()}
+            if self.sent:
+                params["delta"] = encode_changes(cipher, changes).decode()
+            self._post(connection, params)
+        finally:
+            connection.close()
+        self.elapsed = time.perf_counter() - start
+        return self.received, self.sent
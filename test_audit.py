@@ -0,0 +1,48 @@
+import csv
+import io
+
+from audit import ROW_HEADER, audit_passwords, audit_stream
+from strength import calculate_strength, char_classes, charset_size, entropy_bits
+
+PASSWORDS = ["senha", "Senha123", "S3nh@Forte!2024xyz", "123456", "abc def",
+             "Senha123", "ÁRVORE", "x"]
+
+
+def test_summary_matches_the_per_password_score():
+    summary = audit_passwords(PASSWORDS).summary()
+
+    assert summary["total"] == len(PASSWORDS)
+    for label in summary["strength"]:
+        expected = sum(calculate_strength(p)[0] == label for p in PASSWORDS)
+        assert summary["strength"][label] == expected
+    assert summary["classes"]["digit"] == 4
+    assert summary["classes"]["symbol"] == 1
+    assert summary["classes"]["upper"] == 4
+    assert summary["lengths"][8] == 2
+    # Comprimento em bytes UTF-8: "ÁRVORE" tem 6 caracteres e 7 bytes
+    assert summary["lengths"][7] == 2 and summary["lengths"][6] == 1
+
+
+def test_stream_ignores_blank_lines_and_block_boundaries(tmp_path):
+    data = "\r\n".join(PASSWORDS).encode() + b"\r\n\n\n"
+    whole = audit_stream(io.BytesIO(data)).summary()
+    for read_size in (1, 3, 7):
+        assert audit_stream(io.BytesIO(data), read_size=read_size).summary() == whole
+    assert audit_stream(io.BytesIO(data[:-4])).summary() == whole
+    assert whole["total"] == len(PASSWORDS)
+
+
+def test_rows_follow_input_order():
+    passwords = ["Senha123", "abc", "S3nh@Forte!2024xyz"]
+    out = io.BytesIO()
+    audit_stream(io.BytesIO("\n".join(passwords).encode()), out, read_size=4)
+
+    text = out.getvalue().decode()
+    assert text.startswith(ROW_HEADER.decode())
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [int(row["length"]) for row in rows] == [len(p) for p in passwords]
+    for row, password in zip(rows, passwords):
+        size = charset_size(*char_classes(password))
+        assert int(row["charset"]) == size
+        assert row["entropy"] == f"{entropy_bits(len(password), size):.1f}"
+        assert row["strength"] == calculate_strength(password)[0]
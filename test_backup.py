@@ -0,0 +1,122 @@
+import json
+import os
+
+import pytest
+from cryptography.fernet import Fernet
+
+from backup import FORMAT, VERSION, BackupError, Importer, export_vault, import_backup
+from vault import Vault
+
+
+def write_backup(path, cipher, bodies, encoding="jsonl"):
+    """Backup com um bloco por corpo dado (texto depois da linha de metadados)"""
+    header = {"format": FORMAT, "version": VERSION, "encoding": encoding,
+              "chunk_entries": 1000, "entries": 0, "export_id": "teste"}
+    with open(path, 'wb') as f:
+        f.write(json.dumps(header).encode() + b"\n")
+        for seq, body in enumerate(bodies):
+            count = len([line for line in body.splitlines() if line])
+            if encoding == "csv":
+                count -= 1  # cabeçalho do CSV
+            meta = {"export_id": "teste", "seq": seq, "count": count,
+                    "last": seq == len(bodies) - 1}
+            f.write(cipher.encrypt((json.dumps(meta) + "\n" + body).encode()) + b"\n")
+
+
+@pytest.mark.parametrize("line", ["[1, 2]", '"x"', "7", "null", "{quebrado"])
+def test_import_rejects_lines_that_are_not_objects(tmp_path, cipher, entry, line):
+    path = str(tmp_path / "backup.pgp")
+    write_backup(path, cipher, [json.dumps(entry("e1")) + "\n" + line + "\n"])
+    vault = Vault(str(tmp_path / "passwords.enc"), cipher)
+
+    with pytest.raises(BackupError, match="Bloco 0, linha 3"):
+        import_backup(vault, path)
+    assert vault.ids() == []
+
+
+def full_state(vault):
+    return {e["id"]: (e["name"], e["password"]) for e in vault.iter_entries(secrets=True)}
+
+
+@pytest.mark.parametrize("encoding", ["jsonl", "csv"])
+def test_export_then_import_round_trip(tmp_path, cipher, entry, encoding):
+    source = Vault(str(tmp_path / "origem.enc"), cipher)
+    source.add_many([entry(f"e{n}") for n in range(25)])
+    source.delete("e3")
+    path = str(tmp_path / "backup.pgpx")
+
+    assert export_vault(source, path, encoding, chunk_entries=7) == 24
+    target = Vault(str(tmp_path / "destino.enc"), cipher)
+    assert import_backup(target, path) == 24
+
+    assert full_state(target) == full_state(source)
+    assert not any(name.startswith("backup.pgpx.progress") for name in os.listdir(tmp_path))
+
+
+def test_import_resumes_after_an_interruption(tmp_path, cipher, entry, monkeypatch):
+    source = Vault(str(tmp_path / "origem.enc"), cipher)
+    source.add_many([entry(f"e{n}") for n in range(30)])
+    path = str(tmp_path / "backup.pgpx")
+    export_vault(source, path, chunk_entries=10)
+    target = Vault(str(tmp_path / "destino.enc"), cipher, compact_min_dead=10 ** 9)
+    add_many = Vault.add_many
+    calls = []
+
+    def fail_on_third_block(self, entries):
+        calls.append(len(entries))
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return add_many(self, entries)
+
+    monkeypatch.setattr(Vault, "add_many", fail_on_third_block)
+    with pytest.raises(KeyboardInterrupt):
+        import_backup(target, path)
+    monkeypatch.undo()
+    assert len(target.ids()) == 20
+
+    assert Importer(target, path).run() == 30
+    assert full_state(target) == full_state(source)
+    # Só o terceiro bloco foi gravado de novo
+    assert target.dead_records() == 0
+
+
+def test_import_without_resume_starts_over(tmp_path, cipher, entry):
+    source = Vault(str(tmp_path / "origem.enc"), cipher)
+    source.add_many([entry(f"e{n}") for n in range(5)])
+    path = str(tmp_path / "backup.pgpx")
+    export_vault(source, path, chunk_entries=2)
+    target = Vault(str(tmp_path / "destino.enc"), cipher)
+    import_backup(target, path)
+    assert import_backup(target, path, resume=False) == 5
+    assert full_state(target) == full_state(source)
+
+
+def test_csv_rows_without_id_keep_the_same_id_on_reimport(tmp_path, cipher, entry):
+    path = str(tmp_path / "backup.pgpx")
+    body = "id,name,password,category,created,strength\n,Sem id,x1,Emails,,\n"
+    write_backup(path, cipher, [body], encoding="csv")
+    vault = Vault(str(tmp_path / "passwords.enc"), cipher)
+
+    import_backup(vault, path)
+    import_backup(vault, path, resume=False)
+    assert len(vault.ids()) == 1
+
+
+def test_import_detects_tampered_backups(tmp_path, cipher, entry):
+    source = Vault(str(tmp_path / "origem.enc"), cipher)
+    source.add_many([entry(f"e{n}") for n in range(6)])
+    path = str(tmp_path / "backup.pgpx")
+    export_vault(source, path, chunk_entries=2)
+    with open(path, 'rb') as f:
+        header, *blocks = f.read().splitlines(keepends=True)
+    variants = {
+        "trocados": [header, blocks[1], blocks[0], blocks[2]],
+        "truncado": [header, blocks[0], blocks[1]],
+        "outra chave": [header, Fernet(Fernet.generate_key()).encrypt(b"x") + b"\n"],
+    }
+    for lines in variants.values():
+        with open(path, 'wb') as f:
+            f.write(b"".join(lines))
+        target = Vault(str(tmp_path / "destino.enc"), cipher)
+        with pytest.raises(BackupError):
+            import_backup(target, path, resume=False)
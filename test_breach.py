@@ -0,0 +1,55 @@
+import hashlib
+import random
+
+import pytest
+
+from breach import BreachIndex, BreachIndexError, build_index
+
+
+def sha1_line(password, count=1):
+    return f"{hashlib.sha1(password.encode()).hexdigest().upper()}:{count}\n"
+
+
+@pytest.mark.parametrize("run_size", [2, 1000])
+def test_lookup_in_hash_list(tmp_path, run_size):
+    leaked = [f"senha{n}" for n in range(50)]
+    source = tmp_path / "pwned.txt"
+    # Repetidas, fora de ordem e com linhas inválidas no meio
+    lines = [sha1_line(p) for p in leaked * 2] + ["\n", "não é hash\n"]
+    random.Random(1).shuffle(lines)
+    source.write_text("".join(lines).replace("\n", "\r\n", 3))
+    path = str(tmp_path / "breaches.idx")
+
+    assert build_index(str(source), path, run_size=run_size) == 50
+    index = BreachIndex(path)
+    assert len(index) == 50
+    assert all(p in index for p in leaked)
+    assert "senha50" not in index and "" not in index
+    assert index.check_many(["senha7", "outra"]) == [True, False]
+    index.close()
+
+
+def test_lookup_in_plain_list(tmp_path, cipher, entry):
+    from vault import Vault
+
+    source = tmp_path / "senhas.txt"
+    source.write_text("123456\nsenha-a\nçãé\n")
+    path = str(tmp_path / "breaches.idx")
+    build_index(str(source), path, plain=True)
+    index = BreachIndex(path)
+    assert "çãé" in index and "1234567" not in index
+
+    vault = Vault(str(tmp_path / "passwords.enc"), cipher)
+    vault.add_many([entry("a"), entry("b")])
+    assert [e["id"] for e in index.check_vault(vault)] == ["a"]
+    index.close()
+
+
+def test_missing_or_invalid_index(tmp_path):
+    with pytest.raises(BreachIndexError):
+        BreachIndex(str(tmp_path / "nada.idx"))
+    for data in (b"", b"PGPBRCH1" + b"\0" * 100):
+        path = tmp_path / "ruim.idx"
+        path.write_bytes(data)
+        with pytest.raises(BreachIndexError):
+            BreachIndex(str(path))
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cli import PASSPHRASE_ENV, run
+from keystore import load_or_create_key
+from vault import Vault
+
+
+@pytest.fixture
+def vault_args(tmp_path, key_file, passphrase, monkeypatch):
+    """Argumentos globais de um cofre com chave e senha mestra prontas"""
+    monkeypatch.setenv(PASSPHRASE_ENV, passphrase)
+    return ["--vault", str(tmp_path / "passwords.enc"), "--key", key_file]
+
+
+def test_reuse_counts_each_entry_once(vault_args, key_file, passphrase, entry, capsys):
+    vault = Vault(vault_args[1], load_or_create_key(key_file, passphrase))
+    vault.add_many([entry("a", "Summer2024!"), entry("b", "Summer2024!"),
+                    entry("c", "Summer2025!"), entry("d", "x7#Kq!p2Lz")])
+
+    assert run(vault_args + ["reuse"]) == 1
+    out, err = capsys.readouterr()
+    # a e b estão no grupo "igual" e também no "parecida", com c
+    assert "igual (2)" in out and "parecida (3)" in out
+    assert "2 grupos, 3 de 4 entradas" in err
+
+
+@pytest.mark.parametrize("option", [["--max-repeat", "0"], ["--max-repeat", "-1"],
+                                    ["--min-digits", "20", "--length", "8"]])
+def test_generate_rejects_impossible_policies(option, capsys):
+    assert run(["generate"] + option) == 2
+    assert "Erro:" in capsys.readouterr().err
+
+
+def test_command_line_does_not_import_tkinter():
+    # Em máquinas sem display a linha de comando e serve não podem depender do Tk
+    code = ("import runpy, sys\n"
+            "sys.argv = ['main.py', 'generate']\n"
+            "try:\n"
+            "    runpy.run_path('main.py', run_name='__main__')\n"
+            "except SystemExit as e:\n"
+            "    assert e.code == 0\n"
+            "assert 'tkinter' not in sys.modules\n")
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_audit_reports_unreadable_files(tmp_path, capsys):
+    assert run(["audit", str(tmp_path)]) == 1
+    assert "Erro:" in capsys.readouterr().err
+
+
+def test_audit_json_summary(tmp_path, capsys):
+    path = tmp_path / "senhas.txt"
+    path.write_text("senha\nS3nh@Forte!2024xyz\n")
+    assert run(["audit", str(path), "--json"]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["total"] == 2 and summary["lengths"] == {"5": 1, "18": 1}
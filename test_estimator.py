@@ -0,0 +1,72 @@
+import math
+
+import pytest
+
+import estimator
+from estimator import WEAK_BITS, estimate, load_dictionary
+
+
+def test_long_keyboard_walk_does_not_overflow():
+    for password in ("qw" * 500, "qwertyuiop" * 100, "QwErTy" * 170):
+        result = estimate(password)
+        assert math.isfinite(result.bits)
+        assert result.bits < 100
+
+
+def patterns(password):
+    return [(m.pattern, m.token) for m in estimate(password).matches]
+
+
+@pytest.mark.parametrize("password, pattern", [
+    ("password", "dicionário"),
+    ("drowssap", "dicionário"),
+    ("P4ssw0rd", "dicionário"),
+    ("abcdef", "sequência"),
+    ("987654", "sequência"),
+    ("abcabcabc", "repetição"),
+    ("ghjkl;", "teclado"),
+    ("1987", "ano"),
+    ("15/03/1987", "data"),
+    ("15031987", "data"),
+])
+def test_whole_password_matches_one_pattern(password, pattern):
+    assert patterns(password) == [(pattern, password)]
+    assert estimate(password).bits < WEAK_BITS
+
+
+def test_variations_cost_extra_bits():
+    # Palavra longe do topo da lista: acima do piso de MIN_SUBMATCH_BITS
+    plain = estimate("elephant").bits
+    assert estimate("tnahpele").bits == plain + 1
+    assert estimate("3l3phant").bits > plain
+    assert estimate("ElEpHaNt").bits > estimate("Elephant").bits > plain
+
+
+def test_decomposition_and_bruteforce():
+    assert patterns("Password1987!") == [("dicionário", "Password"), ("ano", "1987"),
+                                         ("força bruta", "!")]
+    random_like = estimate("x7#Kq!p2Lz")
+    assert [m.pattern for m in random_like.matches] == ["força bruta"]
+    assert random_like.bits > 60
+    assert estimate("") == (0.0, ())
+
+
+def test_results_are_cached():
+    estimate.cache_clear()
+    first = estimate("correcthorsebatterystaple")
+    assert estimate("correcthorsebatterystaple") is first
+    assert estimate.cache_info().hits == 1
+
+
+def test_load_dictionary(tmp_path, monkeypatch):
+    monkeypatch.setattr(estimator, "_extra", {})
+    monkeypatch.setattr(estimator, "_dictionaries", None)
+    monkeypatch.setattr(estimator, "_lookup", None)
+    path = tmp_path / "empresa.txt"
+    path.write_text("zqxjwvkp\nqwzxjvkb\n")
+    before = estimate("zqxjwvkp").bits
+
+    assert load_dictionary("empresa", str(path)) == 2
+    assert patterns("zqxjwvkp") == [("dicionário", "zqxjwvkp")]
+    assert estimate("zqxjwvkp").bits < before
+    estimate.cache_clear()
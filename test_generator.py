@@ -0,0 +1,166 @@
+import io
+from collections import Counter
+
+import pytest
+
+from cli import run
+from generator import (AMBIGUOUS, POLICY_CLASSES, SYMBOLS, BatchGenerator,
+                       ParallelGenerator, Policy, PolicyGenerator, build_charset,
+                       generate_passwords)
+
+
+def satisfies(password, policy):
+    """True se a senha atende a todas as regras da política"""
+    classes = dict(POLICY_CLASSES)
+    if any(sum(c in classes[name] for c in password) < count
+           for name, count in policy.min_counts.items()):
+        return False
+    repeat = policy.max_repeat
+    if repeat is not None and any(password[i:i + repeat + 1] == password[i] * (repeat + 1)
+                                  for i in range(len(password))):
+        return False
+    lowered = password.lower()
+    return (len(password) == policy.length and set(password) <= set(policy.charset)
+            and not any(f.lower() in lowered for f in policy.forbidden))
+
+
+def test_batch_generator_draws_only_from_the_charset():
+    generator = BatchGenerator("abc123", 12, block_size=64)
+    passwords = generator.generate(1000)
+    assert len(passwords) == 1000
+    assert all(len(p) == 12 and set(p) <= set("abc123") for p in passwords)
+    assert len(generator.generate_one()) == 12
+
+
+def test_batch_generator_lines_match_the_count():
+    out = io.BytesIO()
+    BatchGenerator(build_charset(), 20, block_size=100).write(out, 1234)
+    lines = out.getvalue().split(b"\n")
+    assert lines[-1] == b""
+    assert len(lines) == 1235
+    assert {len(line) for line in lines[:-1]} == {20}
+
+
+def test_batch_generator_has_no_modulo_bias():
+    # 100 não divide 256: sem a rejeição, os 56 primeiros caracteres
+    # sairiam 3 vezes em 256 e os demais só 2
+    charset = "".join(chr(i) for i in range(28, 128))
+    text = "".join(BatchGenerator(charset, 1000).generate(500))
+    first = sum(c in charset[:56] for c in text) / len(text)
+    assert abs(first - 0.56) < 0.01
+
+
+def test_repeated_charset_characters_do_not_weigh_more():
+    counts = Counter("".join(BatchGenerator("aaab", 1000).generate(100)))
+    assert abs(counts["a"] / 100_000 - 0.5) < 0.02
+
+
+@pytest.mark.parametrize("charset, length", [("", 8), ("abc", 0), ("abcç", 8)])
+def test_batch_generator_rejects_bad_configurations(charset, length):
+    with pytest.raises(ValueError):
+        BatchGenerator(charset, length)
+
+
+def test_build_charset_options():
+    charset = build_charset()
+    assert not set(AMBIGUOUS) & set(charset)
+    assert set(SYMBOLS) <= set(charset)
+    assert build_charset(uppercase=False, lowercase=False, symbols=False,
+                         exclude_ambiguous=False) == "0123456789"
+    assert all(len(p) == 16 for p in generate_passwords(5))
+
+
+def test_cli_generate_writes_one_password_per_line(tmp_path):
+    path = tmp_path / "senhas.txt"
+    assert run(["generate", "-n", "500", "-l", "10", "--no-symbols",
+                "-o", str(path)]) == 0
+    passwords = path.read_text().splitlines()
+    assert len(passwords) == 500
+    assert all(len(p) == 10 and p.isalnum() for p in passwords)
+
+
+def test_parallel_generator_writes_every_shard():
+    generator = ParallelGenerator("abcdef", 8, workers=2, shard_size=300)
+    out = io.BytesIO()
+    generator.write(out, 1000)
+
+    passwords = out.getvalue().decode().splitlines()
+    assert len(passwords) == 1000
+    assert all(len(p) == 8 and set(p) <= set("abcdef") for p in passwords)
+    assert generator.total == 1000
+    assert sum(s["shards"] for s in generator.worker_stats.values()) == 4
+    assert generator.report()[-1].startswith("total: 1,000 senhas")
+
+
+def test_parallel_generator_with_a_policy():
+    policy = Policy(12, build_charset(), {"digits": 3, "symbols": 2}, max_repeat=1)
+    generator = ParallelGenerator(None, None, workers=2, shard_size=200, policy=policy)
+    passwords = b"".join(generator.iter_lines(500)).decode().splitlines()
+    assert len(passwords) == 500
+    assert all(satisfies(p, policy) for p in passwords)
+
+
+def test_parallel_generator_validates_before_starting_processes():
+    with pytest.raises(ValueError):
+        ParallelGenerator("", 8, workers=2)
+    with pytest.raises(ValueError):
+        ParallelGenerator("abc", 8, workers=0)
+
+
+def test_cli_generate_with_workers(tmp_path):
+    path = tmp_path / "senhas.txt"
+    assert run(["generate", "-n", "3000", "-w", "2", "-o", str(path)]) == 0
+    assert len(path.read_text().splitlines()) == 3000
+
+
+@pytest.mark.parametrize("policy", [
+    Policy(12, min_counts={"upper": 2, "lower": 2, "digits": 2, "symbols": 2}),
+    Policy(8, min_counts={"digits": 8}),
+    Policy(6, "ab12", {"digits": 3}, max_repeat=1),
+    Policy(10, "abc", max_repeat=1, forbidden=["abc", "cba"]),
+    Policy(10, min_counts={"symbols": 1}, forbidden=["a", "senha"]),
+    # Muitos arranjos: sorteados um a um em vez de tabelados
+    Policy(40, min_counts={"upper": 5, "lower": 5, "digits": 5, "symbols": 5},
+           max_repeat=2),
+])
+def test_policy_generator_always_satisfies_the_policy(policy):
+    passwords = PolicyGenerator(policy, block_size=256).generate(2000)
+    assert len(passwords) == 2000
+    assert all(satisfies(p, policy) for p in passwords)
+
+
+def test_policy_with_few_valid_layouts():
+    # Dois "7" não podem ficar vizinhos: só o arranjo 7?7 serve
+    policy = Policy(3, "7ab", {"digits": 2}, max_repeat=1)
+    passwords = PolicyGenerator(policy).generate(500)
+    assert all(p[0] == p[2] == "7" and p[1] in "ab" for p in passwords)
+
+
+def test_impossible_policy_raises():
+    generator = PolicyGenerator(Policy(2, "7a", {"digits": 2}, max_repeat=1))
+    with pytest.raises(ValueError, match="impossível"):
+        generator.generate(10)
+
+
+# C(40, 5) passa de MAX_LAYOUTS: arranjos sorteados um a um
+@pytest.mark.parametrize("length, digits", [(12, 3), (40, 5)])
+def test_required_positions_are_uniform(length, digits):
+    policy = Policy(length, "abcdefghij0", {"digits": digits})
+    by_position = Counter(i for p in PolicyGenerator(policy).generate(20000)
+                          for i, c in enumerate(p) if c == "0")
+    assert min(by_position.values()) > 0.85 * max(by_position.values())
+
+
+@pytest.mark.parametrize("options, message", [
+    ({"min_counts": {"emoji": 1}}, "desconhecida"),
+    ({"min_counts": {"digits": 17}}, "excedem"),
+    ({"max_repeat": 0}, "positivo"),
+])
+def test_policy_rejects_invalid_rules(options, message):
+    with pytest.raises(ValueError, match=message):
+        Policy(16, **options)
+
+
+def test_policy_generator_rejects_charset_without_required_class():
+    with pytest.raises(ValueError, match="digits"):
+        PolicyGenerator(Policy(8, "abc", {"digits": 1}))
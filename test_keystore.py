@@ -0,0 +1,111 @@
+import json
+import os
+import stat
+
+import pytest
+from cryptography.fernet import Fernet
+
+import keystore
+from conftest import KDF
+from keystore import (MIN_N, KeySession, VaultLocked, WrongPassphrase, calibrate,
+                      change_passphrase, load_or_create_key, load_or_create_token,
+                      needs_new_passphrase, read_keystore, unwrap_keys, write_keystore)
+from vault import VaultError
+
+
+def test_data_keys_are_never_written_in_clear(tmp_path, passphrase):
+    path = str(tmp_path / ".key")
+    keys = [Fernet.generate_key(), Fernet.generate_key()]
+    write_keystore(path, passphrase, keys, KDF)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert not any(key in data for key in keys)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert read_keystore(path)["kdf"]["n"] == KDF["n"]
+    assert unwrap_keys(path, passphrase) == keys
+    with pytest.raises(WrongPassphrase):
+        unwrap_keys(path, "outra senha")
+
+
+def test_change_passphrase_keeps_keys_and_params(key_file, passphrase):
+    keys = unwrap_keys(key_file, passphrase)
+    salt = read_keystore(key_file)["kdf"]["salt"]
+
+    change_passphrase(key_file, passphrase, "nova senha")
+    assert unwrap_keys(key_file, "nova senha") == keys
+    with pytest.raises(WrongPassphrase):
+        unwrap_keys(key_file, passphrase)
+    kdf = read_keystore(key_file)["kdf"]
+    assert kdf["salt"] != salt and kdf["n"] == KDF["n"]
+
+    change_passphrase(key_file, "nova senha", params={"n": 1 << 11, "r": 8, "p": 1})
+    assert read_keystore(key_file)["kdf"]["n"] == 1 << 11
+    assert unwrap_keys(key_file, "nova senha") == keys
+
+
+def test_legacy_plain_key_is_converted(tmp_path, passphrase):
+    path = str(tmp_path / ".key")
+    key = Fernet.generate_key()
+    with open(path, 'wb') as f:
+        f.write(key + b"\n")
+    assert needs_new_passphrase(path)
+
+    token = load_or_create_key(path, passphrase).encrypt(b"x")
+    assert not needs_new_passphrase(path)
+    assert Fernet(key).decrypt(token) == b"x"
+    assert unwrap_keys(path, passphrase) == [key]
+
+
+def test_invalid_keystores(tmp_path, passphrase):
+    path = tmp_path / ".key"
+    for doc in ({"format": "outro"}, [1], {"format": "pgp-keystore", "version": 9}):
+        path.write_text(json.dumps(doc))
+        with pytest.raises(VaultError):
+            unwrap_keys(str(path), passphrase)
+
+
+def test_token_is_created_once_and_private(key_file):
+    token = load_or_create_token(key_file)
+    path = keystore.token_path(key_file)
+    os.chmod(path, 0o644)
+    assert load_or_create_token(key_file) == token
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_calibrate_doubles_n_within_time_and_memory(monkeypatch):
+    # Custo linear em n: 10 ms em MIN_N
+    monkeypatch.setattr(keystore, "_time_scrypt", lambda n, r, p, salt: 10 * n / MIN_N)
+
+    params, elapsed, _ = calibrate(target_ms=100, max_memory_mb=1024)
+    assert params == {"n": 8 * MIN_N, "r": 8, "p": 1} and elapsed == 80
+    params, _, memory = calibrate(target_ms=10_000, max_memory_mb=64)
+    # 4 * MIN_N passaria de 64 MB por poucos KB
+    assert memory <= 64 and params["n"] == 2 * MIN_N
+    assert calibrate(target_ms=1)[0]["n"] == MIN_N
+
+
+def test_session_forgets_the_key_when_idle(key_file, passphrase, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(keystore.time, "monotonic", lambda: now[0])
+    session = KeySession(key_file, idle_seconds=60)
+    with pytest.raises(VaultLocked):
+        session.cipher()
+
+    cipher = session.unlock(passphrase)
+    now[0] += 59
+    assert session.cipher() is cipher
+    now[0] += 59
+    session.touch()
+    now[0] += 59
+    assert session.unlocked and not session.expired()
+    now[0] += 2
+    assert session.expired() and not session.unlocked
+    with pytest.raises(VaultLocked):
+        session.cipher()
+    assert not session.expired()
+
+    session.unlock(passphrase)
+    session.lock()
+    with pytest.raises(VaultLocked):
+        session.cipher()
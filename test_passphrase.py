@@ -0,0 +1,96 @@
+import math
+from collections import Counter
+
+import pytest
+
+from passphrase import (DEFAULT_WORDS, TARGET_BITS, PassphraseGenerator, Wordlist,
+                        WordlistError, build_wordlist, default_words)
+
+WORDS = ["água", "casa", "fé", "pão", "sol", "mar", "céu", "lua"]
+
+
+@pytest.fixture
+def text_list(tmp_path):
+    path = tmp_path / "palavras.txt"
+    # Formato da EFF, comentário, linha vazia e repetida
+    lines = ["# lista de teste", ""] + [f"1111{n}\t{w}" for n, w in enumerate(WORDS)]
+    path.write_text("\n".join(lines + ["casa"]) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_default_list_reaches_target_bits():
+    wordlist = Wordlist()
+    generator = PassphraseGenerator(wordlist)
+    assert generator.words == DEFAULT_WORDS == default_words(wordlist)
+    assert generator.entropy_bits() >= TARGET_BITS
+    assert (generator.words - 1) * math.log2(len(wordlist)) < TARGET_BITS
+    wordlist.close()
+
+
+def test_entropy_bits_counts_every_option(text_list):
+    wordlist = Wordlist(text_list)
+    assert PassphraseGenerator(wordlist, 4).entropy_bits() == 12
+    assert PassphraseGenerator(wordlist, 4, capitalize="random").entropy_bits() == 16
+    with_digits = PassphraseGenerator(wordlist, 4, digits=2).entropy_bits()
+    assert with_digits == pytest.approx(12 + 2 * math.log2(10) + 2)
+
+
+def test_compact_and_text_lists_agree(tmp_path, text_list):
+    compact = str(tmp_path / "palavras.pgpw")
+    assert build_wordlist(text_list, compact) == len(WORDS)
+    for path in (text_list, compact):
+        wordlist = Wordlist(path)
+        assert len(wordlist) == len(WORDS)
+        assert [wordlist.word(i) for i in range(len(WORDS))] == WORDS
+        assert wordlist.words([7, 0, 7]) == ["lua", "água", "lua"]
+        wordlist.close()
+
+
+def test_phrases_use_the_options(text_list):
+    wordlist = Wordlist(text_list)
+    phrases = PassphraseGenerator(wordlist, 3, separator=" ", capitalize="title",
+                                  digits=2).generate(500)
+    for phrase in phrases:
+        words = phrase.split(" ")
+        assert len(words) == 3
+        assert sum(w[-2:].isdigit() for w in words) == 1
+        assert all(w.rstrip("0123456789") in {x.capitalize() for x in WORDS}
+                   for w in words)
+
+
+def test_words_are_uniform(text_list):
+    wordlist = Wordlist(text_list)
+    counts = Counter(w for p in PassphraseGenerator(wordlist, 5).generate(4000)
+                     for w in p.split("-"))
+    assert set(counts) == set(WORDS)
+    assert min(counts.values()) > 0.85 * max(counts.values())
+
+
+def test_iter_lines_with_crlf(text_list):
+    generator = PassphraseGenerator(Wordlist(text_list), 2)
+    generator._per_block = 7
+    data = b"".join(generator.iter_lines(20, b"\r\n"))
+    assert data.count(b"\r\n") == 20 and data.count(b"\n") == 20
+
+
+@pytest.mark.parametrize("options", [{"words": 0}, {"capitalize": "camel"},
+                                     {"digits": 10}])
+def test_invalid_options(text_list, options):
+    with pytest.raises(ValueError):
+        PassphraseGenerator(Wordlist(text_list), **options)
+
+
+def test_invalid_lists(tmp_path, text_list):
+    with pytest.raises(WordlistError):
+        Wordlist(str(tmp_path / "nada.txt"))
+    short = tmp_path / "curta.txt"
+    short.write_text("palavra\n")
+    with pytest.raises(WordlistError):
+        Wordlist(str(short))
+    with pytest.raises(WordlistError):
+        build_wordlist(str(short), str(tmp_path / "curta.pgpw"))
+    broken = tmp_path / "quebrada.pgpw"
+    build_wordlist(text_list, str(broken))
+    broken.write_bytes(broken.read_bytes()[:-1])
+    with pytest.raises(WordlistError):
+        Wordlist(str(broken))
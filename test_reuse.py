@@ -0,0 +1,67 @@
+import pytest
+
+from reuse import SIMILARITY, ReuseIndex, similarity
+
+# Chave fixa: o esboço depende da chave e o teste não pode variar
+KEY = bytes(range(32))
+
+
+@pytest.fixture
+def index(entry):
+    return ReuseIndex([entry("a", "Summer2024!"), entry("b", "Summer2024!"),
+                       entry("c", "Summer2025!"), entry("d", "abcd1234"),
+                       entry("e", "x7#Kq!p2Lz")], key=KEY)
+
+
+def test_exact_and_similar_matches(index):
+    assert len(index) == 5
+    assert index.check("Summer2024!") == (["a", "b"], ["c"])
+    assert index.check("Summer2024!", exclude="a") == (["b"], ["c"])
+    assert index.check("Sumer2024!") == ([], ["a", "b", "c"])
+    assert index.check("Summer2024!x") == ([], ["a", "b", "c"])
+    assert index.check("1234abcd") == ([], [])
+    assert index.check("nada a ver") == ([], [])
+
+
+@pytest.mark.parametrize("password, other, close", [
+    ("Summer2024!", "Summer2025!", True),
+    ("Summer2024!", "Summer2024!x", True),
+    ("P@ssword1", "password1", True),
+    ("abcd1234", "1234abcd", False),
+    ("Summer2024!", "Winter1999?", False),
+])
+def test_similarity(password, other, close):
+    index = ReuseIndex(key=KEY)
+    value = similarity(index.sketch(password), index.sketch(other))
+    assert (value >= SIMILARITY) is close
+    assert similarity(index.sketch(password), index.sketch(password)) == 1
+
+
+def test_update_and_remove(index, entry):
+    index.add(entry("c", "outra-senha-qualquer"))
+    assert index.check("Summer2024!") == (["a", "b"], [])
+    index.remove("b")
+    index.remove("b")
+    assert index.check("Summer2024!") == (["a"], [])
+    index.remove("a")
+    assert index.check("Summer2024!") == ([], [])
+    assert len(index) == 3
+
+
+def test_groups(index, entry):
+    index.add(entry("f", "Summer2025!"))
+    groups = sorted((kind, sorted(ids)) for kind, ids in index.groups())
+    assert groups == [("igual", ["a", "b"]), ("igual", ["c", "f"]),
+                      ("parecida", ["a", "b", "c", "f"])]
+
+
+def test_groups_do_not_chain(entry):
+    # A ~ B e B ~ C, mas A e C são distantes: C não entra no grupo de A
+    passwords = ["abcdefghij", "abcdefghijklm", "defghijklm"]
+    index = ReuseIndex([entry(str(n), p) for n, p in enumerate(passwords)], key=KEY)
+    a, b, c = (index.sketch(p) for p in passwords)
+    assert similarity(a, b) >= SIMILARITY and similarity(b, c) >= SIMILARITY
+    assert similarity(a, c) < SIMILARITY
+    assert index.groups()
+    for _, ids in index.groups():
+        assert not {"0", "2"} <= set(ids)
@@ -0,0 +1,64 @@
+import pytest
+from cryptography.fernet import Fernet, InvalidToken
+
+from keystore import _cipher, unwrap_keys
+from rotation import KeyRotation
+from vault import Vault, VaultError
+
+
+@pytest.fixture
+def open_vault(key_file, passphrase):
+    """Abre o cofre com as chaves atuais do arquivo de chave"""
+    return lambda path: Vault(path, _cipher(unwrap_keys(key_file, passphrase)))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rotation_reencrypts_and_drops_the_old_key(tmp_path, key_file, passphrase,
+                                                    open_vault, entry, workers):
+    path = str(tmp_path / "passwords.enc")
+    old_key, = unwrap_keys(key_file, passphrase)
+    vault = open_vault(path)
+    vault.add_many([entry(f"e{n}") for n in range(50)])
+    vault.delete("e0")
+
+    records = KeyRotation(path, key_file, passphrase, workers=workers,
+                          block_bytes=4096).run()
+
+    assert records > 0
+    keys = unwrap_keys(key_file, passphrase)
+    assert len(keys) == 1 and keys[0] != old_key
+    rotated = Vault(path, Fernet(keys[0]))
+    assert {i: rotated.secret(i) for i in rotated.ids()} == {
+        f"e{n}": f"senha-e{n}" for n in range(1, 50)}
+    with open(path, 'rb') as f:
+        f.readline()
+        with pytest.raises(InvalidToken):
+            Fernet(old_key).decrypt(f.readline().rstrip(b"\n"))
+    assert not (tmp_path / "passwords.enc.rotate.json").exists()
+
+
+def test_vault_opened_before_rotation_refuses_to_write(tmp_path, key_file, passphrase,
+                                                       open_vault, entry):
+    path = str(tmp_path / "passwords.enc")
+    holder = open_vault(path)
+    holder.add(entry("e1"))
+
+    KeyRotation(path, key_file, passphrase, workers=1).run()
+
+    with pytest.raises(VaultError):
+        holder.add(entry("e2"))
+    with pytest.raises(VaultError):
+        holder.delete("e1")
+    reopened = open_vault(path)
+    assert reopened.ids() == ["e1"]
+    reopened.add(entry("e2"))
+    assert open_vault(path).secret("e2") == "senha-e2"
+
+
+def test_vault_with_another_key_refuses_to_write(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    Vault(path, cipher).add(entry("e1"))
+
+    with pytest.raises(VaultError):
+        Vault(path, Fernet(Fernet.generate_key())).add(entry("e2"))
+    assert Vault(path, cipher).ids() == ["e1"]
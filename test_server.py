@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from server import MAX_COUNT, MAX_LENGTH, _local_host
+from sync import _UnixConnection
+from vault import Vault
+
+
+def request(socket_path, method, path, params=None, token=None, headers=()):
+    connection = _UnixConnection(socket_path, 10)
+    try:
+        sent = dict(headers)
+        if token is not None:
+            sent["Authorization"] = f"Bearer {token}"
+        body = json.dumps(params).encode() if params is not None else None
+        connection.request(method, path, body, sent)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def vault(tmp_path, cipher, entry):
+    vault = Vault(str(tmp_path / "passwords.enc"), cipher)
+    vault.add_many([entry(f"e{n}") for n in range(5)])
+    return vault
+
+
+def test_health_needs_no_token(service):
+    status, result = request(service(), "GET", "/health")
+    assert (status, result["status"]) == (200, "ok")
+
+
+# Pedidos recusados sem corpo: o serviço fecha a conexão sem lê-lo
+
+@pytest.mark.parametrize("token", [None, "errado"])
+def test_requests_without_the_token_are_refused(service, token):
+    status, _ = request(service(), "GET", "/metrics", token=token)
+    assert status == 401
+
+
+def test_browser_requests_are_refused(service, token):
+    status, _ = request(service(), "GET", "/metrics", token=token,
+                        headers={"Origin": "http://example.com"})
+    assert status == 403
+
+
+def test_local_host_check():
+    assert _local_host("localhost:8765")
+    assert _local_host("127.0.0.1")
+    assert _local_host("[::1]:8765")
+    assert not _local_host("example.com")
+    assert not _local_host("")
+
+
+def test_generate_and_strength(service, token):
+    socket_path = service()
+    status, result = request(socket_path, "POST", "/generate",
+                             {"count": 3, "length": 20, "min": {"digits": 2}}, token)
+    assert status == 200
+    assert [len(p) for p in result["passwords"]] == [20, 20, 20]
+    status, result = request(socket_path, "POST", "/strength",
+                             {"passwords": ["qw" * 300, "Senha@2024"]}, token)
+    assert status == 200
+    assert [r["length"] for r in result["results"]] == [600, 10]
+
+
+@pytest.mark.parametrize("params", [
+    {"passwords": ["x" * (MAX_LENGTH + 1)]},
+    {"passwords": [123]},
+    {"passwords": "texto"},
+    {"passwords": ["x"] * (MAX_COUNT + 1)},
+    {"count": 0},
+    {"count": 1, "max_repeat": 0},
+])
+def test_bad_input_is_a_400(service, token, params):
+    path = "/generate" if "count" in params else "/strength"
+    status, result = request(service(), "POST", path, params, token)
+    assert status == 400
+    assert result["error"]
+
+
+def test_batch_reports_errors_per_item(service, token):
+    status, result = request(service(), "POST", "/batch", [
+        {"op": "strength", "passwords": ["x" * (MAX_LENGTH + 1)]},
+        {"op": "generate", "count": 2},
+        {"op": "outra"},
+    ], token)
+    assert status == 200
+    first, second, third = result["results"]
+    assert "error" in first
+    assert len(second["passwords"]) == 2
+    assert third == {"error": "op desconhecida"}
+
+
+def test_vault_search_limit(service, token, vault):
+    socket_path = service(vault)
+    status, result = request(socket_path, "POST", "/vault/search", {"limit": 2}, token)
+    assert status == 200
+    assert (len(result["entries"]), result["total"]) == (2, 5)
+    assert all("password" not in e for e in result["entries"])
+    for limit in (-1, "2", 1.5, MAX_COUNT + 1):
+        status, _ = request(socket_path, "POST", "/vault/search", {"limit": limit}, token)
+        assert status == 400
+
+
+def test_vault_get_returns_secrets(service, token, vault):
+    status, result = request(service(vault), "POST", "/vault/get", {"ids": ["e1"]}, token)
+    assert status == 200
+    assert result["entries"][0]["password"] == "senha-e1"
@@ -0,0 +1,143 @@
+import json
+
+import pytest
+
+from sync import DirectorySync, ServiceSync
+from vault import (HEADER_V1, META_FIELDS, SECRETS_HEADER, Vault, _header,
+                   secrets_path)
+
+
+def write_legacy(path, cipher, entries):
+    """Cofre no formato mais antigo: a lista inteira em um token"""
+    with open(path, 'wb') as f:
+        f.write(cipher.encrypt(json.dumps(entries).encode()))
+
+
+def write_v1(path, cipher, entries):
+    """Cofre no log v1: um registro (com a senha) por token"""
+    with open(path, 'wb') as f:
+        f.write(HEADER_V1)
+        for item in entries:
+            f.write(cipher.encrypt(json.dumps({"op": "put", "entry": item}).encode())
+                    + b"\n")
+
+
+def write_v2_without_versions(path, cipher, entries):
+    """Cofre em segmentos gravado antes das réplicas (sem clock e node)"""
+    gen = "0badc0de"
+    offsets = []
+    with open(secrets_path(path, gen), 'wb') as f:
+        f.write(SECRETS_HEADER)
+        for item in entries:
+            offsets.append(f.tell())
+            secret = {"id": item["id"], "password": item["password"]}
+            f.write(cipher.encrypt(json.dumps(secret).encode()) + b"\n")
+    columns = {key: [item.get(key) for item in entries] for key in META_FIELDS}
+    columns["length"] = [len(item["password"]) for item in entries]
+    columns["secret"] = offsets
+    with open(path, 'wb') as f:
+        f.write(_header(gen))
+        f.write(cipher.encrypt(json.dumps({"put": columns}).encode()) + b"\n")
+
+
+def state(vault):
+    return {item["id"]: item["password"] for item in vault.iter_entries(secrets=True)}
+
+
+@pytest.mark.parametrize("write_old", [write_legacy, write_v1, write_v2_without_versions])
+def test_directory_sync_after_migration(tmp_path, cipher, entry, write_old):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    path_a = str(tmp_path / "a" / "passwords.enc")
+    path_b = str(tmp_path / "b" / "passwords.enc")
+    write_old(path_a, cipher, [entry("a1"), entry("a2")])
+    write_old(path_b, cipher, [entry("b1")])
+    laptop = Vault(path_a, cipher)
+    server = Vault(path_b, cipher)
+
+    DirectorySync(laptop, str(shared)).run()
+    DirectorySync(server, str(shared)).run()
+    DirectorySync(laptop, str(shared)).run()
+
+    expected = {"a1": "senha-a1", "a2": "senha-a2", "b1": "senha-b1"}
+    assert state(laptop) == expected
+    assert state(server) == expected
+    assert state(Vault(path_a, cipher)) == expected
+
+
+@pytest.mark.parametrize("write_old", [write_legacy, write_v1, write_v2_without_versions])
+def test_service_sync_after_migration(tmp_path, cipher, entry, service, token,
+                                      write_old):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    path_a = str(tmp_path / "a" / "passwords.enc")
+    path_b = str(tmp_path / "b" / "passwords.enc")
+    write_old(path_a, cipher, [entry("a1"), entry("a2")])
+    write_old(path_b, cipher, [entry("b1")])
+    laptop = Vault(path_a, cipher)
+    server = Vault(path_b, cipher)
+    socket_path = service(server)
+
+    received, sent = ServiceSync(laptop, socket_path, token).run()
+
+    assert (received, sent) == (1, 2)
+    expected = {"a1": "senha-a1", "a2": "senha-a2", "b1": "senha-b1"}
+    assert state(laptop) == expected
+    assert state(server) == expected
+    assert state(Vault(path_b, cipher)) == expected
+
+
+def test_merge_is_the_same_in_any_order(tmp_path, cipher, entry):
+    replicas = []
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+        replicas.append(Vault(str(tmp_path / name / "passwords.enc"), cipher))
+    a, b, c = replicas
+    write_v1(a.path, cipher, [entry("x"), entry("y"), entry("z")])
+    a = Vault(a.path, cipher)
+    # b e c (vazios) recebem o cofre migrado antes das alterações concorrentes
+    b.merge(a.changes({}))
+    c.merge(a.changes({}))
+    start = c.vector()
+
+    a.add(entry("nova-a"))
+    a.delete("x")
+    a.add(entry("y", "alterada-em-a"))
+    b.add(entry("nova-b"))
+    b.add(entry("x", "alterada-em-b"))
+    b.delete("z")
+    from_a = a.changes(start)
+    from_b = b.changes(start)
+
+    a.merge(from_b)
+    b.merge(from_a)
+    c.merge(from_b)
+    c.merge(from_a)
+
+    assert state(a) == state(b) == state(c)
+    assert a.vector() == b.vector() == c.vector()
+    # x foi apagada em a e alterada em b com o mesmo relógio: ganha o nó maior
+    expected = {"y", "nova-a", "nova-b"} | (set() if a.node > b.node else {"x"})
+    assert set(state(a)) == expected
+    assert state(a)["y"] == "alterada-em-a"
+
+
+def test_reading_an_unversioned_vault_does_not_write(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    write_v2_without_versions(path, cipher, [entry("a1"), entry("a2")])
+    with open(path, 'rb') as f:
+        before = f.read()
+
+    vault = Vault(path, cipher)
+    assert vault.ids() == ["a1", "a2"]
+    assert state(vault) == {"a1": "senha-a1", "a2": "senha-a2"}
+    assert vault.stream_entries()[0] == 2
+    vault.reuse_report()
+    with open(path, 'rb') as f:
+        assert f.read() == before
+
+    # Na sincronização as entradas ganham versão deste nó
+    assert vault.vector()[vault.node] == 1
+    assert len(vault.changes({}, nodes=[vault.node])["puts"]) == 2
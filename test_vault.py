@@ -0,0 +1,217 @@
+import json
+import os
+
+import pytest
+from cryptography.fernet import Fernet
+
+from vault import HEADER_V1, Vault, VaultError
+
+
+def secret_files(directory):
+    return sorted(p.name for p in directory.iterdir() if ".secrets-" in p.name)
+
+
+def test_migrate_legacy_then_load(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    old = [entry("e1"), entry("e2")]
+    with open(path, 'wb') as f:
+        f.write(cipher.encrypt(json.dumps(old).encode()))
+
+    vault = Vault(path, cipher)
+    assert vault.ids() == ["e1", "e2"]
+    assert vault.get("e1")["name"] == "Conta e1"
+    assert "password" not in vault.get("e1")
+    reopened = Vault(path, cipher)
+    assert [reopened.secret(i) for i in reopened.ids()] == ["senha-e1", "senha-e2"]
+
+
+def test_migrate_v1_log_then_load(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    records = [{"op": "put", "entry": entry("e1")}, {"op": "put", "entry": entry("e2")},
+               {"op": "del", "id": "e1"}, {"op": "put", "entry": entry("e3")}]
+    with open(path, 'wb') as f:
+        f.write(HEADER_V1)
+        for record in records:
+            f.write(cipher.encrypt(json.dumps(record).encode()) + b"\n")
+
+    vault = Vault(path, cipher)
+    assert vault.ids() == ["e2", "e3"]
+    assert Vault(path, cipher).secret("e3") == "senha-e3"
+
+
+def test_compact_keeps_secrets_at_new_offsets(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    vault = Vault(path, cipher, compact_min_dead=10 ** 9)
+    vault.add_many([entry(f"e{n}") for n in range(20)])
+    for n in range(0, 20, 2):
+        vault.delete(f"e{n}")
+    old_gen = vault.files()[0]
+
+    vault.compact()
+
+    assert vault.files()[0] != old_gen
+    assert secret_files(tmp_path) == [os.path.basename(vault.files()[0])]
+    assert vault.dead_records() == 0
+    expected = {f"e{n}": f"senha-e{n}" for n in range(1, 20, 2)}
+    assert {i: vault.secret(i) for i in vault.ids()} == expected
+    reopened = Vault(path, cipher)
+    assert {i: reopened.secret(i) for i in reopened.ids()} == expected
+    assert len(reopened.changes({})["dels"]) == 10
+
+
+def test_compact_keeps_writes_made_during_the_long_phase(tmp_path, cipher, entry,
+                                                         monkeypatch):
+    path = str(tmp_path / "passwords.enc")
+    vault = Vault(path, cipher, compact_min_dead=10 ** 9)
+    vault.add_many([entry(f"e{n}") for n in range(5)])
+    vault.delete("e0")
+    other = Vault(path, cipher, compact_min_dead=10 ** 9)
+    build = Vault._build_generation
+
+    def build_with_writes(self, items, tombstones=()):
+        result = build(self, items, tombstones)
+        # Gravações de outro processo enquanto a geração nova é montada
+        other.add(entry("e9", "nova"))
+        other.delete("e1")
+        vault.add(entry("e8", "local"))
+        return result
+
+    monkeypatch.setattr(Vault, "_build_generation", build_with_writes)
+    vault.compact()
+    monkeypatch.undo()
+
+    expected = {"e2": "senha-e2", "e3": "senha-e3", "e4": "senha-e4",
+                "e9": "nova", "e8": "local"}
+    assert {i: vault.secret(i) for i in vault.ids()} == expected
+    reopened = Vault(path, cipher)
+    assert {i: reopened.secret(i) for i in reopened.ids()} == expected
+    assert secret_files(tmp_path) == [os.path.basename(reopened.files()[0])]
+
+
+def test_compact_gives_up_if_the_files_were_replaced(tmp_path, cipher, entry,
+                                                      monkeypatch):
+    path = str(tmp_path / "passwords.enc")
+    vault = Vault(path, cipher, compact_min_dead=10 ** 9)
+    vault.add_many([entry(f"e{n}") for n in range(3)])
+    other = Vault(path, cipher, compact_min_dead=10 ** 9)
+    build = Vault._build_generation
+
+    def build_then_compact_elsewhere(self, items, tombstones=()):
+        result = build(self, items, tombstones)
+        monkeypatch.setattr(Vault, "_build_generation", build)
+        other.compact()
+        return result
+
+    monkeypatch.setattr(Vault, "_build_generation", build_then_compact_elsewhere)
+    vault.compact()
+
+    assert secret_files(tmp_path) == [os.path.basename(other.files()[0])]
+    assert {i: vault.secret(i) for i in vault.ids()} == {
+        f"e{n}": f"senha-e{n}" for n in range(3)}
+
+
+def test_wrong_key_is_an_error_not_an_empty_vault(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    vault = Vault(path, cipher, compact_min_dead=10 ** 9)
+    vault.add_many([entry("e1"), entry("e2")])
+    vault.delete("e1")
+    with open(path, 'rb') as f:
+        before = f.read()
+
+    other = Vault(path, Fernet(Fernet.generate_key()))
+    for operation in (other.ids, lambda: other.add(entry("e3")), other.compact,
+                      lambda: other.stream_entries()[0]):
+        with pytest.raises(VaultError):
+            operation()
+    with open(path, 'rb') as f:
+        assert f.read() == before
+
+
+def test_corrupt_interior_segment_is_an_error(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    vault = Vault(path, cipher)
+    vault.add(entry("e1"))
+    vault.add(entry("e2"))
+    with open(path, 'rb') as f:
+        header, first, second = f.readlines()
+    with open(path, 'wb') as f:
+        f.write(header + first[:10] + first[11:] + second)
+
+    with pytest.raises(VaultError):
+        Vault(path, cipher).ids()
+
+
+def test_torn_final_line_is_skipped_and_dropped_before_writing(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    vault = Vault(path, cipher)
+    vault.add(entry("e1"))
+    reader = Vault(path, cipher)
+    assert reader.ids() == ["e1"]
+    # Outro processo no meio de uma gravação (ou interrompido)
+    with open(path, 'ab') as f:
+        f.write(cipher.encrypt(b"{}")[:40])
+
+    assert reader.ids() == ["e1"]
+    reader.add(entry("e2"))
+    assert Vault(path, cipher).ids() == ["e1", "e2"]
+
+
+def test_v1_log_with_another_key_is_not_migrated(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    with open(path, 'wb') as f:
+        f.write(HEADER_V1)
+        f.write(cipher.encrypt(json.dumps({"op": "put", "entry": entry("e1")}).encode())
+                + b"\n")
+    with open(path, 'rb') as f:
+        before = f.read()
+
+    with pytest.raises(VaultError):
+        Vault(path, Fernet(Fernet.generate_key()))
+    with open(path, 'rb') as f:
+        assert f.read() == before
+    assert Vault(path, cipher).secret("e1") == "senha-e1"
+
+
+def test_writes_only_append_to_the_files(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    vault = Vault(path, cipher, compact_min_dead=10 ** 9)
+    vault.add_many([entry(f"e{n}") for n in range(10)])
+    before = [open(p, 'rb').read() for p in vault.files()]
+
+    vault.add(entry("e3", "trocada"))
+    vault.delete("e4")
+
+    after = [open(p, 'rb').read() for p in vault.files()]
+    for old, new in zip(before, after):
+        assert len(new) > len(old) and new.startswith(old)
+
+
+def test_log_replays_updates_and_deletes(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    vault = Vault(path, cipher, compact_min_dead=10 ** 9)
+    vault.add(entry("e1"))
+    vault.add(entry("e2"))
+    vault.add(entry("e1", "trocada"))
+    vault.delete("e2")
+    vault.add(entry("e3"))
+
+    reopened = Vault(path, cipher)
+    assert reopened.ids() == ["e1", "e3"]
+    assert reopened.secret("e1") == "trocada"
+    assert reopened.get("e2") is None
+    # O primeiro e1 e o put de e2 (a lápide de e2 fica)
+    assert reopened.dead_records() == 2
+
+
+def test_interrupted_write_is_dropped_on_open(tmp_path, cipher, entry):
+    path = str(tmp_path / "passwords.enc")
+    vault = Vault(path, cipher)
+    vault.add(entry("e1"))
+    sizes = [os.path.getsize(p) for p in vault.files()]
+    for p in vault.files():
+        with open(p, 'ab') as f:
+            f.write(b"gAAAAABpedaco-sem-quebra")
+
+    reopened = Vault(path, cipher)
+    assert [os.path.getsize(p) for p in reopened.files()] == sizes
+    assert reopened.secret("e1") == "senha-e1"
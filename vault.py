@@ -0,0 +1,1217 @@
+"""Armazenamento das senhas em log de registros criptografados.
+
+O cofre ocupa dois arquivos:
+
+``passwords.enc`` (metadados): uma linha de cabeçalho com a geração do
+cofre seguida de um token Fernet por linha. Cada token é um segmento com
+registros em colunas (os nomes dos campos não se repetem por entrada):
+
+    {"put": {"id": [...], "name": [...], ..., "secret": [...]}}
+        adiciona/substitui as entradas
+    {"del": ["id", ...]}
+        remove as entradas (lápides)
+
+As colunas são só os campos da listagem (META_FIELDS: nome, categoria,
+data, força e comprimento da senha); ``secret`` é o deslocamento do
+segredo de cada entrada no outro arquivo. Entradas e lápides levam também
+a versão de quem as gravou (``clock`` e ``node``, ver "Réplicas").
+
+``passwords.enc.secrets-<geração>`` (segredos): um token Fernet por linha,
+cada um com a senha (e demais campos) de uma entrada.
+
+Listar e buscar decifram só os segmentos de metadados (um token por
+gravação, ou por SEGMENT_ENTRIES entradas depois da compactação), nunca
+as senhas. A senha de uma entrada é lida sob demanda (secret()), com um
+seek direto ao seu deslocamento.
+
+Salvar ou deletar apenas acrescenta linhas ao fim dos arquivos (com
+fsync), primeiro o segredo e depois os metadados, sem decifrar ou
+reescrever o restante. A compactação copia os segredos vivos como estão
+para o arquivo de uma nova geração, regrava os metadados e troca o arquivo
+de metadados de forma atômica; as gravações não esperam por ela, e o que
+foi gravado no meio é levado para a geração nova. Os formatos antigos (um
+token por registro com a entrada inteira, ou um único token com a lista
+toda) são convertidos automaticamente na primeira abertura.
+
+Só a última linha de um arquivo pode estar pela metade (gravação em
+andamento ou interrompida) e é ignorada; uma linha inteira que não
+decifra (chave errada ou arquivo corrompido) gera VaultError, em vez de o
+cofre abrir sem ela e aceitar gravações.
+
+O módulo ``cryptography`` só é importado quando o cofre é usado, para não
+atrasar a abertura da janela.
+
+Os metadados decifrados ficam em memória e são servidos por id. O cache só
+é recarregado quando o tamanho ou a data de modificação do arquivo mudam
+por fora (outro processo, cópia de backup etc.).
+
+Réplicas: cada cópia do cofre (uma por máquina) é um nó com id próprio
+(arquivo ``passwords.enc.node``). Cada gravação recebe a versão
+(relógio de Lamport, nó); changes() devolve só o que outra réplica ainda
+não viu, pelo vetor de versões dela, e merge() aplica as alterações
+recebidas mantendo, por entrada, a versão maior. Lápides nunca são
+descartadas (guardam só id e versão), para que remoções cheguem a todas
+as réplicas. Registros de antes das réplicas recebem uma versão do nó
+local, senão nunca seriam enviados: os formatos antigos na conversão, e
+segmentos gravados sem versão na primeira sincronização (abrir e listar
+não grava nada). O transporte fica em sync.py.
+"""
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+
+import metrics
+from index import VaultIndex, parse_query
+
+HEADER_PREFIX = b"#pgp-vault v2 "
+HEADER_SIZE = len(HEADER_PREFIX) + 9
+SECRETS_HEADER = b"#pgp-secrets v1\n"
+# Formato anterior: um registro (com a senha) por token
+HEADER_V1 = b"#pgp-vault v1\n"
+
+# Campos guardados nos metadados; os demais vão para o segredo
+META_FIELDS = ("id", "name", "category", "created", "strength", "length")
+
+# Entradas por segmento de metadados na compactação
+SEGMENT_ENTRIES = 512
+
+# Versão dos registros gravados antes das réplicas (perde para qualquer
+# outra); trocada por uma versão do nó local na primeira sincronização
+BASE_VERSION = (0, "")
+
+# Compacta quando há mais registros mortos que vivos (e ao menos este tanto)
+COMPACT_MIN_DEAD = 256
+
+
+def _no_clock():
+    return 0.0
+
+
+class VaultError(Exception):
+    """Erro ao abrir ou gravar o cofre"""
+
+
+def new_entry_id():
+    """Gera identificador estável para uma entrada"""
+    return secrets.token_hex(8)
+
+
+def _header(gen):
+    return HEADER_PREFIX + gen.encode() + b"\n"
+
+
+def secrets_path(path, gen):
+    """Arquivo de segredos da geração gen do cofre em path"""
+    return f"{path}.secrets-{gen}"
+
+
+def _split(entry):
+    """Separa uma entrada em (metadados, segredo)"""
+    meta = {key: entry[key] for key in META_FIELDS if key in entry}
+    meta["length"] = len(entry.get("password", ""))
+    secret = {key: value for key, value in entry.items() if key not in META_FIELDS}
+    secret["id"] = entry["id"]
+    return meta, secret
+
+
+def _put_columns(metas, offsets, versions):
+    """Entradas em colunas, para um segmento de metadados"""
+    columns = {key: [meta.get(key) for meta in metas] for key in META_FIELDS}
+    columns["secret"] = list(offsets)
+    columns["clock"] = [clock for clock, _ in versions]
+    columns["node"] = [node for _, node in versions]
+    return columns
+
+
+def _del_columns(entry_ids, versions):
+    """Lápides em colunas, para um segmento de metadados"""
+    return {"id": list(entry_ids), "clock": [clock for clock, _ in versions],
+            "node": [node for _, node in versions]}
+
+
+def _versions_of(columns):
+    """Versões de uma coluna de segmento (BASE_VERSION se não gravadas)"""
+    clocks = columns.get("clock")
+    if clocks is None:
+        return [BASE_VERSION] * len(columns["id"])
+    return list(zip(clocks, columns["node"]))
+
+
+def _segment_records(segment):
+    """Registros de um segmento: (id, metadados, deslocamento, versão)
+
+    Lápides vêm com metadados e deslocamento None.
+    """
+    columns = segment.get("put")
+    if columns:
+        names = [key for key in META_FIELDS if key in columns]
+        for values, offset, version in zip(zip(*(columns[key] for key in names)),
+                                           columns["secret"], _versions_of(columns)):
+            entry = {key: value for key, value in zip(names, values)
+                     if value is not None}
+            yield entry["id"], entry, offset, tuple(version)
+    columns = segment.get("del")
+    if columns:
+        for entry_id, version in zip(columns["id"], _versions_of(columns)):
+            yield entry_id, None, None, tuple(version)
+
+
+def _node_id(path):
+    """Identificador desta réplica do cofre (arquivo <cofre>.node)
+
+    O arquivo guarda também a máquina e o caminho do cofre: uma cópia dos
+    arquivos para outro lugar ganha um nó novo, em vez de gravar versões
+    iguais às do original.
+    """
+    node_path = path + ".node"
+    place = {"host": socket.gethostname(), "path": os.path.abspath(path)}
+    try:
+        with open(node_path, encoding='utf-8') as f:
+            doc = json.load(f)
+        if all(doc.get(key) == value for key, value in place.items()):
+            return doc["node"]
+    except (OSError, ValueError, KeyError):
+        pass
+    node = secrets.token_hex(4)
+    with open(node_path, 'w', encoding='utf-8') as f:
+        json.dump({"node": node, **place}, f)
+    return node
+
+
+class _Versions:
+    """Versão (relógio, nó) de cada entrada e lápide, com índice por nó
+
+    O índice guarda, por nó, os relógios em ordem: as alterações que uma
+    réplica ainda não viu são achadas por busca binária, sem percorrer o
+    cofre inteiro.
+    """
+
+    def __init__(self):
+        self.of = {}
+        self.by_node = {}
+        self.clock = 0
+
+    def set(self, entry_id, version):
+        self.of[entry_id] = version
+        clock, node = version
+        lists = self.by_node.get(node)
+        if lists is None:
+            lists = self.by_node[node] = ([], [])
+        clocks, ids = lists
+        if not clocks or clock >= clocks[-1]:
+            clocks.append(clock)
+            ids.append(entry_id)
+        else:
+            i = bisect_right(clocks, clock)
+            clocks.insert(i, clock)
+            ids.insert(i, entry_id)
+        if clock > self.clock:
+            self.clock = clock
+
+    def newer(self, entry_id, version):
+        """True se version ganha da versão atual da entrada"""
+        current = self.of.get(entry_id)
+        return current is None or version > current
+
+    def vector(self):
+        """Maior relógio visto de cada nó"""
+        return {node: clocks[-1] for node, (clocks, _) in self.by_node.items()}
+
+    def since(self, vector, nodes=None):
+        """Ids cuja versão atual não está coberta pelo vetor dado"""
+        for node in (list(self.by_node) if nodes is None else nodes):
+            clocks, ids = self.by_node.get(node, ((), ()))
+            # Entradas que já trocaram de versão ficam na lista até a
+            # próxima carga: só vale a posição da versão atual
+            for i in range(bisect_right(clocks, vector.get(node, -1)), len(clocks)):
+                if self.of.get(ids[i]) == (clocks[i], node):
+                    yield ids[i]
+
+
+def _fsync_dir(path):
+    """Garante que a troca de nomes no diretório foi persistida"""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def file_lock(path):
+    """Trava exclusiva entre processos sobre o cofre em path (<cofre>.lock)
+
+    Gravações, compactação e rotação de chave a seguram enquanto mexem nos
+    arquivos, para que nenhuma perca o que outro processo acrescentou. Sem
+    efeito fora do POSIX.
+    """
+    if os.name != "posix":
+        yield
+        return
+    import fcntl
+
+    with open(path + ".lock", 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _unreadable(path):
+    """Erro para uma linha inteira do log que não decifra"""
+    return VaultError(f"Não foi possível ler {path}: registro ilegível "
+                      "(chave errada ou arquivo corrompido)")
+
+
+def _truncate_partial(path, start):
+    """Descarta a última linha de path se ela não terminar em quebra"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size <= start:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Última linha sem quebra: gravação interrompida
+        f.seek(max(start, size - 65536))
+        tail = f.read()
+        cut = size - len(tail) + tail.rfind(b"\n") + 1
+    with open(path, 'r+b') as f:
+        f.truncate(max(cut, start))
+
+
+class Vault:
+    """Cofre de senhas em log append-only"""
+
+    def __init__(self, path, cipher, compact_min_dead=COMPACT_MIN_DEAD):
+        self.path = path
+        self.cipher = cipher
+        self.compact_min_dead = compact_min_dead
+        self._lock = threading.RLock()
+        self._file_locked = False
+        self._compactor = None
+        # Cache dos metadados decifrados, carregado no primeiro acesso
+        self._entries = None
+        self._offsets = None
+        self._versions = None
+        self._node = None
+        self._gen = None
+        self._signature = None
+        self._records = None
+        # Arquivo de metadados (dispositivo, inode) que a cifra já abriu
+        self._key_checked = None
+        self.index = None
+        # Índice de reuso de senhas: montado na primeira consulta
+        self._reuse = None
+        self._prepare()
+
+    # ----- formato -----
+
+    @contextmanager
+    def _exclusive(self):
+        """Trava do cofre entre threads (self._lock) e processos (file_lock)
+
+        Reentrante: quem já a segura pode chamar outro método que a pede.
+        """
+        with self._lock:
+            if self._file_locked:
+                yield
+                return
+            with file_lock(self.path):
+                self._file_locked = True
+                try:
+                    yield
+                finally:
+                    self._file_locked = False
+
+    def _prepare(self):
+        """Converte formato antigo e descarta escrita incompleta no fim"""
+        if not os.path.exists(self.path):
+            return
+        with self._exclusive():
+            entries = None
+            with open(self.path, 'rb') as f:
+                head = f.read(HEADER_SIZE)
+                if head.startswith(HEADER_V1):
+                    f.seek(len(HEADER_V1))
+                    entries = self._read_v1(f)
+                elif not head.startswith(HEADER_PREFIX):
+                    f.seek(0)
+                    entries = self._read_legacy(f.read())
+            if entries is not None:
+                self._migrate(entries)
+                return
+            self._parse_header(head)
+            self._drop_partial()
+
+    def _drop_partial(self):
+        """Descarta a linha pela metade no fim dos dois arquivos
+
+        Chamado com a trava, quando nenhuma gravação está em andamento: a
+        linha é de um processo interrompido, e a gravação seguinte a
+        emendaria em uma linha ilegível.
+        """
+        if not os.path.exists(self.path):
+            return
+        _truncate_partial(self.path, HEADER_SIZE)
+        path = secrets_path(self.path, self._read_gen())
+        if os.path.exists(path):
+            _truncate_partial(path, len(SECRETS_HEADER))
+
+    def _parse_header(self, head):
+        """Geração gravada no cabeçalho do arquivo de metadados"""
+        if (len(head) != HEADER_SIZE or not head.startswith(HEADER_PREFIX)
+                or not head.endswith(b"\n")):
+            raise VaultError(f"Formato desconhecido: {self.path}")
+        return head[len(HEADER_PREFIX):-1].decode("ascii")
+
+    def _read_gen(self):
+        with open(self.path, 'rb') as f:
+            return self._parse_header(f.read(HEADER_SIZE))
+
+    def _read_legacy(self, data):
+        """Entradas do arquivo com a lista inteira em um único token"""
+        from cryptography.fernet import InvalidToken
+
+        entries = []
+        if data.strip():
+            try:
+                entries = json.loads(self.cipher.decrypt(data.strip()).decode())
+            except (InvalidToken, ValueError) as e:
+                raise VaultError(f"Não foi possível ler {self.path}: {e}")
+        for entry in entries:
+            entry.setdefault("id", new_entry_id())
+        return entries
+
+    def _read_v1(self, f):
+        """Entradas vivas do log com um registro (e a senha) por token"""
+        from cryptography.fernet import InvalidToken
+
+        live = {}
+        for line in f:
+            try:
+                record = json.loads(self.cipher.decrypt(line.rstrip(b"\n")).decode())
+            except (InvalidToken, ValueError):
+                if line.endswith(b"\n"):
+                    raise _unreadable(self.path)
+                # Escrita interrompida no fim
+                continue
+            if record.get("op") == "put":
+                live[record["entry"]["id"]] = record["entry"]
+            elif record.get("op") == "del":
+                live.pop(record.get("id"), None)
+        return list(live.values())
+
+    def _migrate(self, entries):
+        """Grava as entradas no formato atual, com versão deste nó"""
+        version = (1, self.node)
+        items = []
+        for entry in entries:
+            meta, secret = _split(entry)
+            items.append((meta, self._encrypt(secret), version))
+        self._write_generation(items)
+
+    def _encrypt(self, data):
+        """Criptografa um registro (ou segmento) em uma linha"""
+        return self.cipher.encrypt(json.dumps(data).encode()) + b"\n"
+
+    def _load(self):
+        """Lê o log de metadados
+
+        Retorna (geração, entradas, deslocamentos, versões, registros).
+        """
+        from cryptography.fernet import InvalidToken
+
+        live = {}
+        offsets = {}
+        versions = _Versions()
+        count = 0
+        if not os.path.exists(self.path):
+            return None, live, offsets, versions, count
+        # Tempos por fase só quando as métricas estão ligadas
+        clock = time.perf_counter if metrics.enabled() else _no_clock
+        read = decrypt = parse = 0.0
+        size = segments = 0
+        with open(self.path, 'rb') as f:
+            gen = self._parse_header(f.read(HEADER_SIZE))
+            mark = clock()
+            for line in f:
+                t1 = clock()
+                read += t1 - mark
+                size += len(line)
+                token = line.rstrip(b"\n")
+                if not token:
+                    continue
+                try:
+                    data = self.cipher.decrypt(token)
+                    t2 = clock()
+                    segment = json.loads(data.decode())
+                except (InvalidToken, ValueError):
+                    if line.endswith(b"\n"):
+                        raise _unreadable(self.path)
+                    # Última linha ainda sendo gravada por outro processo
+                    mark = clock()
+                    continue
+                t3 = clock()
+                decrypt += t2 - t1
+                parse += t3 - t2
+                segments += 1
+                for entry_id, entry, offset, version in _segment_records(segment):
+                    if entry is None:
+                        live.pop(entry_id, None)
+                        offsets.pop(entry_id, None)
+                    else:
+                        live[entry_id] = entry
+                        offsets[entry_id] = offset
+                    versions.set(entry_id, version)
+                    count += 1
+                mark = clock()
+        metrics.observe("vault.read", read)
+        metrics.observe("vault.decrypt", decrypt)
+        metrics.observe("vault.parse", parse)
+        metrics.inc("vault.bytes_read", size)
+        metrics.inc("vault.decrypts", segments)
+        return gen, live, offsets, versions, count
+
+    @staticmethod
+    def _stat_signature(st):
+        """Identifica a versão do arquivo pelo tamanho e data de modificação"""
+        return (st.st_size, st.st_mtime_ns)
+
+    def _current_signature(self):
+        """Assinatura atual do arquivo (None se não existe)"""
+        try:
+            return self._stat_signature(os.stat(self.path))
+        except FileNotFoundError:
+            return None
+
+    def _ensure_loaded(self):
+        """Carrega o cache se ainda não carregado ou se o arquivo mudou
+
+        Gravações e recargas alteram o cache e o índice com a trava; as
+        leituras também a seguram (por pouco tempo), para nunca ver o
+        cache pela metade.
+        """
+        with self._lock:
+            if self._entries is not None and self._current_signature() == self._signature:
+                return
+            self._reload()
+
+    def _ensure_versioned(self):
+        """Carrega o cache e dá versão aos registros de antes das réplicas
+
+        Só os caminhos de sincronização (vector, changes, merge) chamam:
+        abrir, listar ou exportar um cofre antigo não grava nada nele.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if self._unversioned():
+                self._stamp_unversioned()
+
+    def _reload(self):
+        """Relê os metadados e troca o cache (chamado com a trava)"""
+        signature = self._current_signature()
+        with metrics.timer("vault.load"):
+            gen, live, offsets, versions, count = self._load()
+        metrics.inc("vault.loads")
+        self._entries = live
+        self._offsets = offsets
+        self._versions = versions
+        self._gen = gen
+        self._records = count
+        self._signature = signature
+        self.index = VaultIndex(live.values())
+        self._reuse = None
+
+    def _check_key(self):
+        """VaultError se a cifra não abre o arquivo atual (chamado com a trava)
+
+        Um processo que abriu o cofre antes de uma rotação de chave ainda
+        tem só a chave antiga: o que ele gravasse depois da troca não seria
+        lido com a chave nova. Antes de gravar, o primeiro segmento é
+        decifrado, uma vez por arquivo (a rotação e a compactação o trocam).
+        """
+        from cryptography.fernet import InvalidToken
+
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        identity = (st.st_dev, st.st_ino)
+        if identity == self._key_checked:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(HEADER_SIZE)
+            token = f.readline().rstrip(b"\n")
+        if token:
+            try:
+                self.cipher.decrypt(token)
+            except InvalidToken:
+                raise VaultError("A chave do cofre foi trocada por outro processo; "
+                                 "abra o cofre de novo")
+        self._key_checked = identity
+
+    def _unversioned(self):
+        """Ids (entradas e lápides) cuja versão atual é BASE_VERSION"""
+        versions = self._versions
+        _, ids = versions.by_node.get(BASE_VERSION[1], ((), ()))
+        return [entry_id for entry_id in ids if versions.of.get(entry_id) == BASE_VERSION]
+
+    def _stamp_unversioned(self):
+        """Dá uma versão deste nó às entradas e lápides sem versão
+
+        Registros gravados antes das réplicas ficam com BASE_VERSION, que
+        nenhum nó publica em changes(). Um segmento só de metadados os
+        regrava com o relógio local, apontando para os mesmos segredos;
+        os registros antigos viram mortos e saem na compactação.
+        """
+        with self._exclusive():
+            self._drop_partial()
+            self._check_key()
+            if self._current_signature() != self._signature:
+                self._reload()
+            versions = self._versions
+            ids = self._unversioned()
+            if not ids:
+                return
+            local = (versions.clock + 1, self.node)
+            puts = [entry_id for entry_id in ids if entry_id in self._entries]
+            dels = [entry_id for entry_id in ids if entry_id not in self._entries]
+            segment = {}
+            if puts:
+                segment["put"] = _put_columns([self._entries[i] for i in puts],
+                                              [self._offsets[i] for i in puts],
+                                              [local] * len(puts))
+            if dels:
+                segment["del"] = _del_columns(dels, [local] * len(dels))
+            with open(self.path, 'ab') as f:
+                f.write(self._encrypt(segment))
+                f.flush()
+                os.fsync(f.fileno())
+                self._signature = self._stat_signature(os.fstat(f.fileno()))
+            self._records += len(ids)
+            for entry_id in ids:
+                versions.set(entry_id, local)
+
+    def _append(self, puts=(), dels=()):
+        """Acrescenta entradas e lápides com fsync e atualiza o cache
+
+        puts: (metadados, linha do segredo cifrada, segredo, versão);
+        dels: (id, versão). Versão None é uma gravação local e recebe o
+        relógio seguinte deste nó; merge() passa a versão da outra réplica.
+
+        O segredo é gravado antes dos metadados: uma interrupção no meio
+        deixa no máximo um segredo órfão, que a compactação descarta. O
+        cache é atualizado antes (se o arquivo mudou por fora) para que o
+        relógio local passe de todas as versões já gravadas.
+        """
+        with self._exclusive():
+            self._drop_partial()
+            self._check_key()
+            self._ensure_loaded()
+            gen = self._gen
+            if gen is None:
+                gen = self._write_generation(())[0]
+            local = (self._versions.clock + 1, self.node)
+            offsets = []
+            if puts:
+                path = secrets_path(self.path, gen)
+                new_file = not os.path.exists(path)
+                data = b"".join(line for _, line, _, _ in puts)
+                with open(path, 'ab') as f:
+                    if new_file:
+                        f.write(SECRETS_HEADER)
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    # Em modo append a posição final é a da nossa escrita
+                    offset = f.tell() - len(data)
+                for _, line, _, _ in puts:
+                    offsets.append(offset)
+                    offset += len(line)
+            put_versions = [version or local for _, _, _, version in puts]
+            del_versions = [version or local for _, version in dels]
+            segment = {}
+            if puts:
+                segment["put"] = _put_columns([meta for meta, _, _, _ in puts],
+                                              offsets, put_versions)
+            if dels:
+                segment["del"] = _del_columns([entry_id for entry_id, _ in dels],
+                                              del_versions)
+            with open(self.path, 'ab') as f:
+                f.write(self._encrypt(segment))
+                f.flush()
+                os.fsync(f.fileno())
+                signature = self._stat_signature(os.fstat(f.fileno()))
+            self._signature = signature
+            self._gen = gen
+            self._records += len(puts) + len(dels)
+
+            for (meta, _, secret, _), offset, version in zip(puts, offsets, put_versions):
+                self._entries[meta["id"]] = meta
+                self._offsets[meta["id"]] = offset
+                self._versions.set(meta["id"], version)
+                self.index.add(meta)
+                if self._reuse is not None:
+                    self._reuse.add(secret)
+            for (entry_id, _), version in zip(dels, del_versions):
+                self._entries.pop(entry_id, None)
+                self._offsets.pop(entry_id, None)
+                self._versions.set(entry_id, version)
+                self.index.remove(entry_id)
+                if self._reuse is not None:
+                    self._reuse.remove(entry_id)
+
+    def _rewrite(self, gen, lines):
+        """Grava novo arquivo de metadados e substitui o atual atomicamente"""
+        tmp = self.path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_header(gen))
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        _fsync_dir(self.path)
+
+    def _write_generation(self, items, tombstones=()):
+        """Grava uma geração nova do cofre e a torna a atual
+
+        items: (metadados, linha do segredo já cifrada, versão);
+        tombstones: (id, versão). Retorna (geração, deslocamentos por id).
+        """
+        gen, offsets, segments = self._build_generation(items, tombstones)
+        self._rewrite(gen, segments)
+        self._remove_stale(gen)
+        return gen, offsets
+
+    def _build_generation(self, items, tombstones=()):
+        """Grava o arquivo de segredos de uma geração nova, sem ativá-la
+
+        Parâmetros como em _write_generation(). Retorna (geração,
+        deslocamentos por id, linhas de metadados).
+        """
+        gen = secrets.token_hex(4)
+        offsets = {}
+        segments = []
+        batch = []
+
+        def flush():
+            metas = [meta for meta, _ in batch]
+            versions = [version for _, version in batch]
+            segments.append(self._encrypt({"put": _put_columns(
+                metas, [offsets[meta["id"]] for meta in metas], versions)}))
+            batch.clear()
+
+        with open(secrets_path(self.path, gen), 'wb') as f:
+            f.write(SECRETS_HEADER)
+            for meta, line, version in items:
+                offsets[meta["id"]] = f.tell()
+                f.write(line)
+                batch.append((meta, version))
+                if len(batch) == SEGMENT_ENTRIES:
+                    flush()
+            f.flush()
+            os.fsync(f.fileno())
+        if batch:
+            flush()
+        tombstones = list(tombstones)
+        for start in range(0, len(tombstones), SEGMENT_ENTRIES):
+            part = tombstones[start:start + SEGMENT_ENTRIES]
+            segments.append(self._encrypt({"del": _del_columns(
+                [entry_id for entry_id, _ in part], [version for _, version in part])}))
+        return gen, offsets, segments
+
+    def _copy_tail(self, meta_file, stop, source, secrets_stop, gen, offsets):
+        """Leva para a geração gen o que foi gravado depois de stop
+
+        meta_file e source são os arquivos de metadados e de segredos da
+        geração atual; stop e secrets_stop, os tamanhos que tinham quando
+        a compactação começou. Os segredos acrescentados são copiados de
+        uma vez e os segmentos do fim são cifrados de novo com os
+        deslocamentos na geração gen (offsets é atualizado). Retorna
+        (linhas de metadados, registros).
+        """
+        from cryptography.fernet import InvalidToken
+
+        meta_file.seek(stop)
+        tail = meta_file.read()
+        if not tail:
+            return [], 0
+        source.seek(secrets_stop)
+        appended = source.read()
+        lines = []
+        count = 0
+        with open(secrets_path(self.path, gen), 'ab') as out:
+            out.write(appended)
+            base = out.tell() - len(appended)
+            # Lido com a trava: termina em quebra de linha
+            for token in tail.split(b"\n"):
+                if not token:
+                    continue
+                try:
+                    segment = json.loads(self.cipher.decrypt(token).decode())
+                except (InvalidToken, ValueError):
+                    raise _unreadable(self.path)
+                columns = segment.get("put")
+                if columns:
+                    moved = []
+                    for offset in columns["secret"]:
+                        if offset >= secrets_stop:
+                            moved.append(base + offset - secrets_stop)
+                            continue
+                        # Segredo gravado antes do início (não acontece
+                        # com as gravações atuais, que seguram a trava)
+                        source.seek(offset)
+                        line = source.readline()
+                        moved.append(out.tell())
+                        out.write(line if line.endswith(b"\n") else line + b"\n")
+                    columns["secret"] = moved
+                for entry_id, entry, offset, _ in _segment_records(segment):
+                    if entry is None:
+                        offsets.pop(entry_id, None)
+                    else:
+                        offsets[entry_id] = offset
+                    count += 1
+                lines.append(self._encrypt(segment))
+            out.flush()
+            os.fsync(out.fileno())
+        return lines, count
+
+    def _remove_stale(self, gen):
+        """Remove arquivos de segredos de outras gerações"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        prefix = os.path.basename(self.path) + ".secrets-"
+        keep = os.path.basename(secrets_path(self.path, gen))
+        for name in os.listdir(directory):
+            if (name.startswith(prefix) and len(name) == len(keep)
+                    and name != keep):
+                os.remove(os.path.join(directory, name))
+
+    # ----- segredos -----
+
+    def _open_secrets(self):
+        """Arquivo de segredos aberto e os deslocamentos da mesma geração
+
+        Se outro processo compactou o cofre (e removeu o arquivo antigo),
+        recarrega os metadados e tenta a geração nova.
+        """
+        for attempt in (0, 1):
+            self._ensure_loaded()
+            with self._lock:
+                gen, offsets = self._gen, self._offsets
+            if gen is None:
+                return None, offsets
+            try:
+                return open(secrets_path(self.path, gen), 'rb'), offsets
+            except FileNotFoundError:
+                if attempt:
+                    raise VaultError(
+                        f"Arquivo de segredos não encontrado: {secrets_path(self.path, gen)}")
+                # Força a releitura dos metadados
+                self._signature = None
+
+    def _decrypt_secret(self, f, offset, entry_id):
+        """Decifra o segredo gravado em offset no arquivo de segredos f"""
+        from cryptography.fernet import InvalidToken
+
+        f.seek(offset)
+        try:
+            secret = json.loads(self.cipher.decrypt(f.readline().rstrip(b"\n")).decode())
+        except (InvalidToken, ValueError):
+            secret = None
+        if not isinstance(secret, dict) or secret.get("id") != entry_id:
+            raise VaultError(f"Segredo da entrada {entry_id} corrompido")
+        metrics.inc("vault.secret_reads")
+        return secret
+
+    def _read_secrets(self, entry_ids):
+        """Percorre (id, segredo decifrado) dos ids que existem"""
+        f, offsets = self._open_secrets()
+        if f is None:
+            return
+        with f:
+            for entry_id in entry_ids:
+                offset = offsets.get(entry_id)
+                if offset is not None:
+                    yield entry_id, self._decrypt_secret(f, offset, entry_id)
+
+    def secret(self, entry_id):
+        """Decifra só a senha da entrada (None se a entrada não existe)"""
+        with metrics.timer("vault.secret"):
+            for _, secret in self._read_secrets([entry_id]):
+                return secret.get("password", "")
+        return None
+
+    # ----- operações -----
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+    def entries(self):
+        """Retorna metadados das entradas vivas, na ordem em que foram criadas
+
+        As entradas são cópias: alterá-las não muda o cache nem o índice.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return [dict(entry) for entry in self._entries.values()]
+
+    def iter_entries(self, secrets=False):
+        """Percorre as entradas vivas sem copiar a lista inteira
+
+        Com secrets=True as entradas vêm completas (com a senha). Percorre
+        as entradas que existiam na chamada; a trava só é tomada para copiar
+        os ids, não durante o percurso.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entries = self._entries
+            ids = list(entries)
+        if secrets:
+            for entry_id, secret in self._read_secrets(ids):
+                entry = entries.get(entry_id)
+                if entry is not None:
+                    yield {**entry, **secret}
+            return
+        for entry_id in ids:
+            entry = entries.get(entry_id)
+            if entry is not None:
+                yield dict(entry)
+
+    def _iter_segments(self, f, stop):
+        """Segmentos decifrados do arquivo de metadados f até a posição stop"""
+        from cryptography.fernet import InvalidToken
+
+        f.seek(HEADER_SIZE)
+        position = HEADER_SIZE
+        while position < stop:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            token = line.rstrip(b"\n")
+            if not token:
+                continue
+            try:
+                segment = json.loads(self.cipher.decrypt(token).decode())
+            except (InvalidToken, ValueError):
+                if line.endswith(b"\n"):
+                    raise _unreadable(self.path)
+                # Última linha ainda sendo gravada, como em _load()
+                continue
+            yield segment
+
+    def stream_entries(self):
+        """Entradas vivas completas lidas direto dos arquivos, sem o cache
+
+        Retorna (quantidade, iterador). O log de metadados é lido duas
+        vezes, um segmento por vez: a primeira passada guarda só o
+        deslocamento do segredo mais recente de cada id, a segunda decifra
+        as entradas vivas. Os arquivos ficam abertos desde o início: uma
+        compactação no meio não atrapalha, e gravações feitas depois não
+        entram.
+        """
+        if not os.path.exists(self.path):
+            return 0, iter(())
+        with self._lock:
+            meta_file = open(self.path, 'rb')
+            try:
+                gen = self._parse_header(meta_file.read(HEADER_SIZE))
+                stop = os.fstat(meta_file.fileno()).st_size
+                path = secrets_path(self.path, gen)
+                secrets_file = open(path, 'rb') if os.path.exists(path) else None
+            except BaseException:
+                meta_file.close()
+                raise
+        latest = {}
+        for segment in self._iter_segments(meta_file, stop):
+            for entry_id, _, offset, _ in _segment_records(segment):
+                latest[entry_id] = offset
+        count = sum(offset is not None for offset in latest.values())
+
+        def entries():
+            with meta_file:
+                if secrets_file is None:
+                    return
+                with secrets_file:
+                    for segment in self._iter_segments(meta_file, stop):
+                        for entry_id, entry, offset, _ in _segment_records(segment):
+                            if entry is not None and latest.get(entry_id) == offset:
+                                yield {**entry, **self._decrypt_secret(
+                                    secrets_file, offset, entry_id)}
+
+        return count, entries()
+
+    def files(self):
+        """Arquivos do cofre no disco: [segredos, metadados]"""
+        if not os.path.exists(self.path):
+            return []
+        return [secrets_path(self.path, self._read_gen()), self.path]
+
+    def ids(self):
+        """Retorna ids das entradas vivas, na ordem em que foram criadas"""
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._entries)
+
+    def get(self, entry_id):
+        """Retorna cópia dos metadados da entrada pelo id (None se não existe)"""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(entry_id)
+        return None if entry is None else dict(entry)
+
+    def get_many(self, entry_ids, secrets=False):
+        """Entradas dos ids dados (None para os que não existem)
+
+        Com secrets=True as entradas vêm completas (com a senha). As
+        entradas são cópias, como em get().
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entries = list(map(self._entries.get, entry_ids))
+        if not secrets:
+            return [None if entry is None else dict(entry) for entry in entries]
+        found = dict(self._read_secrets([e["id"] for e in entries if e is not None]))
+        return [None if entry is None or entry["id"] not in found
+                else {**entry, **found[entry["id"]]} for entry in entries]
+
+    def add(self, entry):
+        """Adiciona entrada e retorna seu id"""
+        return self.add_many([entry])[0]
+
+    def add_many(self, entries):
+        """Adiciona várias entradas com uma única escrita e retorna os ids"""
+        puts = []
+        for entry in entries:
+            entry = dict(entry)
+            entry.setdefault("id", new_entry_id())
+            meta, secret = _split(entry)
+            puts.append((meta, self._encrypt(secret), secret, None))
+
+        with metrics.timer("vault.append"):
+            self._append(puts)
+        metrics.inc("vault.encrypts", len(puts) + 1)
+        return [meta["id"] for meta, _, _, _ in puts]
+
+    def delete(self, entry_id):
+        """Remove entrada gravando uma lápide"""
+        self._append(dels=[(entry_id, None)])
+        self.maybe_compact()
+
+    def search(self, query):
+        """Ids das entradas que atendem à busca (ver index.parse_query)"""
+        with self._lock, metrics.timer("vault.search"):
+            self._ensure_loaded()
+            return self.index.search(**parse_query(query))
+
+    def _reuse_index(self):
+        """Índice de reuso, montado na primeira vez e mantido a cada gravação
+
+        Montar o índice decifra todas as senhas (uma vez por carga), sem a
+        trava: as leituras da interface não esperam. Se o cofre mudou no
+        meio, monta de novo.
+        """
+        from reuse import ReuseIndex
+
+        while True:
+            with self._lock:
+                self._ensure_loaded()
+                if self._reuse is not None:
+                    return self._reuse
+                signature = self._signature
+            with metrics.timer("vault.reuse.build"):
+                reuse = ReuseIndex(self.iter_entries(secrets=True))
+            with self._lock:
+                if self._signature == signature and self._reuse is None:
+                    self._reuse = reuse
+                if self._reuse is not None:
+                    return self._reuse
+
+    def find_reuse(self, password, exclude_id=None):
+        """Ids das entradas com a mesma senha e com senha parecida"""
+        reuse = self._reuse_index()
+        with self._lock:
+            return reuse.check(password, exclude_id)
+
+    def reuse_report(self):
+        """Grupos de senhas reutilizadas: lista de (tipo, entradas)
+
+        tipo é "igual" (mesma senha) ou "parecida" (ver reuse.py).
+        """
+        reuse = self._reuse_index()
+        with self._lock:
+            groups = reuse.groups()
+            return [(kind, [dict(self._entries[i]) for i in ids if i in self._entries])
+                    for kind, ids in groups]
+
+    # ----- réplicas -----
+
+    @property
+    def node(self):
+        """Id desta réplica (criado na primeira gravação)"""
+        if self._node is None:
+            self._node = _node_id(self.path)
+        return self._node
+
+    def vector(self):
+        """Vetor de versões: maior relógio visto de cada nó"""
+        self._ensure_versioned()
+        with self._lock:
+            return self._versions.vector()
+
+    def changes(self, vector, nodes=None):
+        """Alterações que uma réplica com o vetor de versões dado não viu
+
+        Retorna {"vector", "puts": [[entrada, relógio, nó]...],
+        "dels": [[id, relógio, nó]...]}, com as entradas completas. Só as
+        senhas das entradas alteradas são decifradas. nodes limita às
+        alterações gravadas pelos nós dados.
+        """
+        self._ensure_versioned()
+        with self._lock:
+            versions = self._versions
+            current = versions.vector()
+            put_versions = {}
+            dels = []
+            for entry_id in versions.since(vector, nodes):
+                if entry_id in self._entries:
+                    put_versions[entry_id] = versions.of[entry_id]
+                else:
+                    dels.append([entry_id, *versions.of[entry_id]])
+        puts = [[entry, *put_versions[entry["id"]]]
+                for entry in self.get_many(list(put_versions), secrets=True)
+                if entry is not None]
+        return {"vector": current, "puts": puts, "dels": dels}
+
+    def merge(self, changes):
+        """Aplica alterações de outra réplica; retorna quantas valeram
+
+        Cada entrada fica com a versão maior (relógio e, no empate, nó):
+        réplicas que recebem as mesmas alterações chegam ao mesmo estado,
+        em qualquer ordem. Só as entradas que mudam são cifradas e
+        gravadas, em uma única escrita.
+        """
+        with self._lock:
+            self._ensure_versioned()
+            newer = self._versions.newer
+            puts = []
+            for entry, clock, node in changes.get("puts", ()):
+                if newer(entry["id"], (clock, node)):
+                    meta, secret = _split(entry)
+                    puts.append((meta, self._encrypt(secret), secret, (clock, node)))
+            dels = [(entry_id, (clock, node))
+                    for entry_id, clock, node in changes.get("dels", ())
+                    if newer(entry_id, (clock, node))]
+            if puts or dels:
+                self._append(puts, dels)
+        metrics.inc("vault.merged", len(puts) + len(dels))
+        if dels:
+            self.maybe_compact()
+        return len(puts) + len(dels)
+
+    def dead_records(self):
+        """Quantidade de registros que a compactação removeria"""
+        if self._entries is None:
+            return None
+        return self._records - len(self._versions.of)
+
+    def maybe_compact(self):
+        """Inicia compactação em segundo plano se houver muito registro morto"""
+        dead = self.dead_records()
+        if dead is None or dead < max(self.compact_min_dead, len(self._entries)):
+            return False
+        if self._compactor is not None and self._compactor.is_alive():
+            return False
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+        return True
+
+    def compact(self):
+        """Reescreve o cofre só com as entradas vivas (e as lápides)
+
+        Os segredos são copiados como estão, sem decifrar; só os metadados
+        são cifrados de novo, em segmentos de SEGMENT_ENTRIES entradas. A
+        fase longa roda sem trava, sobre os arquivos até o tamanho que
+        tinham no início; com a trava, só o que foi gravado nesse meio
+        tempo é levado para a geração nova, antes da troca.
+        """
+        if not os.path.exists(self.path):
+            return
+        with self._exclusive():
+            self._drop_partial()
+            self._check_key()
+            meta_file = open(self.path, 'rb')
+            try:
+                gen = self._parse_header(meta_file.read(HEADER_SIZE))
+                stop = os.fstat(meta_file.fileno()).st_size
+                path = secrets_path(self.path, gen)
+                if not os.path.exists(path):
+                    raise VaultError(f"Arquivo de segredos não encontrado: {path}")
+                source = open(path, 'rb')
+            except BaseException:
+                meta_file.close()
+                raise
+            secrets_stop = os.fstat(source.fileno()).st_size
+
+        with meta_file, source:
+            # Fase longa sem trava: as gravações seguem para o fim dos
+            # arquivos atuais
+            live = {}
+            versions = {}
+            for segment in self._iter_segments(meta_file, stop):
+                for entry_id, entry, offset, version in _segment_records(segment):
+                    if entry is None:
+                        live.pop(entry_id, None)
+                    else:
+                        live[entry_id] = (entry, offset)
+                    versions[entry_id] = version
+
+            def items():
+                for entry_id, (entry, offset) in live.items():
+                    source.seek(offset)
+                    line = source.readline()
+                    yield (entry, line if line.endswith(b"\n") else line + b"\n",
+                           versions[entry_id])
+
+            tombstones = [(entry_id, version) for entry_id, version in versions.items()
+                          if entry_id not in live]
+            new_gen, offsets, lines = self._build_generation(items(), tombstones)
+
+            with self._exclusive():
+                try:
+                    same = os.path.samestat(os.fstat(meta_file.fileno()),
+                                            os.stat(self.path))
+                except FileNotFoundError:
+                    same = False
+                if not same:
+                    # Outro processo compactou ou trocou a chave no meio (e
+                    # pode já ter removido o arquivo da geração nova)
+                    try:
+                        os.remove(secrets_path(self.path, new_gen))
+                    except FileNotFoundError:
+                        pass
+                    return
+                fresh = (self._entries is not None
+                         and self._current_signature() == self._signature)
+                tail, count = self._copy_tail(meta_file, stop, source, secrets_stop,
+                                              new_gen, offsets)
+                self._rewrite(new_gen, lines + tail)
+                self._remove_stale(new_gen)
+                if fresh:
+                    # O conteúdo lógico não mudou: o cache continua válido
+                    self._gen = new_gen
+                    self._offsets = offsets
+                    self._records = len(live) + len(tombstones) + count
+                    self._signature = self._current_signature()
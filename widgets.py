@@ -0,0 +1,181 @@
+"""Widgets Tk reutilizáveis"""
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+
+
+class VirtualListbox(ttk.Frame):
+    """Lista virtualizada: desenha apenas as linhas visíveis
+
+    Não guarda os textos das linhas. A quantidade de linhas e o texto de
+    cada uma são obtidos sob demanda pelas funções passadas em
+    set_source(), então atualizar a lista custa O(linhas visíveis),
+    independente do total. Imita a parte da API do tk.Listbox usada pelo
+    aplicativo (curselection, selection_set, see e o evento
+    <<ListboxSelect>>).
+    """
+
+    def __init__(self, parent, font=("Consolas", 10), bg="#1a1a2e",
+                 fg="#ffffff", select_bg="#0f4c75", padding=4):
+        super().__init__(parent)
+        self.font = tkfont.Font(font=font)
+        self.row_height = self.font.metrics('linespace') + 2
+        self.fg = fg
+        self.padding = padding
+
+        self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0,
+                                takefocus=True, relief=tk.FLAT)
+        self.scrollbar = ttk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self._count = lambda: 0
+        self._text = lambda index: ""
+        self._top = 0
+        self._selected = None
+        self._rows = []
+        self._highlight = self.canvas.create_rectangle(
+            0, 0, 0, 0, fill=select_bg, width=0, state=tk.HIDDEN)
+
+        self.canvas.bind('<Configure>', lambda e: self.refresh())
+        self.canvas.bind('<Button-1>', self._on_click)
+        self.canvas.bind('<MouseWheel>', self._on_wheel)
+        self.canvas.bind('<Button-4>', lambda e: self.yview('scroll', -3, 'units'))
+        self.canvas.bind('<Button-5>', lambda e: self.yview('scroll', 3, 'units'))
+        self.canvas.bind('<Up>', lambda e: self._move_selection(-1))
+        self.canvas.bind('<Down>', lambda e: self._move_selection(1))
+        self.canvas.bind('<Prior>', lambda e: self._move_selection(-self.visible_rows()))
+        self.canvas.bind('<Next>', lambda e: self._move_selection(self.visible_rows()))
+
+    # ----- fonte de dados -----
+
+    def set_source(self, count, text):
+        """Define funções que retornam o total de linhas e o texto da linha i"""
+        self._count = count
+        self._text = text
+        self.refresh()
+
+    def size(self):
+        return self._count()
+
+    # ----- desenho -----
+
+    def visible_rows(self):
+        """Quantidade de linhas que cabem na área visível"""
+        height = max(self.canvas.winfo_height(), self.row_height)
+        return height // self.row_height + 1
+
+    def refresh(self):
+        """Redesenha somente as linhas visíveis"""
+        total = self._count()
+        visible = self.visible_rows()
+        self._top = max(0, min(self._top, total - visible + 1))
+
+        # Pool de itens de texto do tamanho da janela visível
+        while len(self._rows) < visible:
+            self._rows.append(self.canvas.create_text(
+                self.padding, 0, anchor=tk.NW, font=self.font, fill=self.fg))
+        width = self.canvas.winfo_width()
+
+        for offset, item in enumerate(self._rows):
+            index = self._top + offset
+            if offset < visible and index < total:
+                self.canvas.coords(item, self.padding, offset * self.row_height + 1)
+                self.canvas.itemconfigure(item, text=self._text(index),
+                                          state=tk.NORMAL)
+            else:
+                self.canvas.itemconfigure(item, state=tk.HIDDEN)
+
+        if self._selected is not None and self._top <= self._selected < self._top + visible:
+            y = (self._selected - self._top) * self.row_height
+            self.canvas.coords(self._highlight, 0, y, width, y + self.row_height)
+            self.canvas.itemconfigure(self._highlight, state=tk.NORMAL)
+        else:
+            self.canvas.itemconfigure(self._highlight, state=tk.HIDDEN)
+
+        if total:
+            self.scrollbar.set(self._top / total,
+                               min(1.0, (self._top + visible - 1) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # ----- rolagem -----
+
+    def yview(self, *args):
+        """Interface de rolagem compatível com ttk.Scrollbar"""
+        total = self._count()
+        visible = self.visible_rows() - 1
+        if not args or not total:
+            return
+        if args[0] == 'moveto':
+            self._top = int(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= max(1, visible)
+            self._top += step
+        self.refresh()
+
+    def see(self, index):
+        """Rola até a linha index ficar visível"""
+        visible = self.visible_rows() - 1
+        if index < self._top:
+            self._top = index
+        elif index >= self._top + visible:
+            self._top = index - visible + 1
+        self.refresh()
+
+    def _on_wheel(self, event):
+        self.yview('scroll', -3 if event.delta > 0 else 3, 'units')
+
+    # ----- seleção -----
+
+    def curselection(self):
+        """Tupla com o índice selecionado (vazia se nenhum)"""
+        if self._selected is None or self._selected >= self._count():
+            return ()
+        return (self._selected,)
+
+    def selection_set(self, index):
+        self._selected = index
+        self.refresh()
+
+    def selection_clear(self):
+        self._selected = None
+        self.refresh()
+
+    def _select(self, index):
+        total = self._count()
+        if not total:
+            return
+        index = max(0, min(index, total - 1))
+        self._selected = index
+        self.see(index)
+        self.event_generate('<<ListboxSelect>>')
+
+    def _on_click(self, event):
+        self.canvas.focus_set()
+        index = self._top + int(event.y // self.row_height)
+        if index < self._count():
+            self._select(index)
+
+    def _move_selection(self, step):
+        current = self._selected if self._selected is not None else self._top - step
+        self._select(current + step)
+
+    # ----- atualização no lugar -----
+
+    def row_inserted(self, index):
+        """Avisa que uma linha foi inserida em index"""
+        if self._selected is not None and index <= self._selected:
+            self._selected += 1
+        self.refresh()
+
+    def row_deleted(self, index):
+        """Avisa que a linha index foi removida"""
+        if self._selected is not None:
+            if index == self._selected:
+                self._selected = None
+            elif index < self._selected:
+                self._selected -= 1
+        self.refresh()
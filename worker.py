@@ -0,0 +1,107 @@
+"""Execução de tarefas de E/S e criptografia fora da thread do Tk"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskRunner:
+    """Executa funções em uma thread dedicada e devolve o resultado ao Tk
+
+    O Tk não pode ser usado de outras threads: os resultados são
+    colocados em uma fila e entregues na thread principal por um laço de
+    root.after, que só roda enquanto há tarefas pendentes.
+    """
+
+    def __init__(self, root, poll_ms=16, on_busy=None, name="pgp-io"):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix=name)
+        self._done = queue.SimpleQueue()
+        self._pending = {}
+        self._polling = False
+        self._batches = {}
+        self._batch_lock = threading.Lock()
+
+    @property
+    def busy(self):
+        """Descrições das tarefas em andamento"""
+        return list(self._pending.values())
+
+    def submit(self, fn, *args, on_done=None, on_error=None, label=""):
+        """Agenda fn(*args) na thread de E/S
+
+        on_done(resultado) ou on_error(exceção) são chamados na thread do Tk.
+        Se a tarefa for cancelada (future.cancel()) antes de começar, nenhum
+        dos dois é chamado.
+        """
+        future = self._executor.submit(fn, *args)
+        self._pending[future] = label
+        future.add_done_callback(
+            lambda f: self._done.put((f, on_done, on_error)))
+        self._notify()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return future
+
+    def submit_batched(self, key, item, fn, on_done=None, on_error=None, label=""):
+        """Acumula item e processa os acumulados em uma única tarefa
+
+        Enquanto a tarefa de key ainda não começou, novos itens entram no
+        mesmo lote. fn recebe a lista de itens; on_done recebe
+        (itens, resultado).
+        """
+        with self._batch_lock:
+            batch = self._batches.get(key)
+            if batch is not None:
+                batch.append(item)
+                return
+            batch = self._batches[key] = [item]
+
+        def run():
+            # A partir daqui o lote está fechado: novos itens abrem outro
+            with self._batch_lock:
+                items = self._batches.pop(key)
+            return items, fn(items)
+
+        def done(result):
+            if on_done:
+                on_done(*result)
+
+        self.submit(run, on_done=done, on_error=on_error, label=label)
+
+    def _notify(self):
+        if self.on_busy:
+            self.on_busy(self.busy)
+
+    def _poll(self):
+        """Entrega resultados prontos na thread do Tk"""
+        while True:
+            try:
+                future, on_done, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.pop(future, None)
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    self.root.report_callback_exception(
+                        type(error), error, error.__traceback__)
+            elif on_done:
+                on_done(future.result())
+        self._notify()
+
+        if self._pending:
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def shutdown(self):
+        """Espera as tarefas pendentes (ex.: gravações) e encerra a thread"""
+        self._executor.shutdown(wait=True)